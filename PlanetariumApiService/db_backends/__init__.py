@@ -0,0 +1,17 @@
+import time
+
+from PlanetariumApiService.middleware import record_connection
+
+
+class ConnectionTimingMixin:
+    """Measure how long opening a connection takes
+
+    With persistent connections (CONN_MAX_AGE) this should rarely happen
+    during requests; the metrics show whether it does.
+    """
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_connection(self.alias, time.perf_counter() - started)
+        return connection
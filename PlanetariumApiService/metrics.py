@@ -0,0 +1,146 @@
+"""Request histograms exposed in the Prometheus text format.
+
+Histograms live in the memory of the process; every worker exposes its own,
+which Prometheus aggregates when scraping them all.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def format_value(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Histogram:
+    """Thread-safe histogram of values per combination of label values"""
+
+    def __init__(
+        self, name, documentation, buckets, label_names=("view", "method")
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self.lock = threading.Lock()
+        # labels: [count per bucket and +Inf, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            series = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            }
+
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ",".join(
+                f'{name}="{escape_label(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{{{label_text},"
+                    f'le="{format_value(bound)}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+REQUEST_DURATION = Histogram(
+    "planetarium_request_duration_seconds",
+    "Time spent handling the request.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "planetarium_request_db_queries",
+    "SQL queries run by the request.",
+    (0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    "planetarium_request_db_duration_seconds",
+    "Time spent in SQL queries of the request.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+RESPONSE_SERIALIZE_DURATION = Histogram(
+    "planetarium_response_serialize_seconds",
+    "Time spent serializing the response data, queries included.",
+    (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+RESPONSE_RENDER_DURATION = Histogram(
+    "planetarium_response_render_seconds",
+    "Time spent rendering the response data to the body.",
+    (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+RESPONSE_SIZE = Histogram(
+    "planetarium_response_size_bytes",
+    "Size of the response body; streamed responses are not counted.",
+    (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_CONNECTION_DURATION = Histogram(
+    "planetarium_db_connection_seconds",
+    "Time spent opening a database connection.",
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+    label_names=("database",),
+)
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_DB_DURATION,
+    RESPONSE_SERIALIZE_DURATION,
+    RESPONSE_RENDER_DURATION,
+    RESPONSE_SIZE,
+    DB_CONNECTION_DURATION,
+)
+
+
+def metrics_view(request):
+    """Expose the histograms to METRICS_TOKEN bearers, or staff without it"""
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(
+            request.headers.get("Authorization", ""),
+            f"Bearer {settings.METRICS_TOKEN}",
+        )
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+
+    lines = [line for histogram in HISTOGRAMS for line in histogram.expose()]
+    return HttpResponse("\n".join(lines) + "\n", content_type=CONTENT_TYPE)
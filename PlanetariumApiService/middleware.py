@@ -0,0 +1,251 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from PlanetariumApiService.metrics import (
+    DB_CONNECTION_DURATION,
+    REQUEST_DB_DURATION,
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    RESPONSE_RENDER_DURATION,
+    RESPONSE_SERIALIZE_DURATION,
+    RESPONSE_SIZE,
+)
+from PlanetariumApiService.routers import (
+    ReplicaReads,
+    pin_to_primary,
+    replica_reads,
+)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# phase: histogram, in Server-Timing order
+PHASES = {
+    "serialize": RESPONSE_SERIALIZE_DURATION,
+    "render": RESPONSE_RENDER_DURATION,
+}
+
+request_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = (
+        "started",
+        "queries",
+        "db_time",
+        "connections",
+        "connect_time",
+        "phases",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.connections = 0
+        self.connect_time = 0.0
+        # phase: seconds, for phases the request went through
+        self.phases = {}
+
+    def add_phase_time(self, phase, duration):
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+
+def record_query(execute, sql, params, many, context):
+    """Count queries and their time for the request being handled"""
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def record_connection(alias, duration):
+    """Record the time taken to open a database connection"""
+    DB_CONNECTION_DURATION.observe((alias,), duration)
+    metrics = request_metrics.get()
+    if metrics is not None:
+        metrics.connections += 1
+        metrics.connect_time += duration
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Connections opened later, e.g. in the thread of the async ORM.
+connection_created.connect(install_query_recorder)
+
+
+@contextmanager
+def record_phase(phase):
+    """Add the time spent in the block to a phase of the request being handled
+
+    Serialization and rendering happen in views, cached responses and async
+    views alike, so they are timed where they run.
+    """
+    metrics = request_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_phase_time(phase, time.perf_counter() - started)
+
+
+class PerformanceMiddleware:
+    """Measure requests and report them as Server-Timing and histograms
+
+    Records wall time, SQL queries and their time, the time spent
+    serializing and rendering the response and its size per view and
+    method. Place it first in MIDDLEWARE so the other middleware is
+    included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        for connection in connections.all():
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        metrics = request_metrics.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.add_phase_time(
+                    "render", time.perf_counter() - started
+                )
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def finish(request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        resolver_match = request.resolver_match
+        labels = (
+            resolver_match.view_name if resolver_match else "unmatched",
+            request.method,
+        )
+
+        REQUEST_DURATION.observe(labels, duration)
+        REQUEST_QUERIES.observe(labels, metrics.queries)
+        REQUEST_DB_DURATION.observe(labels, metrics.db_time)
+        for phase, duration in metrics.phases.items():
+            PHASES[phase].observe(labels, duration)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+
+        timings = [
+            f"total;dur={duration * 1000:.1f}",
+            f"db;dur={metrics.db_time * 1000:.1f};"
+            f'desc="{metrics.queries} queries"',
+        ]
+        if metrics.connections:
+            timings.append(
+                f"connect;dur={metrics.connect_time * 1000:.1f};"
+                f'desc="{metrics.connections} connections"'
+            )
+        for phase in PHASES:
+            if phase in metrics.phases:
+                timings.append(
+                    f"{phase};dur={metrics.phases[phase] * 1000:.1f}"
+                )
+        response["Server-Timing"] = ", ".join(timings)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Let views with ``read_from_replica`` read from a replica
+
+    Only GET, HEAD and OPTIONS requests are routed. A successful write
+    pins the user's reads to the primary for REPLICA_PIN_SECONDS, so they
+    see their own changes despite replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = replica_reads.set(ReplicaReads(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = replica_reads.set(ReplicaReads(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.finish(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", view_func)
+        state = replica_reads.get()
+        if (
+            state is not None
+            and request.method in SAFE_METHODS
+            and getattr(view, "read_from_replica", False)
+        ):
+            state.allowed = True
+
+    @staticmethod
+    def finish(request, response):
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.id)
+        return response
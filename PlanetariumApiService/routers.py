@@ -0,0 +1,70 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PIN_KEY = "planetarium:primary-pin:{user_id}"
+
+replica_reads = ContextVar("replica_reads", default=None)
+
+
+def pin_to_primary(user_id):
+    """Read from the primary for REPLICA_PIN_SECONDS after a user's write"""
+    cache.set(
+        PIN_KEY.format(user_id=user_id), True, settings.REPLICA_PIN_SECONDS
+    )
+
+
+class ReplicaReads:
+    """Routing state of a request, set by ReplicaRoutingMiddleware
+
+    Reads of the request go to one replica once a view allows it, unless
+    the user wrote recently. The user is looked up at the first routed
+    query, when the view has authenticated the request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.allowed = False
+        self.alias = None
+
+    def get_alias(self):
+        if not self.allowed or not settings.DATABASE_REPLICAS:
+            return None
+        if self.alias is None:
+            user = getattr(self.request, "user", None)
+            pinned = (
+                user is not None
+                and user.is_authenticated
+                and cache.get(PIN_KEY.format(user_id=user.id))
+            )
+            self.alias = (
+                "default" if pinned
+                else random.choice(settings.DATABASE_REPLICAS)
+            )
+        return self.alias
+
+
+class ReplicaRouter:
+    """Send reads of the services app to a replica when the request allows
+
+    Users, tokens and sessions are always read from the primary, as are
+    all writes and reads outside of requests.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = replica_reads.get()
+        if state is None or model._meta.app_label != "services":
+            return None
+        return state.get_alias()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -44,20 +44,30 @@ INSTALLED_APPS = [
     'user',
     'rest_framework',
     'rest_framework.authtoken',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'PlanetariumApiService.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'PlanetariumApiService.middleware.ReplicaRoutingMiddleware',
 ]
 
+# Debug toolbar, e.g. DEBUG_TOOLBAR=1 in development. It slows every
+# request down, so it is off by default.
+
+DEBUG_TOOLBAR = os.environ.get("DEBUG_TOOLBAR", "") == "1"
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(
+        2, 'debug_toolbar.middleware.DebugToolbarMiddleware'
+    )
+
 ROOT_URLCONF = 'PlanetariumApiService.urls'
 
 TEMPLATES = [
@@ -82,18 +92,121 @@ WSGI_APPLICATION = 'PlanetariumApiService.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request, "none" keeps them forever) and checked before reuse.
+# The backend is Django's PostgreSQL backend timing new connections.
+
+DB_CONN_MAX_AGE = os.environ.get("DB_CONN_MAX_AGE", "60")
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "PlanetariumApiService.db_backends.postgresql",
         "NAME": os.environ["POSTGRES_DB"],
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
         "PORT": os.environ["POSTGRES_PORT"],
+        "CONN_MAX_AGE": (
+            None if DB_CONN_MAX_AGE.lower() == "none" else int(DB_CONN_MAX_AGE)
+        ),
+        "CONN_HEALTH_CHECKS": (
+            os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1"
+        ),
     }
 }
 
+# Read replicas
+# POSTGRES_REPLICA_HOSTS holds comma separated hosts of replicas with the
+# credentials of the primary. Safe reads of views with read_from_replica go
+# to them; a user's reads stay on the primary for REPLICA_PIN_SECONDS after
+# they write. Pointing a replica at the primary host tests routing locally.
+
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    host
+    for host in os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")
+    if host
+):
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["PlanetariumApiService.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "planetarium"),
+    }
+}
+
+# Seat holds
+
+SEAT_HOLD_STORE = os.environ.get(
+    "SEAT_HOLD_STORE", "services.holds.CacheSeatHoldStore"
+)
+SEAT_HOLD_TTL = int(os.environ.get("SEAT_HOLD_TTL", 10 * 60))
+
+# Live seat events
+# InProcessSeatEventBroker serves a single process; use
+# services.events.CacheSeatEventBroker with a shared cache for several workers.
+
+SEAT_EVENT_BROKER = os.environ.get(
+    "SEAT_EVENT_BROKER", "services.events.InProcessSeatEventBroker"
+)
+SEAT_EVENTS_HEARTBEAT = int(os.environ.get("SEAT_EVENTS_HEARTBEAT", 15))
+SEAT_EVENTS_STREAM_TIMEOUT = int(
+    os.environ.get("SEAT_EVENTS_STREAM_TIMEOUT", 5 * 60)
+)
+# Reconnection delay suggested to clients, in milliseconds
+SEAT_EVENTS_RETRY = int(os.environ.get("SEAT_EVENTS_RETRY", 3000))
+
+# Signed access tokens
+# JWT_SIGNING_KEYS holds comma separated "<key id>:<secret>" pairs. Tokens
+# are signed with JWT_ACTIVE_KEY_ID and verified with the key named in their
+# header, so a new key can be rolled out before the old one is removed.
+
+JWT_SIGNING_KEYS = dict(
+    pair.split(":", 1)
+    for pair in os.environ.get("JWT_SIGNING_KEYS", "").split(",")
+    if pair
+) or {"default": SECRET_KEY}
+JWT_ACTIVE_KEY_ID = os.environ.get(
+    "JWT_ACTIVE_KEY_ID", next(iter(JWT_SIGNING_KEYS))
+)
+JWT_ACCESS_TOKEN_LIFETIME = int(
+    os.environ.get("JWT_ACCESS_TOKEN_LIFETIME", 5 * 60)
+)
+JWT_REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get("JWT_REFRESH_TOKEN_LIFETIME", 7 * 24 * 60 * 60)
+)
+
+# Async read path
+# Endpoints of services.async_views.ENDPOINTS served with the async ORM,
+# e.g. "sessions-list,sessions-detail,shows-list,shows-detail".
+
+ASYNC_READ_ENDPOINTS = [
+    name
+    for name in os.environ.get("ASYNC_READ_ENDPOINTS", "").split(",")
+    if name
+]
+
+# Metrics
+# When METRICS_TOKEN is set, /metrics requires "Authorization: Bearer <token>";
+# without it, only staff users logged in with a session may read it.
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from .models import (
     PlanetariumDome,
@@ -8,9 +11,86 @@ from .models import (
     ShowSession, Ticket
 )
 
-admin.site.register(PlanetariumDome)
-admin.site.register(ShowTheme)
-admin.site.register(AstronomyShow)
-admin.site.register(Reservation)
-admin.site.register(ShowSession)
-admin.site.register(Ticket)
+# Tables estimated to have fewer rows are counted exactly.
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Take the row count of unfiltered changelists from table statistics
+
+    On PostgreSQL ``COUNT(*)`` scans the whole table, so big tables are
+    paginated with the planner's estimate (``pg_class.reltuples``).
+    Filtered and searched changelists are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Don't count the unfiltered table next to filtered results.
+    show_full_result_count = False
+
+
+@admin.register(ShowTheme)
+class ShowThemeAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(AstronomyShow)
+class AstronomyShowAdmin(admin.ModelAdmin):
+    list_display = ("title",)
+    search_fields = ("title",)
+    autocomplete_fields = ("theme",)
+
+
+@admin.register(PlanetariumDome)
+class PlanetariumDomeAdmin(admin.ModelAdmin):
+    list_display = ("name", "rows", "seats_in_row")
+    search_fields = ("name",)
+
+
+@admin.register(ShowSession)
+class ShowSessionAdmin(LargeTableAdmin):
+    list_display = (
+        "show_time", "astronomy_show", "planetarium_dome", "tickets_sold"
+    )
+    list_select_related = ("astronomy_show", "planetarium_dome")
+    list_filter = ("planetarium_dome",)
+    date_hierarchy = "show_time"
+    autocomplete_fields = ("astronomy_show", "planetarium_dome")
+
+
+@admin.register(Reservation)
+class ReservationAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    date_hierarchy = "created_at"
+    raw_id_fields = ("user",)
+
+
+@admin.register(Ticket)
+class TicketAdmin(LargeTableAdmin):
+    list_display = ("id", "show_session", "row", "seat", "reservation")
+    list_select_related = (
+        "show_session__astronomy_show",
+        "show_session__planetarium_dome",
+        "reservation",
+    )
+    list_filter = ("show_session__planetarium_dome",)
+    raw_id_fields = ("show_session", "reservation")
+    # The model's ("row", "seat") ordering would sort the whole table.
+    ordering = ("-id",)
@@ -0,0 +1,199 @@
+from django.db import transaction
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+
+from services.models import (
+    ArchivedShowSession,
+    ArchivedTicket,
+    AstronomyShow,
+    DirtyShowSession,
+    SessionOccupancy,
+    ShowSession,
+    ThemeOccupancy,
+    Ticket,
+)
+
+BATCH_SIZE = 1000
+BUCKETS = ("day", "week", "month")
+# group_by: rollup columns identifying a group
+GROUPS = {
+    "dome": ("dome_id", "dome_name"),
+    "show": ("show_id", "show_title"),
+    "theme": ("theme_id", "theme_name"),
+}
+
+
+def rollup_sessions(show_session_ids, archived=False):
+    """Replace the rollup rows of the sessions with fresh counts"""
+    session_model, ticket_model = (
+        (ArchivedShowSession, ArchivedTicket) if archived
+        else (ShowSession, Ticket)
+    )
+    sessions = session_model.objects.filter(pk__in=show_session_ids).values(
+        "id",
+        "show_time",
+        "astronomy_show_id",
+        "astronomy_show__title",
+        "planetarium_dome_id",
+        "planetarium_dome__name",
+        "planetarium_dome__rows",
+        "planetarium_dome__seats_in_row",
+    )
+    tickets_sold = dict(
+        ticket_model.objects.filter(show_session_id__in=show_session_ids)
+        .order_by()
+        .values("show_session_id")
+        .annotate(count=Count("id"))
+        .values_list("show_session_id", "count")
+    )
+
+    rollups = [
+        {
+            "show_session_id": session["id"],
+            "day": session["show_time"].date(),
+            "show_id": session["astronomy_show_id"],
+            "show_title": session["astronomy_show__title"],
+            "dome_id": session["planetarium_dome_id"],
+            "dome_name": session["planetarium_dome__name"],
+            "capacity": (
+                session["planetarium_dome__rows"]
+                * session["planetarium_dome__seats_in_row"]
+            ),
+            "tickets_sold": tickets_sold.get(session["id"], 0),
+        }
+        for session in sessions
+    ]
+    themes = AstronomyShow.theme.through.objects.filter(
+        astronomyshow_id__in={rollup["show_id"] for rollup in rollups}
+    ).values_list("astronomyshow_id", "showtheme_id", "showtheme__name")
+    themes_by_show = {}
+    for show_id, theme_id, theme_name in themes:
+        themes_by_show.setdefault(show_id, []).append((theme_id, theme_name))
+
+    SessionOccupancy.objects.filter(
+        show_session_id__in=show_session_ids
+    ).delete()
+    ThemeOccupancy.objects.filter(show_session_id__in=show_session_ids).delete()
+    SessionOccupancy.objects.bulk_create(
+        SessionOccupancy(**rollup) for rollup in rollups
+    )
+    ThemeOccupancy.objects.bulk_create(
+        ThemeOccupancy(theme_id=theme_id, theme_name=theme_name, **rollup)
+        for rollup in rollups
+        for theme_id, theme_name in themes_by_show.get(rollup["show_id"], ())
+    )
+    return len(rollups)
+
+
+def refresh_occupancy(rebuild=False, batch_size=BATCH_SIZE):
+    """Roll up sessions whose tickets changed since the last refresh.
+
+    Ticket changes queue their sessions in DirtyShowSession (see
+    ShowSession.change_tickets_sold), and sessions without a rollup yet are
+    rolled up too, so empty ones count towards capacity. Queued sessions
+    that were archived meanwhile are read from the archive. Renamed shows
+    and domes are picked up by a rebuild, which recounts every session.
+    Return the number of rolled up sessions.
+    """
+    with transaction.atomic():
+        # Only the rows read here are removed: sessions queued while the
+        # refresh runs stay for the next one.
+        queued = dict(
+            DirtyShowSession.objects.values_list("id", "show_session_id")
+        )
+        if rebuild:
+            SessionOccupancy.objects.all().delete()
+            ThemeOccupancy.objects.all().delete()
+
+        queued_ids = set(queued.values())
+        show_session_ids = sorted(
+            ShowSession.objects.filter(pk__in=queued_ids)
+            .order_by()
+            .values_list("id", flat=True)
+            .union(
+                ShowSession.objects.exclude(
+                    pk__in=SessionOccupancy.objects.values("show_session_id")
+                )
+                .order_by()
+                .values_list("id", flat=True)
+            )
+        )
+        archived_ids = ArchivedShowSession.objects.order_by("id").values_list(
+            "id", flat=True
+        )
+        if not rebuild:
+            archived_ids = archived_ids.filter(
+                pk__in=queued_ids.difference(show_session_ids)
+            )
+        archived_ids = list(archived_ids)
+
+        refreshed = 0
+        for start in range(0, len(archived_ids), batch_size):
+            refreshed += rollup_sessions(
+                archived_ids[start:start + batch_size], archived=True
+            )
+        for start in range(0, len(show_session_ids), batch_size):
+            refreshed += rollup_sessions(
+                show_session_ids[start:start + batch_size]
+            )
+
+        queued_pks = list(queued)
+        for start in range(0, len(queued_pks), batch_size):
+            DirtyShowSession.objects.filter(
+                pk__in=queued_pks[start:start + batch_size]
+            ).delete()
+        return refreshed
+
+
+def get_occupancy(
+    bucket="day",
+    group_by="dome",
+    day_from=None,
+    day_to=None,
+    dome=None,
+    show=None,
+    theme=None,
+):
+    """Occupancy of sessions in [day_from, day_to] per period and group.
+
+    A session of a show with several themes counts once for each of them
+    when grouped by theme.
+    """
+    if group_by == "theme" or theme:
+        queryset = ThemeOccupancy.objects.all()
+    else:
+        queryset = SessionOccupancy.objects.all()
+
+    filters = {
+        "day__gte": day_from,
+        "day__lte": day_to,
+        "dome_id": dome,
+        "show_id": show,
+        "theme_id": theme,
+    }
+    queryset = queryset.filter(
+        **{lookup: value for lookup, value in filters.items() if value}
+    )
+
+    rows = (
+        queryset.annotate(
+            period=Trunc("day", bucket, output_field=DateField())
+        )
+        .values("period", *GROUPS[group_by])
+        .annotate(
+            sessions=Count("show_session_id", distinct=True),
+            tickets_sold=Sum("tickets_sold"),
+            capacity=Sum("capacity"),
+        )
+        .order_by("period", GROUPS[group_by][0])
+    )
+    return [
+        {
+            **row,
+            "occupancy": (
+                round(row["tickets_sold"] / row["capacity"], 4)
+                if row["capacity"] else 0
+            ),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,96 @@
+from itertools import islice
+
+from django.db import connection, transaction
+
+from services.analytics import rollup_sessions
+from services.models import (
+    ArchivedShowSession,
+    ArchivedTicket,
+    ShowSession,
+    Ticket,
+)
+
+BATCH_SIZE = 500
+TICKET_BATCH_SIZE = 10_000
+
+
+def get_archivable_sessions(before):
+    return ShowSession.objects.filter(show_time__lt=before)
+
+
+def delete_rows(model, column, ids):
+    """Delete rows with one statement, without loading them.
+
+    Ticket signals would publish seat events and update the sold counters
+    of sessions that are being archived as a whole.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} "
+            f"WHERE {connection.ops.quote_name(column)} IN ({placeholders})",
+            ids,
+        )
+
+
+def archive_batch(show_session_ids, ticket_batch_size=TICKET_BATCH_SIZE):
+    """Move the sessions and their tickets into the archive tables.
+
+    Their occupancy rollups are refreshed first, so analytics stay correct
+    without the live rows. Return the number of archived tickets.
+    """
+    rollup_sessions(show_session_ids)
+    ArchivedShowSession.objects.bulk_create(
+        ArchivedShowSession(**session)
+        for session in ShowSession.objects.filter(
+            pk__in=show_session_ids
+        ).values(
+            "id",
+            "astronomy_show_id",
+            "planetarium_dome_id",
+            "show_time",
+            "tickets_sold",
+        )
+    )
+
+    tickets = (
+        Ticket.objects.filter(show_session_id__in=show_session_ids)
+        .order_by()
+        .values("id", "row", "seat", "show_session_id", "reservation_id")
+        .iterator(chunk_size=ticket_batch_size)
+    )
+    archived = 0
+    while batch := list(islice(tickets, ticket_batch_size)):
+        ArchivedTicket.objects.bulk_create(
+            ArchivedTicket(**ticket) for ticket in batch
+        )
+        archived += len(batch)
+
+    delete_rows(Ticket, "show_session_id", show_session_ids)
+    delete_rows(ShowSession, "id", show_session_ids)
+    return archived
+
+
+def archive_sessions(
+    before, batch_size=BATCH_SIZE, ticket_batch_size=TICKET_BATCH_SIZE
+):
+    """Archive sessions that started before `before`, oldest first.
+
+    Every batch of sessions is moved in its own transaction, so locks are
+    short and an interrupted run keeps what it has archived. Return the
+    numbers of archived sessions and tickets.
+    """
+    sessions = tickets = 0
+    while True:
+        with transaction.atomic():
+            show_session_ids = list(
+                get_archivable_sessions(before)
+                .select_for_update()
+                .order_by("show_time", "id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not show_session_ids:
+                return sessions, tickets
+            tickets += archive_batch(show_session_ids, ticket_batch_size)
+            sessions += len(show_session_ids)
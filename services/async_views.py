@@ -0,0 +1,201 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.urls import re_path
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from PlanetariumApiService.middleware import record_phase
+from services.cache import CachedResponseMixin, aget_resource_version
+from services.views import AstronomyShowViewSet, ShowSessionViewSet
+from user.authentication import JWTAuthentication
+
+DETAIL_REGEX = r"^{prefix}/(?P<pk>[^/.]+)/$"
+LIST_REGEX = r"^{prefix}/$"
+
+# name: (url prefix, viewset, action, extra prefetches)
+# Extra prefetches cover relations the serializer would otherwise load
+# lazily, which the async ORM does not allow.
+ENDPOINTS = {
+    "sessions-list": ("sessions", ShowSessionViewSet, "list", ()),
+    "sessions-detail": (
+        "sessions",
+        ShowSessionViewSet,
+        "retrieve",
+        ("tickets", "astronomy_show__theme"),
+    ),
+    "shows-list": ("shows", AstronomyShowViewSet, "list", ()),
+    "shows-detail": ("shows", AstronomyShowViewSet, "retrieve", ()),
+}
+
+
+class FallbackToSync(Exception):
+    """The request is not a plain read and is left to the sync viewset."""
+
+
+async def authenticate(request):
+    """Async counterpart of the viewsets' authentication classes.
+
+    Only a valid token of an active user is resolved here; anything that
+    needs an error response is left to the sync view.
+    """
+    auth = request.headers.get("Authorization", "").split()
+    if not auth:
+        return AnonymousUser()
+    if len(auth) == 2 and auth[0].lower() == "bearer":
+        try:
+            user, payload = await (
+                JWTAuthentication().aauthenticate_credentials(auth[1])
+            )
+        except AuthenticationFailed:
+            raise FallbackToSync
+        return user
+    if len(auth) != 2 or auth[0].lower() != "token":
+        raise FallbackToSync
+
+    try:
+        token = await Token.objects.select_related("user").aget(key=auth[1])
+    except Token.DoesNotExist:
+        raise FallbackToSync
+    if not token.user.is_active:
+        raise FallbackToSync
+    return token.user
+
+
+def accepts_json(request):
+    # Browsers get the browsable API rendered by the sync view.
+    return (
+        "format" not in request.GET
+        and "text/html" not in request.headers.get("Accept", "")
+    )
+
+
+def get_api_view(request, viewset_class, action, kwargs, user):
+    api_view = viewset_class(
+        action=action, args=(), kwargs=kwargs, format_kwarg=None, headers={}
+    )
+    api_view.request = Request(request)
+    api_view.request.user = user
+
+    if not all(
+        permission.has_permission(api_view.request, api_view)
+        for permission in api_view.get_permissions()
+    ):
+        raise FallbackToSync
+    if api_view.paginator and (
+        api_view.paginator.cursor_query_param in request.GET
+        or api_view.paginator.page_size_query_param in request.GET
+    ):
+        raise FallbackToSync
+    return api_view
+
+
+async def render(api_view, prefetch):
+    try:
+        queryset = api_view.filter_queryset(api_view.get_queryset())
+        # A requested fieldset already prefetches what it renders.
+        if prefetch and not api_view.requests_fieldset():
+            queryset = queryset.prefetch_related(*prefetch)
+
+        if api_view.action == "list":
+            instance = [obj async for obj in queryset]
+        else:
+            instance = await queryset.aget(pk=api_view.kwargs["pk"])
+
+        serializer = api_view.get_serializer(
+            instance, many=api_view.action == "list"
+        )
+        data = serializer.data
+        with record_phase("render"):
+            return JSONRenderer().render(data)
+    except (APIException, Http404, ObjectDoesNotExist, ValueError):
+        raise FallbackToSync
+
+
+async def get_cached_content(api_view, prefetch):
+    """Same entries and ETags as CachedResponseMixin.get_cached_response"""
+    key = api_view.get_response_cache_key(
+        api_view.request,
+        version=await aget_resource_version(api_view.cache_resource),
+    )
+    cached = await cache.aget(key)
+
+    if cached is None:
+        cached = api_view.make_cache_entry(await render(api_view, prefetch))
+        await cache.aset(key, cached, api_view.cache_timeout)
+
+    return cached
+
+
+def async_read_view(viewset_class, action, fallback, prefetch=()):
+    """Serve GET of a viewset action with the async ORM.
+
+    The response body matches the sync viewset, which is reused for
+    querysets, filters and serializers. Writes, errors, pagination and
+    non-JSON renderers are delegated to the sync view.
+    """
+    async def view(request, **kwargs):
+        try:
+            if request.method != "GET" or not accepts_json(request):
+                raise FallbackToSync
+            user = request.user = await authenticate(request)
+            api_view = get_api_view(
+                request, viewset_class, action, kwargs, user
+            )
+
+            if issubclass(viewset_class, CachedResponseMixin):
+                etag, content = await get_cached_content(api_view, prefetch)
+            else:
+                etag, content = None, await render(api_view, prefetch)
+        except FallbackToSync:
+            return await sync_to_async(fallback)(request, **kwargs)
+
+        if etag and api_view.etag_matches(etag, request):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                content, content_type=JSONRenderer.media_type
+            )
+        if etag:
+            response["ETag"] = etag
+        response["Allow"] = ", ".join(api_view.allowed_methods)
+        response["Vary"] = "Accept"
+        return response
+
+    # CSRF is enforced by the sync view for session-authenticated writes.
+    view.csrf_exempt = True
+    view.read_from_replica = getattr(
+        viewset_class, "read_from_replica", False
+    )
+    return view
+
+
+def get_async_read_urls(router_urls, endpoints=None):
+    """URL patterns serving `endpoints` (ASYNC_READ_ENDPOINTS by default).
+
+    They go before the router urls and fall back to the router views.
+    """
+    if endpoints is None:
+        endpoints = settings.ASYNC_READ_ENDPOINTS
+    callbacks = {pattern.name: pattern.callback for pattern in router_urls}
+
+    urls = []
+    for name in endpoints:
+        prefix, viewset_class, action, prefetch = ENDPOINTS[name]
+        basename = viewset_class.queryset.model._meta.object_name.lower()
+        if action == "list":
+            regex, route_name = LIST_REGEX, f"{basename}-list"
+        else:
+            regex, route_name = DETAIL_REGEX, f"{basename}-detail"
+        urls.append(re_path(
+            regex.format(prefix=prefix),
+            async_read_view(
+                viewset_class, action, callbacks[route_name], prefetch
+            ),
+        ))
+    return urls
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from PlanetariumApiService.middleware import record_phase
+
+VERSION_KEY = "planetarium:version:{resource}"
+RESPONSE_KEY = "planetarium:response:{resource}:{version}:{action}:{params}"
+
+
+def get_resource_version(resource):
+    # A missing (or evicted) version starts from the current time, so it
+    # never reuses the version of responses that may still be cached.
+    return cache.get_or_set(
+        VERSION_KEY.format(resource=resource), time.time_ns, timeout=None
+    )
+
+
+async def aget_resource_version(resource):
+    return await cache.aget_or_set(
+        VERSION_KEY.format(resource=resource), time.time_ns, timeout=None
+    )
+
+
+def bump_resource_version(*resources):
+    for resource in resources:
+        key = VERSION_KEY.format(resource=resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+class CachedResponse(Response):
+    """Response that reuses the cached JSON instead of rendering its data."""
+
+    def __init__(self, content, **kwargs):
+        super().__init__(**kwargs)
+        self.cached_content = content
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.cached_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        if self.accepted_renderer.format != "json":
+            return super().rendered_content
+        self["Content-Type"] = self.accepted_renderer.media_type
+        return self.cached_content
+
+
+class CachedResponseMixin:
+    """Cache rendered list and retrieve responses of a catalog viewset.
+
+    Entries are keyed by the version of ``cache_resource`` and the request
+    params; saving or deleting the underlying models bumps the version (see
+    services.signals). Responses carry a strong ETag, so a matching
+    ``If-None-Match`` is answered with 304 from the cache alone.
+    """
+
+    cache_resource = None
+    cache_timeout = 60 * 60
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_response_cache_key(self, request, version=None):
+        if version is None:
+            version = get_resource_version(self.cache_resource)
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        params = f"{sorted(self.kwargs.items())}?{params}"
+        return RESPONSE_KEY.format(
+            resource=self.cache_resource,
+            version=version,
+            action=self.action,
+            params=hashlib.md5(params.encode()).hexdigest(),
+        )
+
+    @staticmethod
+    def make_cache_entry(content):
+        return f'"{hashlib.sha256(content).hexdigest()[:32]}"', content
+
+    @staticmethod
+    def etag_matches(etag, request):
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        return etags == ["*"] or etag in (
+            candidate.removeprefix("W/") for candidate in etags
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            with record_phase("render"):
+                content = JSONRenderer().render(response.data)
+            cached = self.make_cache_entry(content)
+            cache.set(key, cached, self.cache_timeout)
+
+        etag, content = cached
+        if self.etag_matches(etag, request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = CachedResponse(content)
+        response["ETag"] = etag
+        return response
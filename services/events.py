@@ -0,0 +1,258 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer
+
+from services.seat_map import SeatMap
+
+EVENT_COUNTER_KEY = "planetarium:events:{show_session_id}"
+EVENT_KEY = "planetarium:events:{show_session_id}:{event_id}"
+
+
+def make_snapshot(event_id):
+    return {"id": event_id, "type": "snapshot"}
+
+
+def make_event(event_id, event_type, seats, expires_at=None):
+    event = {
+        "id": event_id,
+        "type": event_type,
+        "seats": [[row, seat] for row, seat in seats],
+    }
+    if expires_at is not None:
+        event["expires_at"] = expires_at
+    return event
+
+
+class BaseSeatEventBroker:
+    """Fan-out of seat availability changes of show sessions.
+
+    An event is a dict with an ``id`` increasing per session, a ``type``
+    ("taken", "held" or "released") and ``seats`` (list of ``[row, seat]``).
+    "held" events carry the ``expires_at`` of the hold (ISO 8601); no
+    "released" event is published when it expires.
+    """
+
+    def publish(self, show_session_id, event_type, seats, expires_at=None):
+        raise NotImplementedError
+
+    def listen(
+        self, show_session_id, last_event_id=None, heartbeat=15, timeout=300
+    ):
+        """Yield events of the session and None on every heartbeat.
+
+        The listener starts with the events after `last_event_id`. When they
+        can't be replayed it starts with a ``snapshot`` event instead, whose
+        id is the id of the latest event. It stops after `timeout` seconds.
+        """
+        raise NotImplementedError
+
+
+class InProcessSeatEventBroker(BaseSeatEventBroker):
+    """Deliver events to the listeners of the current process only.
+
+    Every listener gets its own queue; the latest events of each session are
+    kept for reconnecting clients.
+    """
+
+    def __init__(self, history_size=100):
+        self.lock = threading.Lock()
+        self.last_ids = defaultdict(int)
+        self.history = defaultdict(lambda: deque(maxlen=history_size))
+        self.listeners = defaultdict(set)
+
+    def publish(self, show_session_id, event_type, seats, expires_at=None):
+        with self.lock:
+            self.last_ids[show_session_id] += 1
+            event = make_event(
+                self.last_ids[show_session_id], event_type, seats, expires_at
+            )
+            self.history[show_session_id].append(event)
+            for events in self.listeners[show_session_id]:
+                events.put(event)
+        return event
+
+    def replay(self, show_session_id, last_event_id):
+        last_id = self.last_ids.get(show_session_id, 0)
+        history = self.history.get(show_session_id, ())
+        first_id = history[0]["id"] if history else last_id + 1
+
+        if last_event_id is None or not first_id - 1 <= last_event_id <= last_id:
+            return [make_snapshot(last_id)]
+        return [event for event in history if event["id"] > last_event_id]
+
+    def listen(
+        self, show_session_id, last_event_id=None, heartbeat=15, timeout=300
+    ):
+        events = queue.Queue()
+        with self.lock:
+            self.listeners[show_session_id].add(events)
+            backlog = self.replay(show_session_id, last_event_id)
+
+        try:
+            yield from backlog
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    yield events.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield None
+        finally:
+            with self.lock:
+                self.listeners[show_session_id].discard(events)
+                if not self.listeners[show_session_id]:
+                    del self.listeners[show_session_id]
+
+
+class CacheSeatEventBroker(BaseSeatEventBroker):
+    """Share events between workers through the cache.
+
+    Event ids come from an atomic ``cache.incr`` and every event is stored
+    under its own key for `history_ttl` seconds. Listeners poll the cache
+    every `poll_interval` seconds.
+    """
+
+    poll_interval = 1
+    max_replay = 1000
+
+    def __init__(self, cache_backend=cache, history_ttl=10 * 60):
+        self.cache = cache_backend
+        self.history_ttl = history_ttl
+
+    def publish(self, show_session_id, event_type, seats, expires_at=None):
+        counter_key = EVENT_COUNTER_KEY.format(show_session_id=show_session_id)
+        self.cache.add(counter_key, 0, timeout=None)
+        event = make_event(
+            self.cache.incr(counter_key), event_type, seats, expires_at
+        )
+        self.cache.set(
+            EVENT_KEY.format(
+                show_session_id=show_session_id, event_id=event["id"]
+            ),
+            event,
+            self.history_ttl,
+        )
+        return event
+
+    def get_last_id(self, show_session_id):
+        return self.cache.get(
+            EVENT_COUNTER_KEY.format(show_session_id=show_session_id), 0
+        )
+
+    def fetch(self, show_session_id, last_event_id, last_id):
+        """Events after `last_event_id`, None if some of them are missing"""
+        if not 0 <= last_id - last_event_id <= self.max_replay:
+            return None
+
+        keys = [
+            EVENT_KEY.format(show_session_id=show_session_id, event_id=event_id)
+            for event_id in range(last_event_id + 1, last_id + 1)
+        ]
+        events = self.cache.get_many(keys)
+        if len(events) != len(keys):
+            return None
+        return [events[key] for key in keys]
+
+    def listen(
+        self, show_session_id, last_event_id=None, heartbeat=15, timeout=300
+    ):
+        last_id = self.get_last_id(show_session_id)
+        events = None
+        if last_event_id is not None:
+            events = self.fetch(show_session_id, last_event_id, last_id)
+        if events is None:
+            events = [make_snapshot(last_id)]
+        yield from events
+        last_event_id = last_id
+
+        deadline = time.monotonic() + timeout
+        beat_at = time.monotonic() + heartbeat
+        retried = False
+        while time.monotonic() < deadline:
+            time.sleep(
+                max(0, min(self.poll_interval, deadline - time.monotonic()))
+            )
+            last_id = self.get_last_id(show_session_id)
+            events = self.fetch(show_session_id, last_event_id, last_id)
+
+            # An event may be counted but not stored yet; give it one more
+            # poll before falling back to a snapshot.
+            if events is None and not retried:
+                retried = True
+                continue
+            if events is None:
+                events = [make_snapshot(last_id)]
+            retried = False
+
+            if events:
+                yield from events
+                last_event_id = last_id
+                beat_at = time.monotonic() + heartbeat
+            elif time.monotonic() >= beat_at:
+                yield None
+                beat_at = time.monotonic() + heartbeat
+
+
+@lru_cache(maxsize=None)
+def load_seat_event_broker(path):
+    return import_string(path)()
+
+
+def get_seat_event_broker():
+    return load_seat_event_broker(settings.SEAT_EVENT_BROKER)
+
+
+def publish_seat_event(show_session_id, event_type, seats, expires_at=None):
+    """Publish the event once the current transaction commits"""
+    seats = list(seats)
+    transaction.on_commit(
+        lambda: get_seat_event_broker().publish(
+            show_session_id, event_type, seats, expires_at
+        )
+    )
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Render error responses of the event stream as an ``error`` event"""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event("error", data)
+
+
+def format_event(event_type, data, event_id=None):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def seat_event_stream(show_session, encoding, events):
+    """Server-Sent Events of a session from a broker listener"""
+    yield f"retry: {settings.SEAT_EVENTS_RETRY}\n\n"
+
+    for event in events:
+        if event is None:
+            yield ": heartbeat\n\n"
+        elif event["type"] == "snapshot":
+            seat_map = SeatMap.for_session(show_session).encode(encoding)
+            # Don't keep a database connection open for the whole stream.
+            if not connection.in_atomic_block:
+                connection.close()
+            yield format_event("snapshot", seat_map, event["id"])
+        else:
+            data = {
+                key: value for key, value in event.items()
+                if key not in ("id", "type")
+            }
+            yield format_event(event["type"], data, event["id"])
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from services.models import ArchivedTicket, Ticket
+
+# Exported column: ORM path of its value
+EXPORT_FIELDS = {
+    "ticket_id": "id",
+    "row": "row",
+    "seat": "seat",
+    "reservation_id": "reservation_id",
+    "reserved_at": "reservation__created_at",
+    "user_id": "reservation__user_id",
+    "user_email": "reservation__user__email",
+    "show_session_id": "show_session_id",
+    "show_time": "show_session__show_time",
+    "show_id": "show_session__astronomy_show_id",
+    "show_title": "show_session__astronomy_show__title",
+    "dome_id": "show_session__planetarium_dome_id",
+    "dome_name": "show_session__planetarium_dome__name",
+}
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_SIZE = 2000
+
+
+def get_ticket_export_queryset(
+    reserved_from=None, reserved_to=None, dome=None, model=Ticket
+):
+    """Tickets sold in [reserved_from, reserved_to) as dicts of joined values.
+
+    Ordered by primary key, so the database can stream it without sorting.
+    `model` is Ticket or ArchivedTicket, which share the exported paths.
+    """
+    queryset = model.objects.order_by("id")
+
+    if reserved_from:
+        queryset = queryset.filter(reservation__created_at__gte=reserved_from)
+
+    if reserved_to:
+        queryset = queryset.filter(reservation__created_at__lt=reserved_to)
+
+    if dome:
+        queryset = queryset.filter(show_session__planetarium_dome_id=dome)
+
+    return queryset.values(*EXPORT_FIELDS.values())
+
+
+def get_ticket_export_querysets(**filters):
+    """Archived tickets followed by the live ones.
+
+    The tables are exported one after the other rather than as a UNION,
+    which the database would have to sort.
+    """
+    return [
+        get_ticket_export_queryset(model=model, **filters)
+        for model in (ArchivedTicket, Ticket)
+    ]
+
+
+def format_csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_rows(querysets, output_format, chunk_size=CHUNK_SIZE):
+    """Yield the export as text, one chunk of `chunk_size` tickets at a time.
+
+    Rows are fetched with a server-side cursor where the database supports
+    it, so memory use does not depend on the number of tickets.
+    """
+    buffer = io.StringIO()
+    if output_format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+
+        def write(values):
+            writer.writerow(
+                format_csv_value(values[path])
+                for path in EXPORT_FIELDS.values()
+            )
+    else:
+        def write(values):
+            buffer.write(json.dumps(
+                {name: values[path] for name, path in EXPORT_FIELDS.items()},
+                cls=DjangoJSONEncoder,
+            ))
+            buffer.write("\n")
+
+    rows = chain.from_iterable(
+        queryset.iterator(chunk_size=chunk_size) for queryset in querysets
+    )
+    for number, values in enumerate(rows, start=1):
+        write(values)
+        if number % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
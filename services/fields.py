@@ -0,0 +1,14 @@
+from django.contrib.postgres.search import SearchVectorField
+
+
+class SearchDocumentField(SearchVectorField):
+    """A tsvector column on PostgreSQL and lowercase plain text elsewhere.
+
+    The plain text variant lets SQLite test databases store the same
+    document and search it with ``icontains`` (see services.search).
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return super().db_type(connection)
+        return "text"
@@ -0,0 +1,213 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from PlanetariumApiService.middleware import record_phase
+
+FIELDSET_PARAMS = ("fields", "expand")
+
+
+def parse_field_paths(value):
+    """Comma-separated dotted names as a tree of {name: {nested names}}.
+
+    An empty subtree means the whole field; ``show,show.title`` is the
+    whole ``show``.
+    """
+    tree, whole = {}, set()
+    for path in value.split(","):
+        names = [name.strip() for name in path.split(".")]
+        if not all(names):
+            continue
+        node = tree
+        for name in names:
+            node = node.setdefault(name, {})
+        if len(names) == 1:
+            whole.add(names[0])
+    for name in whole:
+        tree[name] = {}
+    return tree
+
+
+class DynamicFieldsMixin:
+    """Sparse fieldsets and opt-in expansion of a read serializer.
+
+    On GET, ``?fields=id,show_time`` keeps only the listed fields and
+    ``?expand=astronomy_show`` adds fields of ``Meta.expandable_fields``
+    ({name: (serializer class, kwargs)}), which are left out otherwise;
+    expanding a field that is always rendered changes nothing.
+    Dotted names reach nested serializers: ``fields=id,tickets.row``.
+    ``Meta.field_paths`` ({name: ORM paths}) lists what fields backed by
+    a property or method read, so views can load just that (see
+    get_field_paths).
+    """
+
+    # (fields, expand) trees given by the parent serializer
+    fieldset = None
+    # dotted path of the serializer in the response, for error messages
+    field_prefix = ""
+
+    def get_fieldset(self):
+        if self.fieldset is not None:
+            return self.fieldset
+
+        request = self.context.get("request")
+        if not self.is_root() or request is None or (
+            request.method not in SAFE_METHODS
+        ):
+            return {}, {}
+        return tuple(
+            parse_field_paths(request.query_params.get(param, ""))
+            for param in FIELDSET_PARAMS
+        )
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_fieldset()
+        expandable = getattr(self.Meta, "expandable_fields", {})
+
+        expanded = {name for name in expand if name in expandable}
+        for name in expanded:
+            serializer_class, kwargs = expandable[name]
+            fields[name] = serializer_class(read_only=True, **kwargs)
+
+        errors = {}
+        for param, names in zip(FIELDSET_PARAMS, (requested, expand)):
+            unknown = [
+                self.field_prefix + name for name in names
+                if name not in fields
+            ]
+            if unknown:
+                errors[param] = f"Unknown field(s): {', '.join(unknown)}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if requested:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested or name in expanded
+            }
+        for name, field in fields.items():
+            child = getattr(field, "child", field)
+            if isinstance(child, DynamicFieldsMixin):
+                child.fieldset = (
+                    requested.get(name, {}), expand.get(name, {})
+                )
+                child.field_prefix = f"{self.field_prefix}{name}."
+        return fields
+
+    def to_representation(self, instance):
+        if not self.is_root():
+            return super().to_representation(instance)
+        # Lazy loads of the serializer are counted here as well as in db.
+        with record_phase("serialize"):
+            return super().to_representation(instance)
+
+
+def get_field_paths(serializer, prefix=""):
+    """ORM paths of the values `serializer` renders"""
+    model = serializer.Meta.model
+    field_paths = getattr(serializer.Meta, "field_paths", {})
+
+    paths = [prefix + model._meta.pk.name]
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        sources = field_paths.get(name, ["__".join(field.source_attrs)])
+        child = getattr(field, "child", field)
+        for source in filter(None, sources):
+            if isinstance(child, serializers.ModelSerializer):
+                paths += get_field_paths(child, f"{prefix}{source}__")
+            else:
+                paths.append(prefix + source)
+    return paths
+
+
+class QueryPlan:
+    """Columns and relations of one model that a set of paths reads.
+
+    Forward relations are joined, to-many relations are prefetched. A path
+    ending in an attribute that is not a model field (a property) loads
+    every column of its model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        self.all_columns = False
+        self.joined = {}
+        self.prefetched = {}
+
+    @classmethod
+    def for_paths(cls, model, paths):
+        plan = cls(model)
+        for path in paths:
+            plan.add(path)
+        return plan
+
+    def add(self, path):
+        name, _, rest = path.partition("__")
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            self.all_columns = True
+            return
+
+        has_column = field.concrete and not field.many_to_many
+        if has_column:
+            self.columns.add(name)
+        if not field.is_relation or (has_column and not rest):
+            return
+
+        if field.many_to_many or field.one_to_many:
+            plan = self.prefetched.setdefault(
+                name, QueryPlan(field.related_model)
+            )
+            if field.one_to_many:
+                # The prefetch matches rows by their foreign key.
+                plan.columns.add(field.field.name)
+        else:
+            plan = self.joined.setdefault(name, QueryPlan(field.related_model))
+        if rest:
+            plan.add(rest)
+
+    def get_lookups(self, prefix=""):
+        """only(), select_related() and prefetch_related() lookups"""
+        columns = self.columns
+        if self.all_columns:
+            columns = {
+                field.name for field in self.model._meta.concrete_fields
+            }
+        only = [prefix + column for column in sorted(columns)]
+        select_related, prefetch_related = [], []
+
+        for name, plan in self.joined.items():
+            select_related.append(prefix + name)
+            lookups = plan.get_lookups(f"{prefix}{name}__")
+            only += lookups[0]
+            select_related += lookups[1]
+            prefetch_related += lookups[2]
+
+        for name, plan in self.prefetched.items():
+            prefetch_related.append(Prefetch(
+                prefix + name,
+                queryset=plan.apply(plan.model._default_manager.all()),
+            ))
+        return only, select_related, prefetch_related
+
+    def apply(self, queryset):
+        """Replace the loading lookups of `queryset` with the plan's"""
+        only, select_related, prefetch_related = self.get_lookups()
+        queryset = queryset.select_related(None).prefetch_related(None)
+        queryset = queryset.only(*only)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
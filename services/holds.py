@@ -0,0 +1,188 @@
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+SEAT_KEY = "planetarium:hold:seat:{show_session_id}:{row}:{seat}"
+HOLD_KEY = "planetarium:hold:{hold_id}"
+SESSION_KEY = "planetarium:hold:session:{show_session_id}"
+SESSION_LOCK_KEY = "planetarium:hold:session-lock:{show_session_id}"
+# Longest time the session index may be locked, e.g. by a crashed worker.
+SESSION_LOCK_TIMEOUT = 5
+
+
+class SeatsUnavailable(Exception):
+    def __init__(self, seats):
+        super().__init__(f"Seats are already held: {seats}")
+        self.seats = seats
+
+
+class BaseSeatHoldStore:
+    """Storage of temporary seat holds.
+
+    A hold is a dict with ``id``, ``show_session``, ``user_id``, ``seats``
+    (list of ``[row, seat]``) and ``expires_at`` (unix time). Expired holds
+    are ignored on read, so stores do not need a cleanup job.
+    """
+
+    def hold(self, show_session_id, seats, user_id, ttl):
+        """Hold all `seats` or none of them; raise SeatsUnavailable."""
+        raise NotImplementedError
+
+    def get(self, hold_id):
+        raise NotImplementedError
+
+    def release(self, hold_id):
+        raise NotImplementedError
+
+    def holders(self, show_session_id, seats):
+        """Map each of the held `seats` to the user id holding it."""
+        raise NotImplementedError
+
+    def held_seats(self, show_session_id):
+        """Return every seat of the session under an active hold."""
+        raise NotImplementedError
+
+    @staticmethod
+    def is_active(hold):
+        return hold is not None and hold["expires_at"] > time.time()
+
+
+class CacheSeatHoldStore(BaseSeatHoldStore):
+    """Hold seats in the Django cache.
+
+    Every seat is claimed with an atomic ``cache.add`` of its own key, so two
+    customers can never hold the same seat. A per-session list of hold ids
+    draws seat maps; it is updated under a lock taken with ``cache.add`` and
+    pruned of expired holds lazily.
+    """
+
+    def __init__(self, cache_backend=cache):
+        self.cache = cache_backend
+
+    @staticmethod
+    def seat_key(show_session_id, row, seat):
+        return SEAT_KEY.format(
+            show_session_id=show_session_id, row=row, seat=seat
+        )
+
+    def hold(self, show_session_id, seats, user_id, ttl):
+        hold = {
+            "id": uuid.uuid4().hex,
+            "show_session": show_session_id,
+            "user_id": user_id,
+            "seats": [[row, seat] for row, seat in seats],
+            "expires_at": time.time() + ttl,
+        }
+
+        claimed = []
+        for row, seat in seats:
+            key = self.seat_key(show_session_id, row, seat)
+            if not self.cache.add(key, hold["id"], ttl):
+                self.release_seats(hold["id"], claimed)
+                # The seat may have been freed since; it is still reported.
+                raise SeatsUnavailable(self.unavailable_seats(
+                    show_session_id, seats
+                ) or [(row, seat)])
+            claimed.append(key)
+
+        self.cache.set(HOLD_KEY.format(hold_id=hold["id"]), hold, ttl)
+        session_key = SESSION_KEY.format(show_session_id=show_session_id)
+        with self.session_lock(show_session_id):
+            hold_ids = self.cache.get(session_key, [])
+            self.cache.set(session_key, hold_ids + [hold["id"]], ttl)
+        return hold
+
+    @contextmanager
+    def session_lock(self, show_session_id, blocking=True):
+        """Lock the hold index of the session; yield whether it is locked.
+
+        A lock left by a crashed worker expires after SESSION_LOCK_TIMEOUT.
+        """
+        key = SESSION_LOCK_KEY.format(show_session_id=show_session_id)
+        token = uuid.uuid4().hex
+        while not (locked := self.cache.add(key, token, SESSION_LOCK_TIMEOUT)):
+            if not blocking:
+                break
+            time.sleep(0.005)
+        try:
+            yield locked
+        finally:
+            if locked and self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def unavailable_seats(self, show_session_id, seats):
+        holders = self.holders(show_session_id, seats)
+        return [(row, seat) for row, seat in seats if (row, seat) in holders]
+
+    def get(self, hold_id):
+        hold = self.cache.get(HOLD_KEY.format(hold_id=hold_id))
+        return hold if self.is_active(hold) else None
+
+    def release(self, hold_id):
+        hold = self.cache.get(HOLD_KEY.format(hold_id=hold_id))
+        if hold is None:
+            return
+        self.release_seats(hold_id, [
+            self.seat_key(hold["show_session"], row, seat)
+            for row, seat in hold["seats"]
+        ])
+        self.cache.delete(HOLD_KEY.format(hold_id=hold_id))
+
+    def release_seats(self, hold_id, keys):
+        owned = self.cache.get_many(keys)
+        self.cache.delete_many(
+            [key for key, value in owned.items() if value == hold_id]
+        )
+
+    def get_holds(self, hold_ids):
+        holds = self.cache.get_many(
+            [HOLD_KEY.format(hold_id=hold_id) for hold_id in set(hold_ids)]
+        )
+        return {
+            hold["id"]: hold for hold in holds.values() if self.is_active(hold)
+        }
+
+    def holders(self, show_session_id, seats):
+        seat_keys = {
+            self.seat_key(show_session_id, row, seat): (row, seat)
+            for row, seat in seats
+        }
+        hold_ids = self.cache.get_many(seat_keys)
+        holds = self.get_holds(hold_ids.values())
+        return {
+            seat_keys[key]: holds[hold_id]["user_id"]
+            for key, hold_id in hold_ids.items()
+            if hold_id in holds
+        }
+
+    def held_seats(self, show_session_id):
+        session_key = SESSION_KEY.format(show_session_id=show_session_id)
+        hold_ids = self.cache.get(session_key, [])
+        holds = self.get_holds(hold_ids)
+        if len(holds) != len(hold_ids):
+            self.prune(show_session_id, set(hold_ids) - set(holds))
+        return {
+            (row, seat)
+            for hold in holds.values()
+            for row, seat in hold["seats"]
+        }
+
+    def prune(self, show_session_id, inactive_ids):
+        # Readers don't wait for the lock; a later read prunes instead.
+        with self.session_lock(show_session_id, blocking=False) as locked:
+            if not locked:
+                return
+            session_key = SESSION_KEY.format(show_session_id=show_session_id)
+            hold_ids = [
+                hold_id for hold_id in self.cache.get(session_key, [])
+                if hold_id not in inactive_ids
+            ]
+            self.cache.set(session_key, hold_ids, settings.SEAT_HOLD_TTL)
+
+
+def get_seat_hold_store():
+    return import_string(settings.SEAT_HOLD_STORE)()
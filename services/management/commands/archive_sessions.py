@@ -0,0 +1,69 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.archive import (
+    BATCH_SIZE,
+    archive_sessions,
+    get_archivable_sessions,
+)
+from services.models import Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Move past show sessions and their tickets into the archive tables "
+        "in batched transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Archive sessions that started more than this many days ago.",
+        )
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            help="Archive sessions that started before this date "
+                 "(YYYY-MM-DD) instead.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of sessions moved in one transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the sessions and tickets to archive.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+
+        if options["before"]:
+            before = datetime.combine(options["before"], time.min)
+        else:
+            before = datetime.now() - timedelta(days=options["days"])
+
+        if options["dry_run"]:
+            sessions = get_archivable_sessions(before)
+            tickets = Ticket.objects.filter(show_session__in=sessions)
+            self.stdout.write(
+                f"Would archive {sessions.count()} session(s) and "
+                f"{tickets.count()} ticket(s) before {before:%Y-%m-%d %H:%M}"
+            )
+            return
+
+        sessions, tickets = archive_sessions(
+            before, batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {sessions} session(s) and {tickets} ticket(s)"
+        ))
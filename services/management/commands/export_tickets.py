@@ -0,0 +1,83 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.exports import (
+    CHUNK_SIZE,
+    EXPORT_FORMATS,
+    export_rows,
+    get_ticket_export_querysets,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream sold tickets joined with reservation, user, session, show "
+        "and dome as CSV or NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-format",
+            choices=tuple(EXPORT_FORMATS),
+            default="csv",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to, stdout by default.",
+        )
+        parser.add_argument(
+            "--from",
+            dest="reserved_from",
+            type=date.fromisoformat,
+            help="First reservation date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--to",
+            dest="reserved_to",
+            type=date.fromisoformat,
+            help="Last reservation date (YYYY-MM-DD), inclusive.",
+        )
+        parser.add_argument("--dome", type=int, help="Dome id.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of tickets fetched and written at once.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        reserved_from = reserved_to = None
+        if options["reserved_from"]:
+            reserved_from = datetime.combine(
+                options["reserved_from"], time.min
+            )
+        if options["reserved_to"]:
+            reserved_to = datetime.combine(
+                options["reserved_to"] + timedelta(days=1), time.min
+            )
+
+        querysets = get_ticket_export_querysets(
+            reserved_from=reserved_from,
+            reserved_to=reserved_to,
+            dome=options["dome"],
+        )
+        chunks = export_rows(
+            querysets, options["output_format"], options["chunk_size"]
+        )
+
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(
+            options["output"], "w", newline="", encoding="utf-8"
+        ) as file:
+            file.writelines(chunks)
+        self.stderr.write(
+            self.style.SUCCESS(f"Exported tickets to {options['output']}")
+        )
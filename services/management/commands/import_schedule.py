@@ -0,0 +1,377 @@
+import csv
+import io
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from services.cache import bump_resource_version
+from services.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+)
+from services.search import update_search_vectors
+
+RECORD_TYPES = ("theme", "show", "dome", "session")
+
+
+class RecordError(Exception):
+    pass
+
+
+def required(record, key, max_length=None):
+    value = record.get(key)
+    if value is None or not str(value).strip():
+        raise RecordError(f"'{key}' is required")
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise RecordError(f"'{key}' is longer than {max_length} characters")
+    return value
+
+
+def positive_integer(record, key):
+    value = required(record, key)
+    if not value.isdigit() or int(value) < 1:
+        raise RecordError(f"'{key}' must be a positive integer")
+    return int(value)
+
+
+def max_length(model, field_name):
+    return model._meta.get_field(field_name).max_length
+
+
+class ScheduleImporter:
+    """Insert validated records chunk by chunk.
+
+    Themes, shows and domes are referenced by name (title for shows). Their
+    ids are kept in lookup maps, so records never query them one by one;
+    records of the catalog that already exist are skipped. Sessions are not
+    kept in memory.
+    """
+
+    def __init__(self, use_copy=False):
+        self.use_copy = use_copy
+        self.themes = self.lookup_map(ShowTheme, "name")
+        self.shows = self.lookup_map(AstronomyShow, "title")
+        self.domes = self.lookup_map(PlanetariumDome, "name")
+        self.counts = Counter()
+        self.errors = []
+
+    @staticmethod
+    def lookup_map(model, field_name):
+        # The first of several rows with the same name wins.
+        return dict(
+            model.objects.order_by("-id").values_list(field_name, "id")
+        )
+
+    def import_chunk(self, records):
+        records_by_type = defaultdict(list)
+        for line_number, record in records:
+            self.counts["records"] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise RecordError(str(record))
+                record_type = record.get("type")
+                if record_type not in RECORD_TYPES:
+                    raise RecordError(
+                        f"'type' must be one of: {', '.join(RECORD_TYPES)}"
+                    )
+            except RecordError as error:
+                self.errors.append((line_number, str(error)))
+                continue
+            records_by_type[record_type].append((line_number, record))
+
+        # Catalog records go first so sessions can refer to them.
+        self.import_themes(
+            self.clean(records_by_type["theme"], self.clean_theme)
+        )
+        self.import_shows(
+            self.clean(records_by_type["show"], self.clean_show)
+        )
+        self.import_domes(
+            self.clean(records_by_type["dome"], self.clean_dome)
+        )
+        self.import_sessions(
+            self.clean(records_by_type["session"], self.clean_session)
+        )
+
+    def clean(self, records, clean_record):
+        cleaned = []
+        for line_number, record in records:
+            try:
+                cleaned.append(clean_record(record))
+            except RecordError as error:
+                self.errors.append((line_number, str(error)))
+        return cleaned
+
+    def new_records(self, records, lookup, key):
+        """Skip records that exist already or repeat in the chunk"""
+        new = {}
+        for record in records:
+            if record[key] in lookup or record[key] in new:
+                self.counts["skipped"] += 1
+            else:
+                new[record[key]] = record
+        return list(new.values())
+
+    @staticmethod
+    def clean_theme(record):
+        return {
+            "name": required(record, "name", max_length(ShowTheme, "name"))
+        }
+
+    def import_themes(self, records):
+        themes = ShowTheme.objects.bulk_create(
+            ShowTheme(**record)
+            for record in self.new_records(records, self.themes, "name")
+        )
+        self.themes.update((theme.name, theme.id) for theme in themes)
+        self.counts["themes"] += len(themes)
+
+    def clean_show(self, record):
+        themes = record.get("themes") or []
+        if isinstance(themes, str):
+            themes = themes.split("|")
+        themes = {theme.strip() for theme in themes if theme.strip()}
+        unknown = themes - self.themes.keys()
+        if unknown:
+            raise RecordError(f"Unknown themes: {', '.join(sorted(unknown))}")
+
+        return {
+            "title": required(
+                record, "title", max_length(AstronomyShow, "title")
+            ),
+            "description": required(record, "description"),
+            "themes": [self.themes[theme] for theme in themes],
+        }
+
+    def import_shows(self, records):
+        records = self.new_records(records, self.shows, "title")
+        shows = AstronomyShow.objects.bulk_create(
+            AstronomyShow(
+                title=record["title"], description=record["description"]
+            )
+            for record in records
+        )
+        AstronomyShow.theme.through.objects.bulk_create(
+            AstronomyShow.theme.through(
+                astronomyshow_id=show.id, showtheme_id=theme_id
+            )
+            for show, record in zip(shows, records)
+            for theme_id in record["themes"]
+        )
+        update_search_vectors([show.id for show in shows])
+        self.shows.update((show.title, show.id) for show in shows)
+        self.counts["shows"] += len(shows)
+
+    @staticmethod
+    def clean_dome(record):
+        return {
+            "name": required(
+                record, "name", max_length(PlanetariumDome, "name")
+            ),
+            "rows": positive_integer(record, "rows"),
+            "seats_in_row": positive_integer(record, "seats_in_row"),
+        }
+
+    def import_domes(self, records):
+        domes = PlanetariumDome.objects.bulk_create(
+            PlanetariumDome(**record)
+            for record in self.new_records(records, self.domes, "name")
+        )
+        self.domes.update((dome.name, dome.id) for dome in domes)
+        self.counts["domes"] += len(domes)
+
+    def clean_session(self, record):
+        show = required(record, "show")
+        dome = required(record, "dome")
+        if show not in self.shows:
+            raise RecordError(f"Unknown show: {show}")
+        if dome not in self.domes:
+            raise RecordError(f"Unknown dome: {dome}")
+
+        try:
+            show_time = parse_datetime(required(record, "show_time"))
+        except ValueError:
+            show_time = None
+        if show_time is None:
+            raise RecordError("'show_time' must be an ISO 8601 datetime")
+        if settings.USE_TZ and timezone.is_naive(show_time):
+            show_time = timezone.make_aware(show_time)
+
+        return {
+            "astronomy_show_id": self.shows[show],
+            "planetarium_dome_id": self.domes[dome],
+            "show_time": show_time,
+        }
+
+    def import_sessions(self, records):
+        if self.use_copy:
+            self.copy_sessions(records)
+        else:
+            ShowSession.objects.bulk_create(
+                ShowSession(**record) for record in records
+            )
+        self.counts["sessions"] += len(records)
+
+    @staticmethod
+    def copy_sessions(records):
+        fields = ("astronomy_show_id", "planetarium_dome_id", "show_time")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow(
+                [record[field] for field in fields[:2]]
+                + [record["show_time"].isoformat(), 0]
+            )
+        buffer.seek(0)
+
+        columns = ", ".join(
+            connection.ops.quote_name(column)
+            for column in (*fields, "tickets_sold")
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(ShowSession._meta.db_table)}"
+                f" ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        "Import show themes, shows, domes and sessions from a CSV or "
+        "JSON Lines file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help=(
+                'Input file, "-" for stdin. Every record has a "type" '
+                "(theme, show, dome or session) and the fields of its type: "
+                "name; title, description, themes (names separated by |); "
+                "name, rows, seats_in_row; show, dome, show_time."
+            ),
+        )
+        parser.add_argument(
+            "--format",
+            dest="input_format",
+            choices=("csv", "jsonl"),
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of records validated and inserted at once.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and import, then roll everything back.",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Insert sessions with PostgreSQL COPY instead of INSERT.",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="Stop after this many invalid records.",
+        )
+
+    @staticmethod
+    def read_records(stream, input_format):
+        """Yield (line number, record) pairs, the error for broken lines"""
+        if input_format == "csv":
+            for line_number, row in enumerate(csv.DictReader(stream), start=2):
+                yield line_number, row
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                record = error
+            if not isinstance(record, (dict, Exception)):
+                record = ValueError("Record must be a JSON object")
+            yield line_number, record
+
+    def report(self, importer, started_at):
+        counts = importer.counts
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            f"{counts['records']} records "
+            f"({counts['records'] / max(elapsed, 1e-6):.0f}/s): "
+            f"{counts['themes']} themes, {counts['shows']} shows, "
+            f"{counts['domes']} domes, {counts['sessions']} sessions, "
+            f"{counts['skipped']} skipped, {len(importer.errors)} errors"
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("--copy requires PostgreSQL")
+
+        path = options["path"]
+        input_format = options["input_format"] or (
+            "csv" if path.endswith(".csv") else "jsonl"
+        )
+        stream = (
+            sys.stdin if path == "-"
+            else open(path, newline="", encoding="utf-8")
+        )
+
+        started_at = time.monotonic()
+        try:
+            with transaction.atomic():
+                importer = ScheduleImporter(use_copy=options["copy"])
+                records = self.read_records(stream, input_format)
+                while chunk := list(islice(records, options["chunk_size"])):
+                    importer.import_chunk(chunk)
+                    if options["verbosity"] >= 1:
+                        self.report(importer, started_at)
+                    if len(importer.errors) >= options["max_errors"]:
+                        break
+
+                for line_number, error in importer.errors:
+                    self.stderr.write(f"Line {line_number}: {error}")
+                if importer.errors:
+                    raise CommandError(
+                        f"{len(importer.errors)} invalid record(s), "
+                        "nothing was imported"
+                    )
+
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+                else:
+                    transaction.on_commit(
+                        lambda: bump_resource_version(
+                            "show_themes", "shows", "domes"
+                        )
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if options["dry_run"]:
+            self.stdout.write(
+                self.style.SUCCESS("Dry run finished, nothing was imported")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Import finished"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.analytics import BATCH_SIZE, refresh_occupancy
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the occupancy rollups of sessions with tickets changed since "
+        "the last refresh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute the rollups of every session.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of sessions rolled up at once.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        refreshed = refresh_occupancy(
+            rebuild=options["rebuild"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} session(s)")
+        )
@@ -0,0 +1,451 @@
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from services.cache import bump_resource_version
+from services.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from services.search import update_search_vectors
+
+THEME_NAMES = (
+    "Galaxies", "Stars", "Planets", "Black holes", "Nebulae", "Comets",
+    "Moons", "Exoplanets", "Cosmology", "Constellations", "Space travel",
+    "Solar system",
+)
+TITLE_WORDS = (
+    ("Journey to", "Secrets of", "Beyond", "Life of", "Dance of", "Light of"),
+    ("the Milky Way", "Andromeda", "Saturn", "the Sun", "Orion", "Mars",
+     "the Big Bang", "Jupiter", "dark matter", "the northern lights"),
+)
+SHOW_HOURS = (10, 12, 14, 16, 18, 19, 20, 21)
+# Exponent of the Zipf distribution of show popularity.
+ZIPF_EXPONENT = 1.1
+# Weekend days get this many times more sessions and visitors.
+WEEKEND_FACTOR = 1.6
+# Weights of reservation sizes 1, 2, 3...
+RESERVATION_SIZES = (25, 40, 15, 12, 5, 3)
+# PostgreSQL allows this many parameters per query.
+MAX_QUERY_PARAMS = 65535
+
+
+def batched(items, batch_size):
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+
+class SyntheticData:
+    """Generate a planetarium dataset from a seeded random generator.
+
+    Show popularity follows a Zipf distribution; weekends have more
+    sessions and visitors. The number of tickets of a session follows its
+    demand, capped by the dome capacity, so domes are partially sold.
+    Reservations and tickets are generated session by session and written
+    in batches, so they are never all in memory.
+    """
+
+    def __init__(self, seed, batch_size, use_copy=False):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+
+    def create_users(self, count, password):
+        # One hash for everyone: hashing is slow on purpose.
+        password = make_password(password)
+        users = get_user_model().objects.bulk_create(
+            (
+                get_user_model()(
+                    email=f"seed{self.seed}.user{number}@example.com",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return [user.id for user in users]
+
+    def create_themes(self, count):
+        return ShowTheme.objects.bulk_create(
+            ShowTheme(
+                name=THEME_NAMES[number % len(THEME_NAMES)]
+                + (f" {number // len(THEME_NAMES)}"
+                   if number >= len(THEME_NAMES) else "")
+            )
+            for number in range(count)
+        )
+
+    def create_shows(self, count, themes):
+        shows = AstronomyShow.objects.bulk_create(
+            (
+                AstronomyShow(
+                    title=(
+                        f"{self.random.choice(TITLE_WORDS[0])} "
+                        f"{self.random.choice(TITLE_WORDS[1])} {number}"
+                    ),
+                    description=f"Synthetic show number {number}.",
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        AstronomyShow.theme.through.objects.bulk_create(
+            (
+                AstronomyShow.theme.through(
+                    astronomyshow_id=show.id, showtheme_id=theme.id
+                )
+                for show in shows
+                for theme in self.random.sample(
+                    themes, min(self.random.randint(1, 3), len(themes))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        for batch in batched(shows, self.batch_size):
+            update_search_vectors(show.id for show in batch)
+        return shows
+
+    def create_domes(self, count):
+        return PlanetariumDome.objects.bulk_create(
+            PlanetariumDome(
+                name=f"Dome {self.seed}-{number}",
+                rows=self.random.randint(8, 30),
+                seats_in_row=self.random.randint(10, 40),
+            )
+            for number in range(count)
+        )
+
+    def popularity(self, shows):
+        ranks = list(range(1, len(shows) + 1))
+        self.random.shuffle(ranks)
+        return {
+            show.id: 1 / rank ** ZIPF_EXPONENT
+            for show, rank in zip(shows, ranks)
+        }
+
+    @staticmethod
+    def weekend_factor(day):
+        return WEEKEND_FACTOR if day.weekday() >= 5 else 1
+
+    def plan_sessions(self, count, shows, domes, start, days, tickets):
+        """Sessions with tickets_sold set to the tickets to generate"""
+        days = [start + timedelta(days=number) for number in range(days)]
+        session_days = sorted(self.random.choices(
+            days, weights=[self.weekend_factor(day) for day in days], k=count
+        ))
+        popularity = self.popularity(shows)
+        show_choices = self.random.choices(
+            shows, weights=[popularity[show.id] for show in shows], k=count
+        )
+
+        sessions, demands = [], []
+        for day, show in zip(session_days, show_choices):
+            show_time = datetime.combine(day, datetime.min.time()).replace(
+                hour=self.random.choice(SHOW_HOURS)
+            )
+            if settings.USE_TZ:
+                show_time = timezone.make_aware(show_time)
+            sessions.append(ShowSession(
+                astronomy_show=show,
+                planetarium_dome=self.random.choice(domes),
+                show_time=show_time,
+            ))
+            demands.append(
+                popularity[show.id]
+                * self.weekend_factor(day)
+                * self.random.uniform(0.5, 1.5)
+            )
+
+        self.distribute_tickets(sessions, demands, tickets)
+        return ShowSession.objects.bulk_create(
+            sessions, batch_size=self.batch_size
+        )
+
+    @staticmethod
+    def distribute_tickets(sessions, demands, tickets):
+        """Split tickets by demand; sold out sessions pass the rest on"""
+        for show_session in sessions:
+            show_session.tickets_sold = 0
+        open_sessions = list(zip(sessions, demands))
+        remaining = tickets
+        while remaining > 0 and open_sessions:
+            total_demand = sum(demand for _, demand in open_sessions) or 1
+            share = remaining / total_demand
+            for show_session, demand in open_sessions:
+                show_session.tickets_sold = min(
+                    show_session.tickets_sold + max(round(share * demand), 1),
+                    show_session.planetarium_dome.capacity,
+                )
+            remaining = tickets - sum(
+                show_session.tickets_sold for show_session in sessions
+            )
+            open_sessions = [
+                (show_session, demand)
+                for show_session, demand in open_sessions
+                if show_session.tickets_sold
+                < show_session.planetarium_dome.capacity
+            ]
+
+        # Rounding up may overshoot by a ticket per session.
+        oversold = sorted(
+            sessions, key=lambda show_session: -show_session.tickets_sold
+        )[:max(-remaining, 0)]
+        for show_session in oversold:
+            show_session.tickets_sold -= 1
+
+    def generate_sales(self, sessions, user_ids):
+        """Yield (reservation row, ticket rows) in session order"""
+        reservation_id = self.next_id(Reservation)
+        ticket_id = self.next_id(Ticket)
+        sizes = range(1, len(RESERVATION_SIZES) + 1)
+        now = timezone.now()
+
+        for show_session in sessions:
+            seats_in_row = show_session.planetarium_dome.seats_in_row
+            seats = self.random.sample(
+                range(show_session.planetarium_dome.capacity),
+                show_session.tickets_sold,
+            )
+            while seats:
+                size = self.random.choices(sizes, RESERVATION_SIZES)[0]
+                reserved, seats = seats[:size], seats[size:]
+                created_at = min(
+                    show_session.show_time - timedelta(
+                        seconds=self.random.randint(600, 60 * 86400)
+                    ),
+                    now,
+                )
+                reservation = (
+                    reservation_id,
+                    created_at,
+                    self.random.choice(user_ids),
+                )
+                tickets = [
+                    (
+                        ticket_id + number,
+                        seat // seats_in_row + 1,
+                        seat % seats_in_row + 1,
+                        show_session.id,
+                        reservation_id,
+                    )
+                    for number, seat in enumerate(reserved)
+                ]
+                reservation_id += 1
+                ticket_id += len(tickets)
+                yield reservation, tickets
+
+    @staticmethod
+    def next_id(model):
+        return (model.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+
+    def insert_rows(self, model, columns, rows):
+        """Insert raw rows with COPY or multi-row INSERTs.
+
+        Rows skip the model, so auto_now_add keeps the generated
+        reservation dates.
+        """
+        table = connection.ops.quote_name(model._meta.db_table)
+        column_names = ", ".join(
+            connection.ops.quote_name(model._meta.get_field(column).column)
+            for column in columns
+        )
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    [
+                        value.isoformat() if isinstance(value, datetime)
+                        else value
+                        for value in row
+                    ]
+                    for row in rows
+                )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table} ({column_names}) "
+                    f"FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+                return
+
+            rows = [
+                [
+                    connection.ops.adapt_datetimefield_value(value)
+                    if isinstance(value, datetime) else value
+                    for value in row
+                ]
+                for row in rows
+            ]
+            batch_size = min(
+                connection.ops.bulk_batch_size(columns, rows),
+                MAX_QUERY_PARAMS // len(columns),
+            )
+            placeholder = f"({', '.join(['%s'] * len(columns))})"
+            for batch in batched(rows, batch_size):
+                cursor.execute(
+                    f"INSERT INTO {table} ({column_names}) VALUES "
+                    + ", ".join([placeholder] * len(batch)),
+                    [value for row in batch for value in row],
+                )
+
+    def insert_batch(self, reservations, tickets):
+        self.insert_rows(
+            Reservation, ("id", "created_at", "user"), reservations
+        )
+        self.insert_rows(
+            Ticket,
+            ("id", "row", "seat", "show_session", "reservation"),
+            tickets,
+        )
+
+    def insert_sales(self, sales, report):
+        """Insert reservations with their tickets about batch_size at a time"""
+        reservations, tickets = [], []
+        reservation_count = ticket_count = 0
+        for reservation, reservation_tickets in sales:
+            reservations.append(reservation)
+            tickets += reservation_tickets
+            if len(tickets) < self.batch_size:
+                continue
+            self.insert_batch(reservations, tickets)
+            reservation_count += len(reservations)
+            ticket_count += len(tickets)
+            report(reservation_count, ticket_count)
+            reservations, tickets = [], []
+
+        if reservations:
+            self.insert_batch(reservations, tickets)
+            report(
+                reservation_count + len(reservations),
+                ticket_count + len(tickets),
+            )
+
+        # Rows were inserted with explicit ids.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Reservation, Ticket]
+            ):
+                cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, themes, shows, domes, sessions and tickets from a "
+        "deterministic seed with bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random generator; a seed can be used once.",
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--themes", type=int, default=20)
+        parser.add_argument("--shows", type=int, default=200)
+        parser.add_argument("--domes", type=int, default=5)
+        parser.add_argument("--sessions", type=int, default=5000)
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=1_000_000,
+            help="Tickets to sell; fewer if popular sessions sell out.",
+        )
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            help="First day of sessions (YYYY-MM-DD), today by default.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=180,
+            help="Number of days sessions are spread over.",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of every generated user.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of rows inserted at once.",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Insert reservations and tickets with PostgreSQL COPY.",
+        )
+
+    def handle(self, *args, **options):
+        for name in ("users", "themes", "shows", "domes", "sessions", "days"):
+            if options[name] < 1:
+                raise CommandError(f"--{name} must be positive")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("--copy requires PostgreSQL")
+        if get_user_model().objects.filter(
+            email=f"seed{options['seed']}.user0@example.com"
+        ).exists():
+            raise CommandError(
+                f"Seed {options['seed']} was used already, pick another --seed"
+            )
+
+        data = SyntheticData(
+            options["seed"], options["batch_size"], use_copy=options["copy"]
+        )
+        started_at = time.monotonic()
+
+        def report(reservations, tickets):
+            if options["verbosity"] >= 1:
+                elapsed = max(time.monotonic() - started_at, 1e-6)
+                self.stdout.write(
+                    f"{reservations} reservations, {tickets} tickets "
+                    f"({tickets / elapsed:.0f}/s)"
+                )
+
+        with transaction.atomic():
+            user_ids = data.create_users(options["users"], options["password"])
+            themes = data.create_themes(options["themes"])
+            shows = data.create_shows(options["shows"], themes)
+            domes = data.create_domes(options["domes"])
+            sessions = data.plan_sessions(
+                options["sessions"],
+                shows,
+                domes,
+                options["start"] or date.today(),
+                options["days"],
+                options["tickets"],
+            )
+            data.insert_sales(data.generate_sales(sessions, user_ids), report)
+            transaction.on_commit(
+                lambda: bump_resource_version("show_themes", "shows", "domes")
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} users, {len(themes)} themes, "
+            f"{len(shows)} shows, {len(domes)} domes, {len(sessions)} sessions "
+            f"and {sum(session.tickets_sold for session in sessions)} tickets"
+        ))
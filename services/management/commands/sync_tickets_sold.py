@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from services.models import ShowSession, Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the denormalized ShowSession.tickets_sold counters "
+        "against the ticket table and optionally repair them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Overwrite drifted counters with the actual ticket count.",
+        )
+
+    @staticmethod
+    def repair(show_session_id):
+        # Recount inside the UPDATE so tickets sold meanwhile are included.
+        actual = (
+            Ticket.objects.filter(show_session=OuterRef("pk"))
+            .values("show_session")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        ShowSession.objects.filter(pk=show_session_id).update(
+            tickets_sold=Coalesce(Subquery(actual), 0)
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            ShowSession.objects.order_by()
+            .annotate(actual=Count("tickets"))
+            .exclude(tickets_sold=F("actual"))
+            .values_list("id", "tickets_sold", "actual")
+        )
+
+        drift_count = 0
+        for show_session_id, tickets_sold, actual in drifted:
+            drift_count += 1
+            self.stdout.write(
+                f"Session {show_session_id}: "
+                f"counter {tickets_sold}, actual {actual}"
+            )
+            if options["repair"]:
+                self.repair(show_session_id)
+
+        if not drift_count:
+            self.stdout.write(self.style.SUCCESS("No drift found"))
+        elif options["repair"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Repaired {drift_count} session(s)")
+            )
+        else:
+            raise CommandError(
+                f"{drift_count} session(s) drifted, run with --repair"
+            )
@@ -2,19 +2,63 @@ import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
+    help = (
+        "Wait until the database accepts connections and answers a query, "
+        "retrying with exponential backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Alias of the database to wait for.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up.",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Longest pause between attempts, in seconds.",
+        )
+
+    @staticmethod
+    def probe_database(connection):
+        # connections[alias] is lazy, only a query really connects.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
 
     def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+        connection = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = 0.1
+
+        while True:
             try:
-                db_conn = connections["default"]
-            except OperationalError:
-                self.stdout.write("Database unavailable")
-                time.sleep(1)
+                self.probe_database(connection)
+                break
+            except OperationalError as error:
+                connection.close()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']}s: "
+                        f"{error}"
+                    )
+                self.stdout.write(
+                    f"Database unavailable, retrying in {delay:.1f}s"
+                )
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, options["max_delay"])
 
         self.stdout.write(self.style.SUCCESS("Database available!"))
@@ -0,0 +1,49 @@
+# Generated by Django 4.1 on 2026-10-17 04:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_seats(apps, schema_editor):
+    """Refuse to add the constraint over seats sold more than once.
+
+    Which of the tickets to keep is a decision for the staff, so they are
+    listed instead of being deleted here.
+    """
+    Ticket = apps.get_model("services", "Ticket")
+    duplicates = list(
+        Ticket.objects.using(schema_editor.connection.alias)
+        .values("show_session_id", "row", "seat")
+        .annotate(tickets=Count("id"))
+        .filter(tickets__gt=1)
+        .order_by("show_session_id", "row", "seat")[:20]
+    )
+    if duplicates:
+        seats = ", ".join(
+            f"session {seat['show_session_id']} row {seat['row']} "
+            f"seat {seat['seat']} ({seat['tickets']} tickets)"
+            for seat in duplicates
+        )
+        raise RuntimeError(
+            "Cannot add unique_ticket_seat_per_session: seats are sold more "
+            f"than once: {seats}. Delete the extra tickets and migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_alter_astronomyshow_theme'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_seats, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='ticket',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(fields=('show_session', 'row', 'seat'), name='unique_ticket_seat_per_session'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1 on 2026-10-17 04:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tickets_sold(apps, schema_editor):
+    ShowSession = apps.get_model("services", "ShowSession")
+    Ticket = apps.get_model("services", "Ticket")
+    tickets_sold = (
+        Ticket.objects.filter(show_session=OuterRef("pk"))
+        .values("show_session")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    ShowSession.objects.update(
+        tickets_sold=Coalesce(Subquery(tickets_sold), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_ticket_unique_seat_per_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showsession',
+            name='tickets_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tickets_sold, migrations.RunPython.noop),
+    ]
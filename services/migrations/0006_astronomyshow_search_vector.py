@@ -0,0 +1,60 @@
+# Generated by Django 4.1 on 2026-10-17 04:26
+
+from django.db import migrations
+from django.db.models import Value
+import services.fields
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX services_astronomyshow_search_vector_gin "
+        "ON services_astronomyshow USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "DROP INDEX IF EXISTS services_astronomyshow_search_vector_gin"
+    )
+
+
+def fill_search_vectors(apps, schema_editor):
+    AstronomyShow = apps.get_model("services", "AstronomyShow")
+    postgresql = schema_editor.connection.vendor == "postgresql"
+    if postgresql:
+        from django.contrib.postgres.search import SearchVector
+
+    for show in AstronomyShow.objects.prefetch_related("theme"):
+        themes = " ".join(sorted(theme.name for theme in show.theme.all()))
+        shows = AstronomyShow.objects.filter(pk=show.pk)
+        if postgresql:
+            shows.update(search_vector=(
+                SearchVector("title", weight="A", config="english")
+                + SearchVector(Value(themes), weight="B", config="english")
+                + SearchVector("description", weight="C", config="english")
+            ))
+        else:
+            shows.update(search_vector=" ".join(
+                (show.title, themes, show.description)
+            ).lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_showsession_tickets_sold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='astronomyshow',
+            name='search_vector',
+            field=services.fields.SearchDocumentField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
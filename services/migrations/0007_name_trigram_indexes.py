@@ -0,0 +1,36 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ("services_showtheme_name_trgm", "services_showtheme"),
+    ("services_planetariumdome_name_trgm", "services_planetariumdome"),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, table in TRIGRAM_INDEXES:
+        # name__icontains compiles to UPPER("name"::text) LIKE UPPER(%s).
+        schema_editor.execute(
+            f"CREATE INDEX {index_name} ON {table} "
+            f"USING gin ((UPPER(name::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index_name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_astronomyshow_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
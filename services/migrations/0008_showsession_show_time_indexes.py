@@ -0,0 +1,25 @@
+# Generated by Django 4.1 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0007_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='showsession',
+            index=models.Index(fields=['show_time'], name='services_sh_show_ti_556fee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showsession',
+            index=models.Index(fields=['planetarium_dome', 'show_time'], name='services_sh_planeta_1bd8cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showsession',
+            index=models.Index(fields=['astronomy_show', 'show_time'], name='services_sh_astrono_7ea92b_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0008_showsession_show_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['created_at'], name='services_re_created_8115a4_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.1 on 2026-10-17 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_reservation_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=63, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SessionOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('show_session_id', models.IntegerField()),
+                ('day', models.DateField()),
+                ('show_id', models.IntegerField()),
+                ('show_title', models.CharField(max_length=255)),
+                ('dome_id', models.IntegerField()),
+                ('dome_name', models.CharField(max_length=63)),
+                ('capacity', models.PositiveIntegerField()),
+                ('tickets_sold', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThemeOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('show_session_id', models.IntegerField()),
+                ('day', models.DateField()),
+                ('show_id', models.IntegerField()),
+                ('show_title', models.CharField(max_length=255)),
+                ('dome_id', models.IntegerField()),
+                ('dome_name', models.CharField(max_length=63)),
+                ('capacity', models.PositiveIntegerField()),
+                ('tickets_sold', models.PositiveIntegerField()),
+                ('theme_id', models.IntegerField()),
+                ('theme_name', models.CharField(max_length=63)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='themeoccupancy',
+            index=models.Index(fields=['day'], name='services_th_day_03e30e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='themeoccupancy',
+            constraint=models.UniqueConstraint(fields=('show_session_id', 'theme_id'), name='unique_theme_occupancy'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionoccupancy',
+            index=models.Index(fields=['day'], name='services_se_day_295115_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sessionoccupancy',
+            constraint=models.UniqueConstraint(fields=('show_session_id',), name='unique_session_occupancy'),
+        ),
+    ]
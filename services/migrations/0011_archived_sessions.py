@@ -0,0 +1,45 @@
+# Generated by Django 4.1 on 2026-10-17 05:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0010_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedShowSession',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('show_time', models.DateTimeField()),
+                ('tickets_sold', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('astronomy_show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_sessions', to='services.astronomyshow')),
+                ('planetarium_dome', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_sessions', to='services.planetariumdome')),
+            ],
+            options={
+                'ordering': ['-show_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('row', models.IntegerField()),
+                ('seat', models.IntegerField()),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tickets', to='services.reservation')),
+                ('show_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='services.archivedshowsession')),
+            ],
+            options={
+                'ordering': ('row', 'seat'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedshowsession',
+            index=models.Index(fields=['show_time'], name='services_ar_show_ti_ed2916_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1 on 2026-10-17 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0011_archived_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyShowSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('show_session_id', models.IntegerField()),
+            ],
+        ),
+        migrations.DeleteModel(
+            name='AnalyticsWatermark',
+        ),
+    ]
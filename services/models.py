@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
+
+from .fields import SearchDocumentField
 
 
 class ShowTheme(models.Model):
@@ -17,6 +20,7 @@ class AstronomyShow(models.Model):
     theme = models.ManyToManyField(
         ShowTheme
     )
+    search_vector = SearchDocumentField(null=True, editable=False)
 
     def __str__(self):
         return f"Show: {self.title}, theme: {self.theme}"
@@ -44,6 +48,12 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["created_at"])]
+
+    @property
+    def ticket_history(self) -> list:
+        """Live tickets followed by the archived ones."""
+        return [*self.tickets.all(), *self.archived_tickets.all()]
 
 
 class ShowSession(models.Model):
@@ -53,9 +63,37 @@ class ShowSession(models.Model):
         PlanetariumDome, on_delete=models.CASCADE, related_name="sessions"
     )
     show_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-show_time"]
+        indexes = [
+            models.Index(fields=["show_time"]),
+            models.Index(fields=["planetarium_dome", "show_time"]),
+            models.Index(fields=["astronomy_show", "show_time"]),
+        ]
+
+    @property
+    def tickets_available(self) -> int:
+        return self.planetarium_dome.capacity - self.tickets_sold
+
+    @staticmethod
+    def change_tickets_sold(deltas):
+        """Atomically apply {show_session_id: delta} to the sold counters.
+
+        The sessions are queued for the next occupancy refresh too.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        ShowSession.objects.filter(pk__in=deltas).update(
+            tickets_sold=F("tickets_sold") + Case(
+                *[When(pk=pk, then=delta) for pk, delta in deltas.items()]
+            )
+        )
+        DirtyShowSession.objects.bulk_create(
+            DirtyShowSession(show_session_id=pk) for pk in deltas
+        )
 
     def __str__(self):
         return (f"Show: {self.astronomy_show},"
@@ -93,6 +131,20 @@ class Ticket(models.Model):
                     }
                 )
 
+    @staticmethod
+    def taken_seats(seats):
+        """Return which of (show_session_id, row, seat) are already sold."""
+        query = Q()
+        for show_session_id, row, seat in seats:
+            query |= Q(show_session_id=show_session_id, row=row, seat=seat)
+        if not query:
+            return set()
+        return set(
+            Ticket.objects.filter(query).values_list(
+                "show_session_id", "row", "seat"
+            )
+        )
+
     def clean(self):
         Ticket.validate_ticket(
             self.row,
@@ -109,9 +161,10 @@ class Ticket(models.Model):
         update_fields=None,
     ):
         self.full_clean()
-        return super(Ticket, self).save(
-            force_insert, force_update, using, update_fields
-        )
+        with transaction.atomic(using=using):
+            return super(Ticket, self).save(
+                force_insert, force_update, using, update_fields
+            )
     
     def __str__(self):
         return (f"Ticket: {self.id},"
@@ -119,7 +172,125 @@ class Ticket(models.Model):
                 f"Session info: {self.show_session}\n")
 
     class Meta:
-        unique_together = (
-            "show_session", "reservation", "row", "seat"
-        )
+        constraints = [
+            models.UniqueConstraint(
+                fields=["show_session", "row", "seat"],
+                name="unique_ticket_seat_per_session",
+            ),
+        ]
+        ordering = ("row", "seat")
+
+
+class ArchivedShowSession(models.Model):
+    """A past ShowSession moved out of the live tables.
+
+    The original id is kept, so exports and analytics see the same ids
+    before and after archiving. Filled by the archive_sessions command.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    astronomy_show = models.ForeignKey(
+        AstronomyShow, on_delete=models.CASCADE,
+        related_name="archived_sessions",
+    )
+    planetarium_dome = models.ForeignKey(
+        PlanetariumDome, on_delete=models.CASCADE,
+        related_name="archived_sessions",
+    )
+    show_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-show_time"]
+        indexes = [models.Index(fields=["show_time"])]
+
+    @property
+    def tickets_available(self) -> int:
+        return self.planetarium_dome.capacity - self.tickets_sold
+
+    def __str__(self):
+        return (f"Archived show: {self.astronomy_show},"
+                f"{self.planetarium_dome},"
+                f"at time: {self.show_time}")
+
+
+class ArchivedTicket(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    show_session = models.ForeignKey(
+        ArchivedShowSession, on_delete=models.CASCADE, related_name="tickets"
+    )
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.CASCADE,
+        related_name="archived_tickets",
+    )
+
+    class Meta:
         ordering = ("row", "seat")
+
+    def __str__(self):
+        return (f"Archived ticket: {self.id},"
+                f"(row: {self.row}, seat: {self.seat}).")
+
+
+class OccupancyRollup(models.Model):
+    """Sold seats of a show session, copied out of the transactional tables.
+
+    Ids are plain integers and names are denormalized, so analytics never
+    join the catalog and rows outlive deleted sessions. Filled by the
+    refresh_analytics command.
+    """
+
+    show_session_id = models.IntegerField()
+    day = models.DateField()
+    show_id = models.IntegerField()
+    show_title = models.CharField(max_length=255)
+    dome_id = models.IntegerField()
+    dome_name = models.CharField(max_length=63)
+    capacity = models.PositiveIntegerField()
+    tickets_sold = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class SessionOccupancy(OccupancyRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["show_session_id"],
+                name="unique_session_occupancy",
+            ),
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+
+class ThemeOccupancy(OccupancyRollup):
+    """SessionOccupancy repeated for every theme of the show."""
+
+    theme_id = models.IntegerField()
+    theme_name = models.CharField(max_length=63)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["show_session_id", "theme_id"],
+                name="unique_theme_occupancy",
+            ),
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+
+class DirtyShowSession(models.Model):
+    """Show session whose tickets changed since its occupancy rollup.
+
+    Added in the transaction that changes the tickets, so it commits with
+    them whatever their ids, and removed by the refresh_analytics command.
+    """
+
+    show_session_id = models.IntegerField()
+
+    def __str__(self):
+        return f"Show session {self.show_session_id}"
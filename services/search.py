@@ -0,0 +1,108 @@
+from functools import reduce
+from operator import and_
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    Q,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Concat, Length, Lower
+
+from services.models import AstronomyShow
+
+SEARCH_CONFIG = "english"
+
+
+def get_theme_names(show_ids):
+    theme_names = {show_id: [] for show_id in show_ids}
+    links = AstronomyShow.theme.through.objects.filter(
+        astronomyshow_id__in=show_ids
+    ).values_list("astronomyshow_id", "showtheme__name")
+    for show_id, name in links:
+        theme_names[show_id].append(name)
+    return {
+        show_id: " ".join(sorted(names))
+        for show_id, names in theme_names.items()
+    }
+
+
+def update_search_vectors(show_ids):
+    """Rebuild the stored search document of the given shows in one UPDATE."""
+    show_ids = list(show_ids)
+    if not show_ids:
+        return
+
+    themes = Case(
+        *[
+            When(pk=show_id, then=Value(names))
+            for show_id, names in get_theme_names(show_ids).items()
+        ],
+        default=Value(""),
+        output_field=TextField(),
+    )
+    if connection.vendor == "postgresql":
+        search_vector = (
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(themes, weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        )
+    else:
+        search_vector = Lower(Concat(
+            "title", Value(" "), themes, Value(" "), "description",
+            output_field=TextField(),
+        ))
+    AstronomyShow.objects.filter(pk__in=show_ids).update(
+        search_vector=search_vector
+    )
+
+
+def search_shows(queryset, text):
+    """Filter shows matching `text` and order them by relevance."""
+    if connection.vendor == "postgresql":
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "id")
+        )
+
+    terms = text.lower().split()
+    if not terms:
+        return queryset
+    return (
+        queryset.filter(reduce(
+            and_, (Q(search_vector__contains=term) for term in terms)
+        ))
+        .annotate(rank=Case(
+            When(title__icontains=text, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .order_by("-rank", "id")
+    )
+
+
+def filter_by_name(queryset, name):
+    """Filter by a substring of `name`, most similar names first.
+
+    On PostgreSQL the ``icontains`` lookup is served by the trigram index on
+    ``UPPER(name)`` and results are ordered by trigram similarity; elsewhere
+    shorter names (closer to the searched text) come first.
+    """
+    queryset = queryset.filter(name__icontains=name)
+    if connection.vendor == "postgresql":
+        return queryset.annotate(
+            similarity=TrigramSimilarity("name", name)
+        ).order_by("-similarity", "id")
+    return queryset.order_by(Length("name"), "id")
@@ -0,0 +1,95 @@
+import base64
+
+from services.holds import get_seat_hold_store
+
+
+class SeatMap:
+    """Occupancy of a dome as a bitset, one bit per seat in row-major order.
+
+    Bit ``(row - 1) * seats_in_row + (seat - 1)`` is set when the seat is
+    sold or held; bits are packed most significant first.
+    """
+
+    ENCODINGS = ("bitmap", "rle")
+
+    def __init__(self, rows, seats_in_row, taken_seats=()):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        self.bits = bytearray((rows * seats_in_row + 7) // 8)
+        self.taken = 0
+        self.held = 0
+        for row, seat in taken_seats:
+            self.take(row, seat)
+
+    @classmethod
+    def for_session(cls, show_session):
+        dome = show_session.planetarium_dome
+        prefetched = getattr(
+            show_session, "_prefetched_objects_cache", {}
+        ).get("tickets")
+        if prefetched is not None:
+            taken_seats = ((ticket.row, ticket.seat) for ticket in prefetched)
+        else:
+            taken_seats = show_session.tickets.values_list("row", "seat")
+        seat_map = cls(dome.rows, dome.seats_in_row, taken_seats)
+        for row, seat in get_seat_hold_store().held_seats(show_session.id):
+            seat_map.hold(row, seat)
+        return seat_map
+
+    def _position(self, row, seat):
+        if not (1 <= row <= self.rows and 1 <= seat <= self.seats_in_row):
+            raise ValueError(f"Seat ({row}, {seat}) is outside of the dome")
+        index = (row - 1) * self.seats_in_row + (seat - 1)
+        return index >> 3, 0x80 >> (index & 7)
+
+    def is_taken(self, row, seat):
+        byte, mask = self._position(row, seat)
+        return bool(self.bits[byte] & mask)
+
+    def take(self, row, seat):
+        byte, mask = self._position(row, seat)
+        if not self.bits[byte] & mask:
+            self.bits[byte] |= mask
+            self.taken += 1
+
+    def hold(self, row, seat):
+        byte, mask = self._position(row, seat)
+        if not self.bits[byte] & mask:
+            self.bits[byte] |= mask
+            self.held += 1
+
+    def to_base64(self):
+        return base64.b64encode(bytes(self.bits)).decode("ascii")
+
+    def to_rle(self):
+        """Encode every row as run lengths alternating free and taken seats.
+
+        Each row starts with a (possibly zero) run of free seats.
+        """
+        encoded_rows = []
+        for row in range(1, self.rows + 1):
+            runs = []
+            current, length = False, 0
+            for seat in range(1, self.seats_in_row + 1):
+                taken = self.is_taken(row, seat)
+                if taken != current:
+                    runs.append(length)
+                    current, length = taken, 0
+                length += 1
+            runs.append(length)
+            encoded_rows.append(runs)
+        return encoded_rows
+
+    def encode(self, encoding):
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"Unknown seat map encoding: {encoding}")
+        return {
+            "encoding": encoding,
+            "rows": self.rows,
+            "seats_in_row": self.seats_in_row,
+            "taken": self.taken,
+            "held": self.held,
+            "data": (
+                self.to_base64() if encoding == "bitmap" else self.to_rle()
+            ),
+        }
@@ -1,6 +1,9 @@
+from collections import Counter, defaultdict
+
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from .models import (
     ShowTheme,
@@ -10,33 +13,45 @@ from .models import (
     ShowSession,
     Ticket,
 )
+from .events import publish_seat_event
+from .fieldsets import DynamicFieldsMixin
+from .holds import get_seat_hold_store
+from .seat_map import SeatMap
 
 
-class ShowThemeSerializer(serializers.ModelSerializer):
+class ShowThemeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShowTheme
         fields = ("id", "name")
 
 
-class ShowThemeListSerializer(serializers.ModelSerializer):
+class ShowThemeListSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = ShowTheme
         fields = ("id", "name")
 
 
-class ShowThemeDetailSerializer(serializers.ModelSerializer):
+class ShowThemeDetailSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = ShowTheme
         fields = ("id", "name")
 
 
-class AstronomyShowSerializer(serializers.ModelSerializer):
+class AstronomyShowSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = AstronomyShow
         fields = ("id", "description", "title", "theme")
 
 
-class AstronomyShowListSerializer(serializers.ModelSerializer):
+class AstronomyShowListSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     theme = ShowThemeSerializer(many=True, read_only=True)
 
     class Meta:
@@ -44,7 +59,9 @@ class AstronomyShowListSerializer(serializers.ModelSerializer):
         fields = ("id", "title", "theme")
 
 
-class AstronomyShowDetailSerializer(serializers.ModelSerializer):
+class AstronomyShowDetailSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     theme = ShowThemeSerializer(many=True, read_only=True)
 
     class Meta:
@@ -52,7 +69,9 @@ class AstronomyShowDetailSerializer(serializers.ModelSerializer):
         fields = ("id", "title", "description", "theme")
 
 
-class PlanetariumDomeSerializer(serializers.ModelSerializer):
+class PlanetariumDomeSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PlanetariumDome
         fields = (
@@ -64,7 +83,9 @@ class PlanetariumDomeSerializer(serializers.ModelSerializer):
         )
 
 
-class PlanetariumDomeListSerializer(serializers.ModelSerializer):
+class PlanetariumDomeListSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PlanetariumDome
         fields = (
@@ -74,7 +95,9 @@ class PlanetariumDomeListSerializer(serializers.ModelSerializer):
         )
 
 
-class PlanetariumDomeDetailSerializer(serializers.ModelSerializer):
+class PlanetariumDomeDetailSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = PlanetariumDome
         fields = (
@@ -86,7 +109,9 @@ class PlanetariumDomeDetailSerializer(serializers.ModelSerializer):
         )
 
 
-class ShowSessionSerializer(serializers.ModelSerializer):
+class ShowSessionSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = ShowSession
         fields = (
@@ -119,9 +144,117 @@ class ShowSessionListSerializer(ShowSessionSerializer):
             "tickets_available",
             "show_session_capacity",
         )
+        expandable_fields = {
+            "astronomy_show": (AstronomyShowListSerializer, {}),
+            "planetarium_dome": (PlanetariumDomeListSerializer, {}),
+        }
+        field_paths = {
+            "tickets_available": (
+                "tickets_sold",
+                "planetarium_dome__rows",
+                "planetarium_dome__seats_in_row",
+            ),
+        }
+
+
+class ShowSessionPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolve sessions from the batch preloaded by TicketBulkSerializer."""
+
+    def to_internal_value(self, data):
+        show_sessions = getattr(self.parent.parent, "show_sessions", None)
+        if show_sessions:
+            try:
+                return show_sessions[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class TicketBulkSerializer(serializers.ListSerializer):
+    """Validate a batch of tickets with a constant number of queries.
+
+    All referenced sessions (with their domes) are fetched at once. Seats
+    sold by other reservations are not pre-checked: the unique constraint
+    on Ticket rejects them on insert (see ReservationViewSet.create).
+    """
+
+    def to_internal_value(self, data):
+        self.show_sessions = self.load_show_sessions(data)
+        try:
+            tickets = super().to_internal_value(data)
+        finally:
+            self.show_sessions = None
+        self.validate_seats_available(tickets)
+        return tickets
+
+    @staticmethod
+    def load_show_sessions(data):
+        if not isinstance(data, list):
+            return {}
+
+        show_session_ids = set()
+        for item in data:
+            try:
+                show_session_ids.add(int(item.get("show_session")))
+            except (AttributeError, TypeError, ValueError):
+                continue
+
+        return ShowSession.objects.select_related(
+            "planetarium_dome"
+        ).in_bulk(show_session_ids)
+
+    def validate_seats_available(self, tickets):
+        seats = [
+            (ticket["show_session"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        held_seats = self.get_seats_held_by_others(seats)
+
+        errors = []
+        requested_seats = set()
+        for seat in seats:
+            if seat in requested_seats:
+                error = self.child.error_messages["seat_taken"]
+            elif seat in held_seats:
+                error = self.child.error_messages["seat_held"]
+            else:
+                error = None
+            errors.append(
+                {api_settings.NON_FIELD_ERRORS_KEY: [error]} if error else {}
+            )
+            requested_seats.add(seat)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+    def get_seats_held_by_others(self, seats):
+        request = self.context.get("request")
+        user_id = request.user.id if request else None
+
+        seats_by_session = defaultdict(list)
+        for show_session_id, row, seat in seats:
+            seats_by_session[show_session_id].append((row, seat))
+
+        store = get_seat_hold_store()
+        held_seats = set()
+        for show_session_id, session_seats in seats_by_session.items():
+            holders = store.holders(show_session_id, session_seats)
+            held_seats.update(
+                (show_session_id, row, seat)
+                for (row, seat), holder_id in holders.items()
+                if holder_id != user_id
+            )
+        return held_seats
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    default_error_messages = {
+        "seat_taken": "This seat is already occupied for this show session.",
+        "seat_held": "This seat is held by another customer.",
+    }
+    show_session = ShowSessionPrimaryKeyRelatedField(
+        queryset=ShowSession.objects.select_related("planetarium_dome")
+    )
 
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
@@ -131,21 +264,14 @@ class TicketSerializer(serializers.ModelSerializer):
             attrs["show_session"].planetarium_dome,
             ValidationError
         )
-        row = data.get("row")
-        seat = data.get("seat")
-        show_session = data.get("show_session")
-
-        if Ticket.objects.filter(
-                row=row, seat=seat, show_session=show_session).exists():
-            raise serializers.ValidationError(
-                "This seat is already occupied for this show session."
-            )
-
+        # Taken seats are left to the unique constraint, see
+        # ReservationViewSet.create.
         return data
 
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "show_session",)
+        list_serializer_class = TicketBulkSerializer
 
 
 class TicketListSerializer(TicketSerializer):
@@ -176,21 +302,135 @@ class ShowSessionDetailSerializer(ShowSessionSerializer):
         )
 
 
-class ReservationSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+class ShowSessionSeatMapSerializer(ShowSessionSerializer):
+    astronomy_show = AstronomyShowSerializer(many=False, read_only=True)
+    planetarium_dome = PlanetariumDomeSerializer(many=False, read_only=True)
+    seat_map = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShowSession
+        fields = (
+            "id",
+            "astronomy_show",
+            "planetarium_dome",
+            "show_time",
+            "seat_map",
+        )
+        field_paths = {
+            "seat_map": (
+                "planetarium_dome__rows",
+                "planetarium_dome__seats_in_row",
+                "tickets__row",
+                "tickets__seat",
+            ),
+        }
+
+    def get_seat_map(self, obj):
+        encoding = self.context.get("seat_map", "bitmap")
+        return SeatMap.for_session(obj).encode(encoding)
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate_seats(self, seats):
+        show_session = self.context["show_session"]
+        requested_seats = set()
+        for seat in seats:
+            Ticket.validate_ticket(
+                seat["row"],
+                seat["seat"],
+                show_session.planetarium_dome,
+                serializers.ValidationError,
+            )
+            if (seat["row"], seat["seat"]) in requested_seats:
+                raise serializers.ValidationError(
+                    "Seats must not be repeated."
+                )
+            requested_seats.add((seat["row"], seat["seat"]))
+        return seats
+
+
+class ReservationSerializer(
+    DynamicFieldsMixin, serializers.ModelSerializer
+):
+    tickets = TicketSerializer(
+        many=True, read_only=False, allow_empty=False, required=False
+    )
+    hold = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Reservation
-        fields = ("id", "tickets", "created_at")
+        fields = ("id", "tickets", "hold", "created_at")
+
+    def validate(self, attrs):
+        data = super(ReservationSerializer, self).validate(attrs=attrs)
+        hold_id = data.get("hold")
+
+        if not hold_id:
+            if not data.get("tickets"):
+                raise serializers.ValidationError(
+                    {"tickets": self.fields["tickets"].error_messages["required"]}
+                )
+            return data
+
+        hold = get_seat_hold_store().get(hold_id)
+        request = self.context.get("request")
+        if hold is None or (request and hold["user_id"] != request.user.id):
+            raise serializers.ValidationError(
+                {"hold": "This hold does not exist or has expired."}
+            )
+
+        if not data.get("tickets"):
+            try:
+                show_session = ShowSession.objects.get(pk=hold["show_session"])
+            except ShowSession.DoesNotExist:
+                # Deleted or archived since the seats were held.
+                raise serializers.ValidationError(
+                    {"hold": "The session of this hold is no longer available."}
+                )
+            data["tickets"] = [
+                {"row": row, "seat": seat, "show_session": show_session}
+                for row, seat in hold["seats"]
+            ]
+        return data
 
     def create(self, validated_data):
+        hold_id = validated_data.pop("hold", None)
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             reservation = Reservation.objects.create(**validated_data)
+            Ticket.objects.bulk_create(
+                Ticket(reservation=reservation, **ticket_data)
+                for ticket_data in tickets_data
+            )
+            ShowSession.change_tickets_sold(Counter(
+                ticket_data["show_session"].id for ticket_data in tickets_data
+            ))
+            seats = defaultdict(list)
             for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
+                seats[ticket_data["show_session"].id].append(
+                    (ticket_data["row"], ticket_data["seat"])
+                )
+            for show_session_id, session_seats in seats.items():
+                publish_seat_event(show_session_id, "taken", session_seats)
+            if hold_id:
+                transaction.on_commit(
+                    lambda: get_seat_hold_store().release(hold_id)
+                )
             return reservation
 
 
 class ReservationListSerializer(ReservationSerializer):
-    tickets = TicketListSerializer(many=True, read_only=True)
+    # Tickets of archived sessions have the same shape as the live ones.
+    tickets = TicketListSerializer(
+        source="ticket_history", many=True, read_only=True
+    )
+
+    class Meta(ReservationSerializer.Meta):
+        field_paths = {"tickets": ("tickets", "archived_tickets")}
@@ -0,0 +1,146 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from services.cache import bump_resource_version
+from services.events import publish_seat_event
+from services.models import (
+    AstronomyShow,
+    PlanetariumDome,
+    ShowSession,
+    ShowTheme,
+    Ticket,
+)
+from services.search import update_search_vectors
+
+
+def invalidate_after_commit(*resources):
+    # Bumped before the commit, the new version could be filled with
+    # responses read from the old rows by concurrent requests.
+    transaction.on_commit(lambda: bump_resource_version(*resources))
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_show_session(sender, instance, **kwargs):
+    instance._previous_show_session_id = instance._previous_seat = None
+    if not instance._state.adding:
+        instance._previous_seat = (
+            Ticket.objects.filter(pk=instance.pk)
+            .values_list("show_session_id", "row", "seat")
+            .first()
+        )
+    if instance._previous_seat:
+        instance._previous_show_session_id = instance._previous_seat[0]
+
+
+@receiver(post_save, sender=Ticket)
+def count_saved_ticket(sender, instance, created, **kwargs):
+    if created:
+        ShowSession.change_tickets_sold({instance.show_session_id: 1})
+        return
+
+    previous_show_session_id = instance._previous_show_session_id
+    if (
+        previous_show_session_id
+        and previous_show_session_id != instance.show_session_id
+    ):
+        ShowSession.change_tickets_sold({
+            previous_show_session_id: -1,
+            instance.show_session_id: 1,
+        })
+
+
+@receiver(post_delete, sender=Ticket)
+def count_deleted_ticket(sender, instance, origin=None, **kwargs):
+    # The counter of a session that is being deleted itself is not needed.
+    if getattr(origin, "model", type(origin)) is ShowSession:
+        return
+    ShowSession.change_tickets_sold({instance.show_session_id: -1})
+
+
+@receiver(post_save, sender=Ticket)
+def publish_saved_ticket(sender, instance, created, **kwargs):
+    seat = (instance.show_session_id, instance.row, instance.seat)
+    previous_seat = instance._previous_seat
+    moved = previous_seat is not None and previous_seat != seat
+    if moved:
+        publish_seat_event(previous_seat[0], "released", [previous_seat[1:]])
+    if created or moved:
+        publish_seat_event(seat[0], "taken", [seat[1:]])
+
+
+@receiver(post_delete, sender=Ticket)
+def publish_deleted_ticket(sender, instance, origin=None, **kwargs):
+    if getattr(origin, "model", type(origin)) is ShowSession:
+        return
+    publish_seat_event(
+        instance.show_session_id, "released", [(instance.row, instance.seat)]
+    )
+
+
+@receiver([post_save, post_delete], sender=ShowTheme)
+def invalidate_show_themes(sender, **kwargs):
+    invalidate_after_commit("show_themes", "shows")
+
+
+@receiver(pre_delete, sender=ShowTheme)
+def remember_theme_shows(sender, instance, **kwargs):
+    instance._show_ids = list(
+        instance.astronomyshow_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_save, sender=ShowTheme)
+def index_renamed_theme(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(
+            instance.astronomyshow_set.values_list("pk", flat=True)
+        )
+
+
+@receiver(post_delete, sender=ShowTheme)
+def index_deleted_theme(sender, instance, **kwargs):
+    update_search_vectors(getattr(instance, "_show_ids", ()))
+
+
+@receiver([post_save, post_delete], sender=AstronomyShow)
+def invalidate_shows(sender, **kwargs):
+    invalidate_after_commit("shows")
+
+
+@receiver(post_save, sender=AstronomyShow)
+def index_show(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"title", "description"} & set(update_fields):
+        update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=AstronomyShow.theme.through)
+def invalidate_show_theme_links(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action == "pre_clear" and reverse:
+        # Clearing shows from a theme does not report which shows they were.
+        instance._show_ids = list(
+            instance.astronomyshow_set.values_list("pk", flat=True)
+        )
+    if not action.startswith("post_"):
+        return
+    invalidate_after_commit("shows")
+
+    if not reverse:
+        update_search_vectors([instance.pk])
+    elif action == "post_clear":
+        update_search_vectors(instance._show_ids)
+    else:
+        update_search_vectors(pk_set)
+
+
+@receiver([post_save, post_delete], sender=PlanetariumDome)
+def invalidate_domes(sender, **kwargs):
+    invalidate_after_commit("domes")
@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from .async_views import get_async_read_urls
+
 from .views import (
     ShowThemeViewSet,
     AstronomyShowViewSet,
     PlanetariumDomeViewSet,
-    ShowSessionViewSet, ReservationViewSet
+    ShowSessionViewSet, ReservationViewSet,
+    TicketExportView,
+    OccupancyAnalyticsView,
 )
 
 router = routers.DefaultRouter()
@@ -16,6 +20,16 @@ router.register("sessions", ShowSessionViewSet)
 router.register("reservations", ReservationViewSet)
 
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("", include(get_async_read_urls(router.urls) + router.urls)),
+    path(
+        "exports/tickets/", TicketExportView.as_view(), name="ticket-export"
+    ),
+    path(
+        "analytics/occupancy/",
+        OccupancyAnalyticsView.as_view(),
+        name="occupancy-analytics",
+    ),
+]
 
 app_name = "service"
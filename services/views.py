@@ -1,18 +1,49 @@
-from datetime import datetime
-
-from django.db.models import F, Count
-from rest_framework import viewsets, mixins
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
+from django.db.models import Field, Func, Prefetch, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from services.analytics import BUCKETS, GROUPS, get_occupancy
+from services.cache import CachedResponseMixin
+from services.events import (
+    EventStreamRenderer,
+    get_seat_event_broker,
+    publish_seat_event,
+    seat_event_stream,
+)
+from services.exports import (
+    EXPORT_FORMATS,
+    export_rows,
+    get_ticket_export_querysets,
+)
+from services.fieldsets import FIELDSET_PARAMS, QueryPlan, get_field_paths
+from services.holds import SeatsUnavailable, get_seat_hold_store
 from services.models import (
     ShowTheme,
     AstronomyShow,
-    PlanetariumDome, ShowSession, Reservation
+    PlanetariumDome, ShowSession, Reservation, Ticket, ArchivedTicket
 )
 from services.permissions import IsAdminOrIfAuthenticatedReadOnly
+from services.search import filter_by_name, search_shows
+from services.seat_map import SeatMap
 from services.serializers import (
     ShowThemeSerializer,
     AstronomyShowSerializer,
@@ -22,6 +53,8 @@ from services.serializers import (
     ShowSessionSerializer,
     ShowSessionListSerializer,
     ShowSessionDetailSerializer,
+    ShowSessionSeatMapSerializer,
+    SeatHoldSerializer,
     ReservationSerializer,
     ReservationListSerializer,
     ShowThemeDetailSerializer,
@@ -29,10 +62,157 @@ from services.serializers import (
     PlanetariumDomeListSerializer,
     PlanetariumDomeDetailSerializer,
 )
+from user.authentication import JWTAuthentication
+
+
+class Row(Func):
+    """SQL row value, e.g. ``(show_time, id)``, for keyset comparisons."""
+
+    function = ""
+    output_field = Field()
+
+
+class OptInCursorPagination(CursorPagination):
+    """Keyset pagination used only when the client asks for it.
+
+    Requests without ``cursor`` or ``page_size`` get the full list as before.
+    The cursor holds the values of every ordering field, and the next page is
+    fetched with one row comparison on them, so the last ordering field must
+    be unique and all fields must share one direction.
+
+    With one of the view's ``relevance_params`` the results keep their
+    relevance order, which has no stable keyset, so only the first page is
+    returned, without a ``next`` link.
+    """
+
+    ordering = "id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        ):
+            return None
+
+        self.page_size = self.get_page_size(request)
+        if any(
+            param in request.query_params
+            for param in getattr(view, "relevance_params", ())
+        ):
+            self.page = list(queryset[:self.page_size])
+            self.has_next = self.has_previous = False
+            return self.page
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.filter_past(queryset, ordering, position)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > self.page_size:
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.next_position = position
+            self.has_previous = following_position is not None
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.next_position = following_position
+            self.has_previous = position is not None
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_past(self, queryset, ordering, position):
+        descending = {field.startswith("-") for field in ordering}
+        assert len(descending) == 1, (
+            "Cursor ordering fields must share one direction."
+        )
+        fields = [
+            queryset.model._meta.get_field(field.lstrip("-"))
+            for field in ordering
+        ]
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError(position)
+            values = [
+                Value(field.to_python(value), output_field=field)
+                for field, value in zip(fields, values)
+            ]
+        except (ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        lookup = LessThan if descending.pop() else GreaterThan
+        return queryset.filter(lookup(
+            Row(*[field.name for field in fields]), Row(*values)
+        ))
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            str(getattr(instance, field.lstrip("-"))) for field in ordering
+        ])
+
+
+class ShowSessionPagination(OptInCursorPagination):
+    ordering = ("-show_time", "-id")
+
+
+class SparseFieldsetMixin:
+    """Load only what ``?fields=`` and ``?expand=`` render.
+
+    On list and retrieve with either param, the viewset's own only(),
+    select_related() and prefetch_related() are replaced with the columns
+    and relations of the pruned serializer (see services.fieldsets).
+    """
+
+    def requests_fieldset(self):
+        return self.action in ("list", "retrieve") and any(
+            param in self.request.query_params for param in FIELDSET_PARAMS
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.requests_fieldset():
+            return queryset
+
+        paths = get_field_paths(self.get_serializer())
+        # The cursor is read from the ordering fields of the page.
+        ordering = getattr(self.paginator, "ordering", ())
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        paths += [field.lstrip("-") for field in ordering]
+        return QueryPlan.for_paths(queryset.model, paths).apply(queryset)
 
 
 class ShowThemeViewSet(
+    SparseFieldsetMixin,
+    CachedResponseMixin,
     mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -40,18 +220,21 @@ class ShowThemeViewSet(
 ):
     queryset = ShowTheme.objects.all()
     serializer_class = ShowThemeSerializer
+    pagination_class = OptInCursorPagination
+    relevance_params = ("name",)
+    cache_resource = "show_themes"
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly, )
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = filter_by_name(queryset, name)
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -63,31 +246,43 @@ class ShowThemeViewSet(
 
 
 class AstronomyShowViewSet(
+    SparseFieldsetMixin,
+    CachedResponseMixin,
     mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet
 ):
 
-    queryset = AstronomyShow.objects.prefetch_related("theme")
+    queryset = AstronomyShow.objects.defer(
+        "search_vector"
+    ).prefetch_related("theme")
     serializer_class = AstronomyShowSerializer
+    pagination_class = OptInCursorPagination
+    relevance_params = ("search",)
+    cache_resource = "shows"
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
 
     def get_queryset(self):
         theme = self.request.query_params.get("theme")
         title = self.request.query_params.get("title")
+        search = self.request.query_params.get("search")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if theme:
-            queryset = queryset.filter(theme__name__icontains=theme)
+            queryset = queryset.filter(theme__name__icontains=theme).distinct()
 
         if title:
             queryset = queryset.filter(title__icontains=title)
 
-        return queryset.distinct()
+        if search:
+            queryset = search_shows(queryset, search)
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -100,7 +295,10 @@ class AstronomyShowViewSet(
 
 
 class PlanetariumDomeViewSet(
+    SparseFieldsetMixin,
+    CachedResponseMixin,
     mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
@@ -108,18 +306,21 @@ class PlanetariumDomeViewSet(
 ):
     queryset = PlanetariumDome.objects.all()
     serializer_class = PlanetariumDomeSerializer
+    pagination_class = OptInCursorPagination
+    relevance_params = ("name",)
+    cache_resource = "domes"
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
 
     def get_queryset(self):
         name = self.request.query_params.get("name")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = filter_by_name(queryset, name)
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -131,29 +332,113 @@ class PlanetariumDomeViewSet(
         return self.serializer_class
 
 
-class ShowSessionViewSet(viewsets.ModelViewSet):
-    queryset = (
-        ShowSession.objects.all()
-        .select_related("astronomy_show", "planetarium_dome")
-        .annotate(
-            tickets_available=(
-                F("planetarium_dome__rows") * F("planetarium_dome__seats_in_row")
-                - Count("tickets")
+class QueryParamsMixin:
+    """Parse filter query params; invalid values are a 400 response."""
+
+    def get_date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise ValidationError({name: "Date has wrong format, use YYYY-MM-DD."})
+        return date
+
+    def get_datetime_param(self, name, end_of_day=False):
+        """Parse a datetime param; a bare date means the start of that day.
+
+        With ``end_of_day`` a bare date means the start of the next day, so
+        the whole day is included by an exclusive upper bound.
+        """
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+
+        try:
+            date = parse_date(value)
+            show_time = None if date else parse_datetime(value)
+        except ValueError:
+            date = show_time = None
+
+        if date:
+            day_start = datetime.combine(date, time.min)
+            return day_start + timedelta(days=1) if end_of_day else day_start
+        if show_time is None:
+            raise ValidationError(
+                {name: "Datetime has wrong format, use ISO 8601."}
             )
-        )
+        if timezone.is_aware(show_time):
+            # Stored datetimes are naive, in TIME_ZONE (USE_TZ is off).
+            show_time = timezone.make_naive(show_time)
+        return show_time
+
+    def get_id_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+
+        try:
+            id_ = int(value)
+        except ValueError:
+            id_ = None
+        # Ids are bigint columns; anything out of range fails in the database.
+        if id_ is None or not 0 < id_ <= 2 ** 63 - 1:
+            raise ValidationError({name: "A valid integer id is required."})
+        return id_
+
+
+class ShowSessionViewSet(
+    SparseFieldsetMixin, QueryParamsMixin, viewsets.ModelViewSet
+):
+    queryset = ShowSession.objects.all().select_related(
+        "astronomy_show", "planetarium_dome"
     )
     serializer_class = ShowSessionSerializer
+    pagination_class = ShowSessionPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
+    read_from_replica = True
 
     def get_queryset(self):
-        date = self.request.query_params.get("date")
+        date = self.get_date_param("date")
+        show_time_from = self.get_datetime_param("from")
+        show_time_to = self.get_datetime_param("to", end_of_day=True)
+        show = self.get_id_param("show")
+        dome = self.get_id_param("dome")
+        theme = self.get_id_param("theme")
 
-        queryset = self.queryset
+        queryset = self.queryset.all()
 
+        # Range predicates keep the filters usable by the show_time indexes.
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+            day_start = datetime.combine(date, time.min)
+            queryset = queryset.filter(
+                show_time__gte=day_start,
+                show_time__lt=day_start + timedelta(days=1),
+            )
+
+        if show_time_from:
+            queryset = queryset.filter(show_time__gte=show_time_from)
+
+        if show_time_to:
+            queryset = queryset.filter(show_time__lt=show_time_to)
+
+        if show:
+            queryset = queryset.filter(astronomy_show_id=show)
+
+        if dome:
+            queryset = queryset.filter(planetarium_dome_id=dome)
+
+        if theme:
+            queryset = queryset.filter(
+                astronomy_show_id__in=AstronomyShow.theme.through.objects
+                .filter(showtheme_id=theme)
+                .values("astronomyshow_id")
+            )
 
         return queryset
 
@@ -161,10 +446,149 @@ class ShowSessionViewSet(viewsets.ModelViewSet):
         if self.action == "list":
             return ShowSessionListSerializer
         if self.action == "retrieve":
+            if self.get_seat_map_encoding():
+                return ShowSessionSeatMapSerializer
             return ShowSessionDetailSerializer
 
         return self.serializer_class
 
+    def get_seat_map_encoding(self):
+        encoding = self.request.query_params.get("seat_map")
+
+        if encoding and encoding not in SeatMap.ENCODINGS:
+            raise ValidationError(
+                {"seat_map": f"Must be one of: {', '.join(SeatMap.ENCODINGS)}"}
+            )
+
+        return encoding
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == "retrieve" and self.get_seat_map_encoding():
+            context["seat_map"] = self.get_seat_map_encoding()
+        return context
+
+    def get_permissions(self):
+        if self.action in ("hold", "release_hold"):
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    @staticmethod
+    def format_expires_at(hold):
+        return datetime.fromtimestamp(hold["expires_at"]).isoformat()
+
+    def hold_response(self, hold, status_code=status.HTTP_200_OK):
+        return Response(
+            {
+                "id": hold["id"],
+                "show_session": hold["show_session"],
+                "seats": [
+                    {"row": row, "seat": seat} for row, seat in hold["seats"]
+                ],
+                "expires_at": self.format_expires_at(hold),
+            },
+            status=status_code,
+        )
+
+    @staticmethod
+    def conflict_response(show_session_id, seats):
+        return Response(
+            {
+                "detail": "Some of the requested seats are not available.",
+                "seats": [
+                    {"show_session": show_session_id, "row": row, "seat": seat}
+                    for row, seat in seats
+                ],
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    @action(detail=True, methods=["post"], url_path="holds")
+    def hold(self, request, pk=None):
+        """Hold seats of the session for SEAT_HOLD_TTL seconds"""
+        show_session = self.get_object()
+        serializer = SeatHoldSerializer(
+            data=request.data, context={"show_session": show_session}
+        )
+        serializer.is_valid(raise_exception=True)
+        seats = [
+            (seat["row"], seat["seat"])
+            for seat in serializer.validated_data["seats"]
+        ]
+
+        taken_seats = Ticket.taken_seats(
+            (show_session.id, row, seat) for row, seat in seats
+        )
+        if taken_seats:
+            return self.conflict_response(
+                show_session.id,
+                [(row, seat) for _, row, seat in sorted(taken_seats)],
+            )
+
+        try:
+            hold = get_seat_hold_store().hold(
+                show_session.id, seats, request.user.id, settings.SEAT_HOLD_TTL
+            )
+        except SeatsUnavailable as error:
+            return self.conflict_response(show_session.id, error.seats)
+
+        # Clients release the seats themselves when the hold expires.
+        publish_seat_event(
+            show_session.id, "held", seats, self.format_expires_at(hold)
+        )
+        return self.hold_response(hold, status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=["delete"],
+        url_path=r"holds/(?P<hold_id>[0-9a-f]+)",
+    )
+    def release_hold(self, request, pk=None, hold_id=None):
+        """Release a hold of the current user"""
+        store = get_seat_hold_store()
+        hold = store.get(hold_id)
+        if (
+            hold is None
+            or hold["user_id"] != request.user.id
+            or str(hold["show_session"]) != pk
+        ):
+            raise NotFound("Hold does not exist or has expired.")
+
+        store.release(hold_id)
+        publish_seat_event(hold["show_session"], "released", hold["seats"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_last_event_id(self):
+        value = self.request.headers.get(
+            "Last-Event-ID", self.request.query_params.get("last_event_id")
+        )
+        return int(value) if value and value.isdigit() else None
+
+    @action(
+        detail=True,
+        methods=["get"],
+        renderer_classes=(JSONRenderer, EventStreamRenderer),
+    )
+    def events(self, request, pk=None):
+        """Stream seat availability of the session as Server-Sent Events"""
+        show_session = self.get_object()
+        events = get_seat_event_broker().listen(
+            show_session.id,
+            self.get_last_event_id(),
+            heartbeat=settings.SEAT_EVENTS_HEARTBEAT,
+            timeout=settings.SEAT_EVENTS_STREAM_TIMEOUT,
+        )
+
+        response = StreamingHttpResponse(
+            seat_event_stream(
+                show_session, self.get_seat_map_encoding() or "bitmap", events
+            ),
+            content_type=EventStreamRenderer.media_type,
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
 
 class ReservationPagination(PageNumberPagination):
     page_size = 10
@@ -172,21 +596,29 @@ class ReservationPagination(PageNumberPagination):
 
 
 class ReservationViewSet(
+    SparseFieldsetMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet
 ):
     queryset = Reservation.objects.prefetch_related(
         "tickets__show_session__astronomy_show",
-        "tickets__show_session__planetarium_dome"
+        "tickets__show_session__planetarium_dome",
+        Prefetch(
+            "archived_tickets",
+            queryset=ArchivedTicket.objects.select_related(
+                "show_session__astronomy_show",
+                "show_session__planetarium_dome",
+            ),
+        ),
     )
     serializer_class = ReservationSerializer
     pagination_class = ReservationPagination
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return self.queryset.filter(user_id=self.request.user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -194,5 +626,117 @@ class ReservationViewSet(
 
         return self.serializer_class
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            self.perform_create(serializer)
+        except IntegrityError:
+            contested_seats = self.get_contested_seats(
+                serializer.validated_data["tickets"]
+            )
+            if not contested_seats:
+                raise
+            return Response(
+                {
+                    "detail": "Some of the requested seats "
+                              "are already occupied.",
+                    "seats": contested_seats,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
+
+    @staticmethod
+    def get_contested_seats(tickets_data):
+        seats = [
+            (ticket["show_session"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets_data
+        ]
+        taken_seats = Ticket.taken_seats(seats)
+        return [
+            {"show_session": show_session_id, "row": row, "seat": seat}
+            for show_session_id, row, seat in seats
+            if (show_session_id, row, seat) in taken_seats
+        ]
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class TicketExportView(QueryParamsMixin, APIView):
+    """Stream sold tickets with their reservation, session, show and dome
+
+    Params: ``output`` (csv or ndjson), ``from`` and ``to`` (reservation
+    date or datetime) and ``dome`` (id).
+    """
+
+    permission_classes = (IsAdminUser,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
+    # The export is not rendered; errors are always returned as JSON.
+    content_negotiation_class = IgnoreClientContentNegotiation
+    read_from_replica = True
+
+    def get(self, request, *args, **kwargs):
+        output_format = request.query_params.get("output", "csv")
+        if output_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"output": f"Must be one of: {', '.join(EXPORT_FORMATS)}"}
+            )
+
+        querysets = get_ticket_export_querysets(
+            reserved_from=self.get_datetime_param("from"),
+            reserved_to=self.get_datetime_param("to", end_of_day=True),
+            dome=self.get_id_param("dome"),
+        )
+        # Rows are streamed after the routing middleware returned.
+        querysets = [queryset.using(queryset.db) for queryset in querysets]
+        response = StreamingHttpResponse(
+            export_rows(querysets, output_format),
+            content_type=EXPORT_FORMATS[output_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tickets.{output_format}"'
+        )
+        return response
+
+
+class OccupancyAnalyticsView(QueryParamsMixin, APIView):
+    """Occupancy and sales per period from the precomputed rollups
+
+    Params: ``bucket`` (day, week or month), ``group_by`` (dome, show or
+    theme), ``from`` and ``to`` (session dates, inclusive) and ``dome``,
+    ``show`` and ``theme`` (ids). Rollups are refreshed by the
+    ``refresh_analytics`` command.
+    """
+
+    permission_classes = (IsAdminUser,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
+    read_from_replica = True
+
+    def get_choice_param(self, name, choices, default):
+        value = self.request.query_params.get(name, default)
+        if value not in choices:
+            raise ValidationError(
+                {name: f"Must be one of: {', '.join(choices)}"}
+            )
+        return value
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_occupancy(
+            bucket=self.get_choice_param("bucket", BUCKETS, "day"),
+            group_by=self.get_choice_param("group_by", GROUPS, "dome"),
+            day_from=self.get_date_param("from"),
+            day_to=self.get_date_param("to"),
+            dome=self.get_id_param("dome"),
+            show=self.get_id_param("show"),
+            theme=self.get_id_param("theme"),
+        ))
@@ -0,0 +1,322 @@
+"""Latency benchmarks of every API route against a seeded dataset.
+
+Skipped unless PLANETARIUM_BENCHMARK is set:
+
+    PLANETARIUM_BENCHMARK=1 python manage.py test tests.test_benchmark
+
+The dataset and the run are sized with PLANETARIUM_BENCHMARK_DOMES,
+_SHOWS, _SESSIONS, _TICKETS, _ITERATIONS and _WARMUP. Results are
+compared with the baseline file (PLANETARIUM_BENCHMARK_BASELINE) and the
+run fails when a route's p95 latency grows by more than
+PLANETARIUM_BENCHMARK_THRESHOLD (0.2 = 20%) or it runs more queries.
+PLANETARIUM_BENCHMARK_SAVE_BASELINE=1 stores the results as the baseline.
+"""
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from services.analytics import refresh_occupancy
+from services.holds import get_seat_hold_store
+from services.models import (
+    AstronomyShow, PlanetariumDome, ShowSession, ShowTheme
+)
+from tests.utils import seed_dataset
+from user.authentication import create_token_pair
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+BENCHMARK = os.environ.get("PLANETARIUM_BENCHMARK")
+DATASET = {
+    "domes": env_int("PLANETARIUM_BENCHMARK_DOMES", 5),
+    "shows": env_int("PLANETARIUM_BENCHMARK_SHOWS", 200),
+    "sessions": env_int("PLANETARIUM_BENCHMARK_SESSIONS", 2000),
+    "tickets": env_int("PLANETARIUM_BENCHMARK_TICKETS", 100_000),
+}
+ITERATIONS = env_int("PLANETARIUM_BENCHMARK_ITERATIONS", 30)
+WARMUP = env_int("PLANETARIUM_BENCHMARK_WARMUP", 3)
+BASELINE_PATH = os.environ.get(
+    "PLANETARIUM_BENCHMARK_BASELINE",
+    os.path.join(os.path.dirname(__file__), "benchmark_baseline.json"),
+)
+THRESHOLD = float(os.environ.get("PLANETARIUM_BENCHMARK_THRESHOLD", "0.2"))
+SAVE_BASELINE = os.environ.get("PLANETARIUM_BENCHMARK_SAVE_BASELINE")
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile"""
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+@skipUnless(BENCHMARK, "Set PLANETARIUM_BENCHMARK=1 to run benchmarks")
+@override_settings(SEAT_EVENTS_STREAM_TIMEOUT=0)
+class EndpointBenchmarkTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword",
+            is_staff=True,
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        seed_dataset(cls.user, **DATASET)
+        refresh_occupancy()
+
+        cls.theme = ShowTheme.objects.first()
+        cls.astronomy_show = AstronomyShow.objects.first()
+        cls.planetarium_dome = PlanetariumDome.objects.first()
+        cls.show_session = ShowSession.objects.order_by("id").first()
+        # Seats of these sessions are held and reserved one per request.
+        cls.hold_session, cls.release_session, cls.reservation_session = (
+            ShowSession.objects.create(
+                astronomy_show=cls.astronomy_show,
+                planetarium_dome=PlanetariumDome.objects.create(
+                    name=f"Benchmark Dome {number}",
+                    rows=ITERATIONS + WARMUP,
+                    seats_in_row=1,
+                ),
+                show_time=datetime(2030, 1, 1, 12),
+            )
+            for number in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def benchmark_requests(self):
+        """{name: function of the request number -> request}
+
+        A request is (url name, method, url kwargs, data, headers). Every
+        route is requested with GET when it allows it.
+        """
+        session = {"pk": self.show_session.id}
+
+        def get(url_name, kwargs=None, data=None):
+            return lambda number: (url_name, "get", kwargs, data, {})
+
+        def release_hold(number):
+            hold = get_seat_hold_store().hold(
+                self.release_session.id, [(number + 1, 1)], self.user.id,
+                ttl=60,
+            )
+            return (
+                "planetarium:showsession-release-hold", "delete",
+                {"pk": self.release_session.id, "hold_id": hold["id"]},
+                None, {},
+            )
+
+        def refresh_token(number):
+            refresh = create_token_pair(self.user)["refresh"]
+            return (
+                "user:token-refresh", "post", None, {"refresh": refresh}, {}
+            )
+
+        def revoke_token(number):
+            tokens = create_token_pair(self.user)
+            return (
+                "user:token-revoke", "post", None,
+                {"refresh": tokens["refresh"]},
+                {"HTTP_AUTHORIZATION": f"Bearer {tokens['access']}"},
+            )
+
+        return {
+            "api-root": get("planetarium:api-root"),
+            "show themes": get("planetarium:showtheme-list"),
+            "show theme": get(
+                "planetarium:showtheme-detail", {"pk": self.theme.id}
+            ),
+            "shows": get("planetarium:astronomyshow-list"),
+            "show": get(
+                "planetarium:astronomyshow-detail",
+                {"pk": self.astronomy_show.id},
+            ),
+            "domes": get("planetarium:planetariumdome-list"),
+            "dome": get(
+                "planetarium:planetariumdome-detail",
+                {"pk": self.planetarium_dome.id},
+            ),
+            "sessions": get("planetarium:showsession-list"),
+            "sessions of a day": get(
+                "planetarium:showsession-list",
+                data={"date": self.show_session.show_time.date()},
+            ),
+            "sparse sessions": get(
+                "planetarium:showsession-list",
+                data={"fields": "id,show_time,tickets_available"},
+            ),
+            "session": get("planetarium:showsession-detail", session),
+            "session seat map": get(
+                "planetarium:showsession-detail", session,
+                {"seat_map": "bitmap"},
+            ),
+            "hold seats": lambda number: (
+                "planetarium:showsession-hold", "post",
+                {"pk": self.hold_session.id},
+                {"seats": [{"row": number + 1, "seat": 1}]}, {},
+            ),
+            "release hold": release_hold,
+            "session events": get("planetarium:showsession-events", session),
+            "reservations": get("planetarium:reservation-list"),
+            "reserve": lambda number: (
+                "planetarium:reservation-list", "post", None,
+                {"tickets": [{
+                    "row": number + 1,
+                    "seat": 1,
+                    "show_session": self.reservation_session.id,
+                }]},
+                {},
+            ),
+            "ticket export": get(
+                "planetarium:ticket-export",
+                data={"dome": self.planetarium_dome.id},
+            ),
+            "occupancy analytics": get(
+                "planetarium:occupancy-analytics",
+                data={"bucket": "week", "group_by": "show"},
+            ),
+            "register": lambda number: (
+                "user:create", "post", None,
+                {"email": f"new{number}@test.com", "password": "testpassword"},
+                {},
+            ),
+            "login": lambda number: (
+                "user:login", "post", None,
+                {"email": "test@test.com", "password": "testpassword"}, {},
+            ),
+            "refresh token": refresh_token,
+            "revoke token": revoke_token,
+            "me": get("user:manage"),
+        }
+
+    def measure(self, request):
+        url_name, method, kwargs, data, headers = request
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(
+                reverse(url_name, kwargs=kwargs), data, format="json",
+                **headers,
+            )
+            content = (
+                b"".join(response.streaming_content)
+                if response.streaming else response.content
+            )
+            elapsed = time.perf_counter() - started
+
+        self.assertLess(response.status_code, 400, f"{url_name}: {content}")
+        return elapsed * 1000, len(queries), len(content)
+
+    def run_benchmark(self, make_request):
+        for number in range(WARMUP):
+            self.measure(make_request(number))
+
+        latencies, queries, sizes = [], [], []
+        for number in range(WARMUP, WARMUP + ITERATIONS):
+            latency, query_count, size = self.measure(make_request(number))
+            latencies.append(latency)
+            queries.append(query_count)
+            sizes.append(size)
+
+        return {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "queries": max(queries),
+            "bytes": round(statistics.median(sizes)),
+        }
+
+    @staticmethod
+    def report(results):
+        sys.stderr.write(
+            f"\n{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}{'bytes':>10}\n"
+        )
+        for name, result in results.items():
+            sys.stderr.write(
+                f"{name:<22}{result['p50']:>10.2f}{result['p95']:>10.2f}"
+                f"{result['p99']:>10.2f}{result['queries']:>9}"
+                f"{result['bytes']:>10}\n"
+            )
+
+    @staticmethod
+    def find_regressions(results, baseline):
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result["p95"] > expected["p95"] * (1 + THRESHOLD):
+                regressions.append(
+                    f"{name}: p95 {result['p95']:.2f} ms, "
+                    f"baseline {expected['p95']:.2f} ms"
+                )
+            if result["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name}: {result['queries']} queries, "
+                    f"baseline {expected['queries']}"
+                )
+        return regressions
+
+    def test_every_route_is_benchmarked(self):
+        benchmarked_url_names = {
+            make_request(0)[0]
+            for make_request in self.benchmark_requests().values()
+        }
+        for namespace in ("planetarium", "user"):
+            resolver = get_resolver().namespace_dict[namespace][1]
+            for url_name in resolver.reverse_dict:
+                if isinstance(url_name, str):
+                    self.assertIn(
+                        f"{namespace}:{url_name}", benchmarked_url_names
+                    )
+
+    def test_endpoint_latency(self):
+        results = {
+            name: self.run_benchmark(make_request)
+            for name, make_request in self.benchmark_requests().items()
+        }
+        self.report(results)
+        run = {
+            "dataset": DATASET,
+            "iterations": ITERATIONS,
+            "database": connection.vendor,
+            "results": results,
+        }
+
+        if SAVE_BASELINE:
+            with open(BASELINE_PATH, "w") as file:
+                json.dump(run, file, indent=2)
+            return
+        if not os.path.exists(BASELINE_PATH):
+            self.skipTest(f"No baseline at {BASELINE_PATH}")
+
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+        if (baseline["dataset"], baseline["database"]) != (
+            DATASET, connection.vendor
+        ):
+            self.skipTest("Baseline was recorded with another dataset")
+
+        regressions = self.find_regressions(results, baseline["results"])
+        self.assertFalse(
+            regressions,
+            f"Regressed beyond {THRESHOLD:.0%}:\n" + "\n".join(regressions),
+        )
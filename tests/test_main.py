@@ -1,19 +1,72 @@
+import base64
+import json
+import os
+import tempfile
 from datetime import datetime
+from io import StringIO
+from unittest import mock, skipIf
 from unittest.mock import Mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import (
+    connection,
+    connections,
+    IntegrityError,
+    OperationalError,
+    transaction,
+)
+from django.db.models import F
+from django.http import HttpResponse
+from asgiref.sync import async_to_sync
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from PlanetariumApiService.db_backends import ConnectionTimingMixin
+from PlanetariumApiService.metrics import (
+    DB_CONNECTION_DURATION,
+    HISTOGRAMS,
+    REQUEST_DURATION,
+)
+from PlanetariumApiService.middleware import PerformanceMiddleware
+from PlanetariumApiService.routers import (
+    ReplicaReads,
+    ReplicaRouter,
+    replica_reads,
+)
+
 from services.models import ShowTheme, AstronomyShow, PlanetariumDome, ShowSession, Ticket, Reservation
+from services.models import ArchivedShowSession, ArchivedTicket
+from services.models import DirtyShowSession, SessionOccupancy
+from services.archive import archive_batch
 from services.serializers import AstronomyShowSerializer, TicketSerializer, ReservationSerializer
+from services.async_views import get_async_read_urls
+from services.holds import get_seat_hold_store
+from services.events import (
+    CacheSeatEventBroker,
+    InProcessSeatEventBroker,
+    load_seat_event_broker,
+)
+from services.seat_map import SeatMap
+from services.urls import router
+from tests.utils import seed_planetarium
+from user.authentication import create_token_pair, decode_token, revoke_token
 
 
 class BaseTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="test@test.com",
@@ -66,6 +119,167 @@ class AstronomyShowViewSetTestCase(BaseTestCase):
         self.assertEqual(data_without_id, show_data)
 
 
+class NameFilterTestCase(BaseTestCase):
+    def test_show_themes_ordered_by_similarity(self):
+        for name in ["Dwarf galaxy clusters", "Galaxies", "Galaxy", "Planets"]:
+            ShowTheme.objects.create(name=name)
+
+        response = self.client.get("/api/planetarium/show_themes/?name=galax")
+
+        self.assertEqual(
+            [theme["name"] for theme in response.data],
+            ["Galaxy", "Galaxies", "Dwarf galaxy clusters"],
+        )
+
+    def test_domes_filtered_by_name(self):
+        for name in ["Main Dome", "Small dome", "Observatory"]:
+            PlanetariumDome.objects.create(name=name, rows=5, seats_in_row=5)
+
+        response = self.client.get("/api/planetarium/domes/?name=DOME")
+
+        self.assertEqual(
+            [dome["name"] for dome in response.data],
+            ["Main Dome", "Small dome"],
+        )
+
+
+class CatalogResponseCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.theme = ShowTheme.objects.create(name="Test Theme")
+        self.astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        self.astronomy_show.theme.add(self.theme)
+
+    def test_cached_list_skips_database(self):
+        first = self.client.get("/api/planetarium/shows/")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/planetarium/shows/")
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_not_modified_with_matching_etag(self):
+        etag = self.client.get("/api/planetarium/domes/")["ETag"]
+
+        response = self.client.get(
+            "/api/planetarium/domes/", HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_retrieve_is_cached_per_object(self):
+        other_theme = ShowTheme.objects.create(name="Other Theme")
+
+        first = self.client.get(f"/api/planetarium/show_themes/{self.theme.id}/")
+        second = self.client.get(f"/api/planetarium/show_themes/{other_theme.id}/")
+
+        self.assertEqual(first.json()["name"], "Test Theme")
+        self.assertEqual(second.json()["name"], "Other Theme")
+
+    def test_save_invalidates_cache(self):
+        etag = self.client.get("/api/planetarium/shows/")["ETag"]
+
+        self.theme.name = "Renamed Theme"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.theme.save()
+        response = self.client.get(
+            "/api/planetarium/shows/", HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()[0]["theme"][0]["name"], "Renamed Theme"
+        )
+
+    def test_m2m_change_invalidates_cache(self):
+        self.client.get("/api/planetarium/shows/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.astronomy_show.theme.clear()
+        response = self.client.get("/api/planetarium/shows/")
+
+        self.assertEqual(response.json()[0]["theme"], [])
+
+    def test_delete_invalidates_cache(self):
+        self.client.get("/api/planetarium/show_themes/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                f"/api/planetarium/show_themes/{self.theme.id}/"
+            )
+        response = self.client.get("/api/planetarium/show_themes/")
+
+        self.assertEqual(response.json(), [])
+
+    def test_cache_is_invalidated_after_commit(self):
+        etag = self.client.get("/api/planetarium/show_themes/")["ETag"]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.theme.name = "Renamed Theme"
+            self.theme.save()
+            # A read during the transaction still hits the old version.
+            response = self.client.get(
+                "/api/planetarium/show_themes/", HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+
+        for callback in callbacks:
+            callback()
+        response = self.client.get(
+            "/api/planetarium/show_themes/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["name"], "Renamed Theme")
+
+
+class AstronomyShowSearchTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.galaxies = ShowTheme.objects.create(name="Galaxies")
+        self.andromeda = AstronomyShow.objects.create(
+            title="Andromeda", description="Our closest spiral neighbour"
+        )
+        self.andromeda.theme.add(self.galaxies)
+        self.planets = AstronomyShow.objects.create(
+            title="Planets", description="A tour past Andromeda and Mars"
+        )
+
+    def search(self, text):
+        response = self.client.get("/api/planetarium/shows/", {"search": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [show["title"] for show in response.data]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search("andromeda"), ["Andromeda", "Planets"])
+
+    def test_search_by_theme_name(self):
+        self.assertEqual(self.search("galaxies"), ["Andromeda"])
+
+    def test_search_requires_all_terms(self):
+        self.assertEqual(self.search("tour mars"), ["Planets"])
+
+    def test_search_follows_theme_changes(self):
+        self.galaxies.name = "Nebulae"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.galaxies.save()
+        self.assertEqual(self.search("nebulae"), ["Andromeda"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.andromeda.theme.clear()
+        self.assertEqual(self.search("nebulae"), [])
+
+    def test_search_follows_theme_deletion(self):
+        self.galaxies.delete()
+        self.assertEqual(self.search("galaxies"), [])
+
+
 class PlanetariumDomeViewSetTestCase(BaseTestCase):
 
     def test_list_planetarium_domes(self):
@@ -125,9 +339,216 @@ class ShowSessionViewSetTestCase(BaseTestCase):
                         )
 
 
+class ShowSessionFilterTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.galaxies = ShowTheme.objects.create(name="Galaxies")
+        self.andromeda = AstronomyShow.objects.create(
+            title="Andromeda", description="Test Description"
+        )
+        self.andromeda.theme.add(self.galaxies)
+        self.planets = AstronomyShow.objects.create(
+            title="Planets", description="Test Description"
+        )
+        self.main_dome = PlanetariumDome.objects.create(
+            name="Main Dome", rows=5, seats_in_row=10
+        )
+        self.small_dome = PlanetariumDome.objects.create(
+            name="Small Dome", rows=2, seats_in_row=10
+        )
+        self.sessions = {
+            (show.title, dome.name, day): ShowSession.objects.create(
+                astronomy_show=show,
+                planetarium_dome=dome,
+                show_time=datetime(2024, 3, day, 18),
+            )
+            for show in (self.andromeda, self.planets)
+            for dome in (self.main_dome, self.small_dome)
+            for day in (27, 28)
+        }
+
+    def filter_sessions(self, **params):
+        response = self.client.get("/api/planetarium/sessions/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {session["id"] for session in response.data}
+
+    def expected(self, title=None, dome=None, day=None):
+        return {
+            session.id
+            for (session_title, dome_name, session_day), session
+            in self.sessions.items()
+            if title in (None, session_title)
+            and dome in (None, dome_name)
+            and day in (None, session_day)
+        }
+
+    def test_filter_by_date(self):
+        self.assertEqual(
+            self.filter_sessions(date="2024-03-28"), self.expected(day=28)
+        )
+
+    def test_filter_by_datetime_range(self):
+        self.assertEqual(
+            self.filter_sessions(
+                **{"from": "2024-03-27T19:00:00", "to": "2024-03-29"}
+            ),
+            self.expected(day=28),
+        )
+        self.assertEqual(
+            self.filter_sessions(to="2024-03-27"), self.expected(day=27)
+        )
+
+    def test_filter_by_datetime_with_offset(self):
+        for show_time in ("2024-03-27T19:00:00Z", "2024-03-27T21:00:00+02:00"):
+            self.assertEqual(
+                self.filter_sessions(**{"from": show_time}),
+                self.expected(day=28),
+            )
+
+    def test_filter_by_show_dome_and_theme(self):
+        self.assertEqual(
+            self.filter_sessions(show=self.planets.id, dome=self.small_dome.id),
+            self.expected(title="Planets", dome="Small Dome"),
+        )
+        self.assertEqual(
+            self.filter_sessions(theme=self.galaxies.id),
+            self.expected(title="Andromeda"),
+        )
+
+    def test_invalid_filters(self):
+        for params in (
+            {"date": "28.03.2024"},
+            {"from": "soon"},
+            {"dome": "main"},
+            {"dome": "0"},
+            {"show": "99999999999999999999"},
+            {"show": "\u00b2"},
+        ):
+            response = self.client.get("/api/planetarium/sessions/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CursorPaginationTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        planetarium_dome = PlanetariumDome.objects.create(
+            name="Test Dome", rows=5, seats_in_row=10
+        )
+        astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        for day in range(1, 6):
+            ShowSession.objects.create(
+                astronomy_show=astronomy_show,
+                planetarium_dome=planetarium_dome,
+                show_time=datetime(2024, 3, day, 12),
+            )
+        for number in range(5):
+            ShowTheme.objects.create(name=f"Theme {number}")
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_sessions_are_not_paginated_by_default(self):
+        response = self.client.get("/api/planetarium/sessions/")
+        self.assertEqual(len(response.data), 5)
+
+    def test_sessions_cursor_pages(self):
+        ids = self.collect_pages("/api/planetarium/sessions/?page_size=2")
+
+        expected_ids = list(
+            ShowSession.objects.order_by("-show_time", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected_ids)
+
+    def test_catalog_cursor_pages(self):
+        ids = self.collect_pages("/api/planetarium/show_themes/?page_size=3")
+
+        self.assertEqual(
+            ids, list(ShowTheme.objects.order_by("id").values_list("id", flat=True))
+        )
+
+    def test_sessions_at_the_same_time_are_paged_once(self):
+        session = ShowSession.objects.first()
+        for _ in range(3):
+            ShowSession.objects.create(
+                astronomy_show=session.astronomy_show,
+                planetarium_dome=session.planetarium_dome,
+                show_time=session.show_time,
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            ids = self.collect_pages("/api/planetarium/sessions/?page_size=2")
+
+        self.assertEqual(
+            ids,
+            list(
+                ShowSession.objects.order_by("-show_time", "-id")
+                .values_list("id", flat=True)
+            ),
+        )
+        self.assertFalse(
+            any("OFFSET" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_sessions_previous_pages(self):
+        url = "/api/planetarium/sessions/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            url = response.data["next"]
+
+        ids = []
+        url = response.data["previous"]
+        while url:
+            response = self.client.get(url)
+            ids[:0] = [item["id"] for item in response.data["results"]]
+            url = response.data["previous"]
+
+        self.assertEqual(ids, list(
+            ShowSession.objects.order_by("-show_time", "-id")
+            .values_list("id", flat=True)[:4]
+        ))
+
+    def test_invalid_cursor(self):
+        cursor = base64.b64encode(b"p=not-a-position").decode()
+        response = self.client.get(
+            "/api/planetarium/sessions/", {"cursor": cursor}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_keeps_relevance_order(self):
+        AstronomyShow.objects.create(
+            title="Planets", description="A tour past Andromeda"
+        )
+        AstronomyShow.objects.create(title="Andromeda", description="Galaxy")
+
+        response = self.client.get(
+            "/api/planetarium/shows/", {"search": "andromeda", "page_size": 1}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [show["title"] for show in response.data["results"]], ["Andromeda"]
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_page_size_is_limited(self):
+        response = self.client.get("/api/planetarium/show_themes/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+
+
 class ReservationViewSetTestCase(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="test@test.com",
@@ -142,6 +563,302 @@ class ReservationViewSetTestCase(TestCase):
         response = self.client.get("/api/planetarium/reservations/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def create_show_session(self):
+        planetarium_dome = PlanetariumDome.objects.create(
+            name=f"Dome {ShowSession.objects.count()}", rows=10, seats_in_row=20
+        )
+        astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        return ShowSession.objects.create(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime.now(),
+        )
+
+    def post_reservation(self, tickets):
+        return self.client.post(
+            "/api/planetarium/reservations/",
+            {"tickets": tickets},
+            format="json",
+        )
+
+    def test_create_reservation(self):
+        show_session = self.create_show_session()
+        tickets = [
+            {"row": 1, "seat": seat, "show_session": show_session.id}
+            for seat in range(1, 4)
+        ]
+
+        response = self.post_reservation(tickets)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets"]), 3)
+        self.assertEqual(
+            Ticket.objects.filter(
+                show_session=show_session, reservation__user=self.user
+            ).count(),
+            3,
+        )
+
+    def test_create_reservation_query_count_is_constant(self):
+        show_sessions = [self.create_show_session() for _ in range(2)]
+
+        with CaptureQueriesContext(connection) as small_booking:
+            self.post_reservation([
+                {"row": 1, "seat": 1, "show_session": show_sessions[0].id},
+            ])
+        with CaptureQueriesContext(connection) as large_booking:
+            self.post_reservation([
+                {"row": row, "seat": seat, "show_session": show_session.id}
+                for show_session in show_sessions
+                for row in range(2, 6)
+                for seat in range(1, 11)
+            ])
+
+        self.assertEqual(len(large_booking), len(small_booking))
+        self.assertEqual(Ticket.objects.count(), 81)
+
+    def test_create_reservation_with_taken_seat(self):
+        show_session = self.create_show_session()
+        self.post_reservation(
+            [{"row": 1, "seat": 2, "show_session": show_session.id}]
+        )
+
+        response = self.post_reservation([
+            {"row": 1, "seat": 1, "show_session": show_session.id},
+            {"row": 1, "seat": 2, "show_session": show_session.id},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["seats"],
+            [{"show_session": show_session.id, "row": 1, "seat": 2}],
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_create_reservation_with_duplicated_seat(self):
+        show_session = self.create_show_session()
+
+        response = self.post_reservation([
+            {"row": 1, "seat": 1, "show_session": show_session.id},
+            {"row": 1, "seat": 1, "show_session": show_session.id},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["tickets"][0], {})
+        self.assertEqual(
+            response.data["tickets"][1]["non_field_errors"],
+            ["This seat is already occupied for this show session."],
+        )
+
+    def test_create_reservation_counts_tickets_sold(self):
+        show_session = self.create_show_session()
+
+        self.post_reservation([
+            {"row": 1, "seat": seat, "show_session": show_session.id}
+            for seat in range(1, 6)
+        ])
+
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 5)
+        self.assertEqual(show_session.tickets_available, 195)
+
+        Reservation.objects.get().delete()
+
+        show_session.refresh_from_db()
+        self.assertEqual(show_session.tickets_sold, 0)
+
+    def test_create_reservation_with_seat_out_of_dome(self):
+        show_session = self.create_show_session()
+
+        response = self.post_reservation(
+            [{"row": 11, "seat": 1, "show_session": show_session.id}]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"][0]["row"],
+            ["row number must be in available range: (1, rows): (1, 10)"],
+        )
+
+
+class SeatHoldTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        planetarium_dome = PlanetariumDome.objects.create(
+            name="Test Dome", rows=2, seats_in_row=5
+        )
+        astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime.now(),
+        )
+        self.holds_url = f"/api/planetarium/sessions/{self.show_session.id}/holds/"
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="testpassword"
+            )
+        )
+
+    def hold(self, client, *seats):
+        return client.post(
+            self.holds_url,
+            {"seats": [{"row": row, "seat": seat} for row, seat in seats]},
+            format="json",
+        )
+
+    def test_hold_seats(self):
+        response = self.hold(self.other_client, (1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.data["seats"], [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}]
+        )
+        seat_map = self.client.get(
+            f"/api/planetarium/sessions/{self.show_session.id}/?seat_map=rle"
+        ).data["seat_map"]
+        self.assertEqual(seat_map["held"], 2)
+        self.assertEqual(seat_map["data"], [[0, 2, 3], [5]])
+
+    def test_hold_seats_held_by_other_customer(self):
+        self.hold(self.other_client, (1, 2))
+
+        response = self.hold(self.client, (1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["seats"],
+            [{"show_session": self.show_session.id, "row": 1, "seat": 2}],
+        )
+        response = self.hold(self.client, (1, 1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_hold_seat_out_of_dome(self):
+        response = self.hold(self.client, (3, 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reservation_honors_holds(self):
+        self.hold(self.other_client, (1, 1))
+
+        response = self.client.post(
+            "/api/planetarium/reservations/",
+            {"tickets": [
+                {"row": 1, "seat": 1, "show_session": self.show_session.id}
+            ]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"][0]["non_field_errors"],
+            ["This seat is held by another customer."],
+        )
+
+    def test_convert_hold_to_reservation(self):
+        hold_id = self.hold(self.other_client, (1, 1), (2, 5)).data["id"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.other_client.post(
+                "/api/planetarium/reservations/",
+                {"hold": hold_id},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(Ticket.objects.values_list("row", "seat")), {(1, 1), (2, 5)}
+        )
+        seat_map = SeatMap.for_session(self.show_session)
+        self.assertEqual((seat_map.taken, seat_map.held), (2, 0))
+
+    def test_hold_of_other_customer_can_not_be_used(self):
+        hold_id = self.hold(self.other_client, (1, 1)).data["id"]
+
+        response = self.client.post(
+            "/api/planetarium/reservations/", {"hold": hold_id}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("hold", response.data)
+
+    def test_hold_of_deleted_session_can_not_be_used(self):
+        hold_id = self.hold(self.other_client, (1, 1)).data["id"]
+        self.show_session.delete()
+
+        response = self.other_client.post(
+            "/api/planetarium/reservations/", {"hold": hold_id}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("hold", response.data)
+
+    def test_seat_map_shows_holds_of_every_customer(self):
+        self.hold(self.other_client, (1, 1))
+        self.hold(self.client, (2, 5))
+
+        self.assertEqual(
+            get_seat_hold_store().held_seats(self.show_session.id),
+            {(1, 1), (2, 5)},
+        )
+        self.assertEqual(SeatMap.for_session(self.show_session).held, 2)
+
+    def test_hold_index_is_locked(self):
+        store = get_seat_hold_store()
+
+        with store.session_lock(self.show_session.id) as locked:
+            self.assertTrue(locked)
+            with store.session_lock(
+                self.show_session.id, blocking=False
+            ) as locked_again:
+                self.assertFalse(locked_again)
+        with store.session_lock(self.show_session.id, blocking=False) as locked:
+            self.assertTrue(locked)
+
+    def test_repeated_hold_reports_the_seat(self):
+        self.hold(self.client, (1, 1))
+
+        response = self.hold(self.client, (1, 2), (1, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["seats"],
+            [{"show_session": self.show_session.id, "row": 1, "seat": 1}],
+        )
+
+    def test_release_hold(self):
+        hold_id = self.hold(self.other_client, (1, 1)).data["id"]
+
+        self.assertEqual(
+            self.client.delete(f"{self.holds_url}{hold_id}/").status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        response = self.other_client.delete(f"{self.holds_url}{hold_id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.hold(self.client, (1, 1)).status_code, 201)
+
+    def test_expired_hold_is_ignored(self):
+        with mock.patch("services.holds.time.time", return_value=0):
+            self.hold(self.other_client, (1, 1))
+
+        self.assertEqual(SeatMap.for_session(self.show_session).held, 0)
+
+    def test_reservation_requires_tickets_or_hold(self):
+        response = self.client.post(
+            "/api/planetarium/reservations/", {}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"], ["This field is required."]
+        )
+
 
 class TicketSerializerTestCase(TestCase):
     def setUp(self):
@@ -191,10 +908,12 @@ class TicketSerializerTestCase(TestCase):
             'reservation': reservation.id
         }
         serializer = TicketSerializer(data=invalid_data)
-        self.assertFalse(serializer.is_valid())
-        self.assertIn(
-            "This seat is already occupied for this show session.",
-            serializer.errors["non_field_errors"])
+        # The taken seat is rejected by the database, not by a query here.
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Ticket.objects.bulk_create([
+                Ticket(reservation=reservation, **serializer.validated_data)
+            ])
 
     def test_ticket_validation(self):
         ticket = Ticket()
@@ -217,3 +936,1281 @@ class TicketSerializerTestCase(TestCase):
             context.exception.messages,
             ['seat number must be in available range: '
              '(1, seats_in_row): (1, 10)'])
+
+
+class ShowSessionSeatMapTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.planetarium_dome = PlanetariumDome.objects.create(
+            name="Test Dome", rows=2, seats_in_row=5
+        )
+        self.astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=self.astronomy_show,
+            planetarium_dome=self.planetarium_dome,
+            show_time=datetime.now(),
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in [(1, 1), (1, 2), (2, 5)]:
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                show_session=self.show_session,
+                reservation=reservation,
+            )
+
+    def test_seat_map_bitset(self):
+        seat_map = SeatMap.for_session(self.show_session)
+
+        self.assertEqual(seat_map.taken, 3)
+        self.assertTrue(seat_map.is_taken(1, 2))
+        self.assertFalse(seat_map.is_taken(1, 3))
+        self.assertEqual(bytes(seat_map.bits), bytes([0b11000000, 0b01000000]))
+        self.assertEqual(seat_map.to_rle(), [[0, 2, 3], [4, 1]])
+
+    def test_retrieve_session_with_bitmap(self):
+        response = self.client.get(
+            f"/api/planetarium/sessions/{self.show_session.id}/?seat_map=bitmap"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("taken_places", response.data)
+        self.assertEqual(response.data["seat_map"], {
+            "encoding": "bitmap",
+            "rows": 2,
+            "seats_in_row": 5,
+            "taken": 3,
+            "held": 0,
+            "data": "wEA=",
+        })
+
+    def test_retrieve_session_with_rle(self):
+        response = self.client.get(
+            f"/api/planetarium/sessions/{self.show_session.id}/?seat_map=rle"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["seat_map"]["data"], [[0, 2, 3], [4, 1]])
+
+    def test_retrieve_session_with_unknown_encoding(self):
+        response = self.client.get(
+            f"/api/planetarium/sessions/{self.show_session.id}/?seat_map=png"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncReadPathTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        self.astronomy_show.theme.add(ShowTheme.objects.create(name="Stars"))
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=self.astronomy_show,
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Test Dome", rows=2, seats_in_row=5
+            ),
+            show_time=datetime.now(),
+        )
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in [(1, 1), (2, 5)]:
+            Ticket.objects.create(
+                row=row,
+                seat=seat,
+                show_session=self.show_session,
+                reservation=reservation,
+            )
+        self.async_views = {
+            pattern.pattern.regex.pattern: pattern.callback
+            for pattern in get_async_read_urls(
+                router.urls,
+                ["sessions-list", "sessions-detail", "shows-list", "shows-detail"],
+            )
+        }
+        self.factory = AsyncRequestFactory()
+
+    def get_async(self, regex, path, token=True, **kwargs):
+        view = self.async_views[regex]
+        headers = {"AUTHORIZATION": f"Token {self.token.key}"} if token else {}
+        request = self.factory.get(path, **headers)
+        return async_to_sync(view)(request, **kwargs)
+
+    def assert_same_response(self, regex, path, **kwargs):
+        expected = self.client.get(path)
+        response = self.get_async(regex, path, **kwargs)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertJSONEqual(response.content, expected.content.decode())
+
+    def test_session_list_and_detail_match_sync_views(self):
+        session_id = str(self.show_session.id)
+        self.assert_same_response(
+            r"^sessions/$", "/api/planetarium/sessions/"
+        )
+        for query in ("", "?seat_map=bitmap", "?seat_map=rle"):
+            self.assert_same_response(
+                r"^sessions/(?P<pk>[^/.]+)/$",
+                f"/api/planetarium/sessions/{session_id}/{query}",
+                pk=session_id,
+            )
+
+    def test_show_catalog_matches_sync_views_and_cache(self):
+        show_id = str(self.astronomy_show.id)
+        self.assert_same_response(r"^shows/$", "/api/planetarium/shows/")
+        self.assert_same_response(
+            r"^shows/(?P<pk>[^/.]+)/$",
+            f"/api/planetarium/shows/{show_id}/",
+            pk=show_id,
+        )
+
+        etag = self.client.get("/api/planetarium/shows/")["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_async(r"^shows/$", "/api/planetarium/shows/")
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len(queries), 1)
+
+    def test_fieldsets_match_sync_views(self):
+        session_id = str(self.show_session.id)
+        self.assert_same_response(
+            r"^sessions/$",
+            "/api/planetarium/sessions/?fields=id,tickets_available"
+            "&expand=astronomy_show",
+        )
+        self.assert_same_response(
+            r"^sessions/(?P<pk>[^/.]+)/$",
+            f"/api/planetarium/sessions/{session_id}/"
+            "?fields=astronomy_show.title,taken_places",
+            pk=session_id,
+        )
+
+    def test_errors_fall_back_to_sync_views(self):
+        response = self.get_async(
+            r"^sessions/$", "/api/planetarium/sessions/", token=False
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.get_async(
+            r"^sessions/$", "/api/planetarium/sessions/?date=soon"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.get_async(
+            r"^sessions/(?P<pk>[^/.]+)/$",
+            "/api/planetarium/sessions/0/",
+            pk="0",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bearer_tokens(self):
+        access = create_token_pair(self.user)["access"]
+        request = self.factory.get(
+            "/api/planetarium/shows/", AUTHORIZATION=f"Bearer {access}"
+        )
+        view = self.async_views[r"^shows/$"]
+
+        response = async_to_sync(view)(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)[0]["title"], "Test Show")
+
+        revoke_token(decode_token(access, "access"))
+        response = async_to_sync(view)(self.factory.get(
+            "/api/planetarium/shows/", AUTHORIZATION=f"Bearer {access}"
+        ))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SeatEventBrokerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assert_replays(self, broker):
+        broker.publish(1, "taken", [(1, 1)])
+        broker.publish(1, "released", [(1, 1)])
+        broker.publish(2, "taken", [(2, 2)])
+
+        events = list(broker.listen(1, last_event_id=1, heartbeat=0, timeout=0))
+        self.assertEqual(
+            events, [{"id": 2, "type": "released", "seats": [[1, 1]]}]
+        )
+        for last_event_id in (None, 5):
+            self.assertEqual(
+                list(broker.listen(1, last_event_id, heartbeat=0, timeout=0)),
+                [{"id": 2, "type": "snapshot"}],
+            )
+
+    def test_in_process_broker_replays_history(self):
+        self.assert_replays(InProcessSeatEventBroker())
+
+    def test_in_process_broker_delivers_to_listeners(self):
+        broker = InProcessSeatEventBroker()
+        events = broker.listen(1, heartbeat=0.01, timeout=1)
+
+        self.assertEqual(next(events)["type"], "snapshot")
+        self.assertIsNone(next(events))
+        broker.publish(1, "held", [(3, 4)])
+        self.assertEqual(
+            next(events), {"id": 1, "type": "held", "seats": [[3, 4]]}
+        )
+        events.close()
+        self.assertEqual(dict(broker.listeners), {})
+
+    def test_cache_broker_replays_history(self):
+        self.assert_replays(CacheSeatEventBroker())
+
+    def test_cache_broker_falls_back_to_snapshot_for_missing_events(self):
+        broker = CacheSeatEventBroker()
+        broker.publish(1, "taken", [(1, 1)])
+        broker.publish(1, "taken", [(1, 2)])
+        cache.delete("planetarium:events:1:2")
+
+        self.assertEqual(
+            list(broker.listen(1, last_event_id=0, heartbeat=0, timeout=0)),
+            [{"id": 2, "type": "snapshot"}],
+        )
+
+
+class SeatEventStreamTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        load_seat_event_broker.cache_clear()
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=AstronomyShow.objects.create(
+                title="Test Show", description="Test Description"
+            ),
+            planetarium_dome=PlanetariumDome.objects.create(
+                name="Test Dome", rows=2, seats_in_row=5
+            ),
+            show_time=datetime.now(),
+        )
+        self.events_url = (
+            f"/api/planetarium/sessions/{self.show_session.id}/events/"
+        )
+
+    def hold(self, *seats):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/planetarium/sessions/{self.show_session.id}/holds/",
+                {"seats": [{"row": row, "seat": seat} for row, seat in seats]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(SEAT_EVENTS_STREAM_TIMEOUT=0)
+    def read_events(self, **headers):
+        response = self.client.get(
+            self.events_url, HTTP_ACCEPT="text/event-stream", **headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join(response.streaming_content).decode()
+
+    def test_stream_starts_with_snapshot(self):
+        self.hold((1, 1))
+
+        self.assertEqual(self.read_events(), (
+            "retry: 3000\n\n"
+            "id: 1\n"
+            "event: snapshot\n"
+            'data: {"encoding": "bitmap", "rows": 2, "seats_in_row": 5, '
+            '"taken": 0, "held": 1, "data": "gAA="}\n\n'
+        ))
+
+    def test_reconnect_replays_ticket_events(self):
+        self.hold((1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/planetarium/reservations/",
+                {"tickets": [
+                    {"row": 2, "seat": seat, "show_session": self.show_session.id}
+                    for seat in (1, 2)
+                ]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.get(row=2, seat=1).delete()
+
+        self.assertEqual(self.read_events(HTTP_LAST_EVENT_ID="1"), (
+            "retry: 3000\n\n"
+            "id: 2\n"
+            "event: taken\n"
+            'data: {"seats": [[2, 1], [2, 2]]}\n\n'
+            "id: 3\n"
+            "event: released\n"
+            'data: {"seats": [[2, 1]]}\n\n'
+        ))
+
+    def test_held_events_carry_the_expiry(self):
+        self.hold((1, 1))
+        self.hold((1, 2))
+
+        lines = self.read_events(HTTP_LAST_EVENT_ID="1").splitlines()
+
+        self.assertEqual(lines[2:4], ["id: 2", "event: held"])
+        data = json.loads(lines[4].removeprefix("data: "))
+        self.assertEqual(data["seats"], [[1, 2]])
+        self.assertGreater(
+            datetime.fromisoformat(data["expires_at"]), datetime.now()
+        )
+
+    def test_stream_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.client.credentials()
+
+        response = self.client.get(
+            self.events_url, HTTP_ACCEPT="text/event-stream"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response.content.startswith(b"event: error\n"))
+
+
+class TicketExportTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        astronomy_show = AstronomyShow.objects.create(
+            title="Andromeda", description="Test Description"
+        )
+        self.domes = [
+            PlanetariumDome.objects.create(
+                name=name, rows=5, seats_in_row=10
+            )
+            for name in ("Main Dome", "Small Dome")
+        ]
+        for day, dome in zip((27, 28), self.domes):
+            reservation = Reservation.objects.create(user=self.user)
+            Reservation.objects.filter(pk=reservation.pk).update(
+                created_at=datetime(2024, 3, day, 12)
+            )
+            show_session = ShowSession.objects.create(
+                astronomy_show=astronomy_show,
+                planetarium_dome=dome,
+                show_time=datetime(2024, 4, 1, 18),
+            )
+            for seat in (1, 2):
+                Ticket.objects.create(
+                    row=1,
+                    seat=seat,
+                    show_session=show_session,
+                    reservation=reservation,
+                )
+
+    def export(self, **params):
+        response = self.client.get("/api/planetarium/exports/tickets/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        lines = self.export().splitlines()
+
+        self.assertEqual(lines[0], (
+            "ticket_id,row,seat,reservation_id,reserved_at,user_id,"
+            "user_email,show_session_id,show_time,show_id,show_title,"
+            "dome_id,dome_name"
+        ))
+        self.assertEqual(len(lines), 5)
+        self.assertIn(",2024-03-27T12:00:00,", lines[1])
+        self.assertTrue(lines[1].endswith(",Andromeda,1,Main Dome"))
+
+    def test_export_ndjson_with_filters(self):
+        rows = [
+            json.loads(line)
+            for line in self.export(
+                output="ndjson", to="2024-03-27", dome=self.domes[0].id
+            ).splitlines()
+        ]
+
+        self.assertEqual([row["seat"] for row in rows], [1, 2])
+        self.assertEqual(rows[0]["user_email"], "test@test.com")
+        self.assertEqual(rows[0]["show_time"], "2024-04-01T18:00:00")
+        self.assertEqual(self.export(output="ndjson", **{"from": "2024-03-29"}), "")
+        self.assertEqual(
+            self.export(output="ndjson", to="2024-03-27T12:00:00+02:00"), ""
+        )
+
+    def test_export_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.get("/api/planetarium/exports/tickets/")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_output_format(self):
+        response = self.client.get(
+            "/api/planetarium/exports/tickets/", {"output": "xlsx"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command(
+            "export_tickets", "--from", "2024-03-28", "--chunk-size", "1",
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].endswith(",Small Dome"))
+
+
+class OccupancyAnalyticsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.themes = [
+            ShowTheme.objects.create(name=name)
+            for name in ("Galaxies", "Stars")
+        ]
+        astronomy_show = AstronomyShow.objects.create(
+            title="Andromeda", description="Test Description"
+        )
+        astronomy_show.theme.set(self.themes)
+        self.dome = PlanetariumDome.objects.create(
+            name="Main Dome", rows=5, seats_in_row=10
+        )
+        self.show_sessions = [
+            ShowSession.objects.create(
+                astronomy_show=astronomy_show,
+                planetarium_dome=self.dome,
+                show_time=datetime(2024, 4, day, 18),
+            )
+            for day in (1, 3)
+        ]
+        self.reservation = Reservation.objects.create(user=self.user)
+        self.sell(self.show_sessions[0], 1, 2)
+
+    def sell(self, show_session, *seats):
+        for seat in seats:
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=show_session,
+                reservation=self.reservation,
+            )
+
+    def get_occupancy(self, **params):
+        response = self.client.get(
+            "/api/planetarium/analytics/occupancy/", params
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_occupancy_per_day_and_dome(self):
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy()
+
+        self.assertEqual(
+            [
+                (str(row["period"]), row["dome_name"], row["sessions"],
+                 row["tickets_sold"], row["capacity"], row["occupancy"])
+                for row in rows
+            ],
+            [
+                ("2024-04-01", "Main Dome", 1, 2, 50, 0.04),
+                ("2024-04-03", "Main Dome", 1, 0, 50, 0),
+            ],
+        )
+
+    def test_refresh_picks_up_new_tickets(self):
+        call_command("refresh_analytics", stdout=StringIO())
+        self.sell(self.show_sessions[1], 1, 2, 3)
+        out = StringIO()
+
+        call_command("refresh_analytics", stdout=out)
+
+        self.assertIn("Refreshed 1 session(s)", out.getvalue())
+        rows = self.get_occupancy(bucket="week", to="2024-04-07")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(str(rows[0]["period"]), "2024-04-01")
+        self.assertEqual(rows[0]["sessions"], 2)
+        self.assertEqual(rows[0]["tickets_sold"], 5)
+        self.assertEqual(rows[0]["occupancy"], 0.05)
+
+    def test_refresh_picks_up_tickets_committed_late(self):
+        last_id = Ticket.objects.order_by("-id").first().id
+        # The ticket with the next id commits after this one.
+        Ticket.objects.create(
+            id=last_id + 2,
+            row=1,
+            seat=1,
+            show_session=self.show_sessions[1],
+            reservation=self.reservation,
+        )
+        call_command("refresh_analytics", stdout=StringIO())
+        Ticket.objects.create(
+            id=last_id + 1,
+            row=1,
+            seat=2,
+            show_session=self.show_sessions[1],
+            reservation=self.reservation,
+        )
+
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy()
+        self.assertEqual([row["tickets_sold"] for row in rows], [2, 2])
+
+    def test_occupancy_per_theme(self):
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy(bucket="month", group_by="theme")
+        self.assertEqual(
+            [(row["theme_name"], row["tickets_sold"]) for row in rows],
+            [("Galaxies", 2), ("Stars", 2)],
+        )
+
+        rows = self.get_occupancy(theme=self.themes[1].id)
+        self.assertEqual([row["tickets_sold"] for row in rows], [2, 0])
+
+    def test_refresh_picks_up_deleted_tickets(self):
+        call_command("refresh_analytics", stdout=StringIO())
+        Ticket.objects.first().delete()
+
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy()
+        self.assertEqual([row["tickets_sold"] for row in rows], [1, 0])
+        self.assertFalse(DirtyShowSession.objects.exists())
+
+    def test_refresh_picks_up_reservations(self):
+        call_command("refresh_analytics", stdout=StringIO())
+        response = self.client.post(
+            "/api/planetarium/reservations/",
+            {"tickets": [
+                {"row": 2, "seat": 1, "show_session": self.show_sessions[1].id}
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy()
+        self.assertEqual([row["tickets_sold"] for row in rows], [2, 1])
+
+    def test_refresh_reads_archived_sessions(self):
+        call_command("refresh_analytics", stdout=StringIO())
+        Ticket.objects.first().delete()
+        archive_batch([self.show_sessions[0].id])
+
+        call_command("refresh_analytics", stdout=StringIO())
+
+        rows = self.get_occupancy()
+        self.assertEqual([row["tickets_sold"] for row in rows], [1, 0])
+
+    def test_rebuild(self):
+        call_command("refresh_analytics", stdout=StringIO())
+        SessionOccupancy.objects.update(tickets_sold=0)
+
+        call_command("refresh_analytics", "--rebuild", stdout=StringIO())
+
+        rows = self.get_occupancy()
+        self.assertEqual([row["tickets_sold"] for row in rows], [2, 0])
+
+    def test_analytics_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.get("/api/planetarium/analytics/occupancy/")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_bucket(self):
+        response = self.client.get(
+            "/api/planetarium/analytics/occupancy/", {"bucket": "year"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportScheduleCommandTestCase(TestCase):
+    def setUp(self):
+        ShowTheme.objects.create(name="Stars")
+        PlanetariumDome.objects.create(name="Main Dome", rows=5, seats_in_row=10)
+
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, "w") as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def import_schedule(self, path, *args):
+        out = StringIO()
+        call_command(
+            "import_schedule", path, *args, stdout=out, stderr=out
+        )
+        return out.getvalue()
+
+    def test_import_csv_in_chunks(self):
+        path = self.write_file(".csv", (
+            "type,name,title,description,themes,rows,seats_in_row,show,dome,show_time\n"
+            "theme,Galaxies,,,,,,,,\n"
+            "theme,Stars,,,,,,,,\n"
+            "show,,Andromeda,Our neighbour,Galaxies|Stars,,,,,\n"
+            "dome,Small Dome,,,,2,10,,,\n"
+            "session,,,,,,,Andromeda,Small Dome,2024-03-28T18:00:00\n"
+            "session,,,,,,,Andromeda,Main Dome,2024-03-29 18:00\n"
+        ))
+
+        output = self.import_schedule(path, "--chunk-size", "2")
+
+        self.assertIn("6 records (", output)
+        self.assertIn(
+            "1 themes, 1 shows, 1 domes, 2 sessions, 1 skipped, 0 errors",
+            output,
+        )
+        andromeda = AstronomyShow.objects.get(title="Andromeda")
+        self.assertEqual(
+            set(andromeda.theme.values_list("name", flat=True)),
+            {"Galaxies", "Stars"},
+        )
+        self.assertEqual(
+            sorted(andromeda.sessions.values_list(
+                "planetarium_dome__name", flat=True
+            )),
+            ["Main Dome", "Small Dome"],
+        )
+        self.assertEqual(ShowTheme.objects.filter(name="Stars").count(), 1)
+        self.assertTrue(
+            AstronomyShow.objects.filter(search_vector__contains="neighbour")
+            .exists()
+        )
+
+    def test_invalid_records_roll_back_the_import(self):
+        path = self.write_file(".jsonl", "\n".join([
+            json.dumps({"type": "theme", "name": "Galaxies"}),
+            "{broken",
+            json.dumps({"type": "planet", "name": "Mars"}),
+            json.dumps({"type": "dome", "name": "Dome", "rows": 0, "seats_in_row": 5}),
+            json.dumps({
+                "type": "session", "show": "Unknown", "dome": "Main Dome",
+                "show_time": "2024-03-28T18:00:00",
+            }),
+        ]))
+
+        with self.assertRaisesMessage(CommandError, "4 invalid record(s)"):
+            output = StringIO()
+            call_command(
+                "import_schedule", path, stdout=output, stderr=output
+            )
+
+        errors = output.getvalue()
+        for line_number, message in [
+            (2, "Expecting property name"),
+            (3, "'type' must be one of"),
+            (4, "'rows' must be a positive integer"),
+            (5, "Unknown show: Unknown"),
+        ]:
+            self.assertIn(f"Line {line_number}: {message}", errors)
+        self.assertFalse(ShowTheme.objects.filter(name="Galaxies").exists())
+
+    def test_dry_run(self):
+        path = self.write_file(".jsonl", json.dumps(
+            {"type": "theme", "name": "Galaxies"}
+        ))
+
+        output = self.import_schedule(path, "--dry-run")
+
+        self.assertIn("Dry run finished", output)
+        self.assertFalse(ShowTheme.objects.filter(name="Galaxies").exists())
+
+    @skipIf(connection.vendor == "postgresql", "COPY is supported")
+    def test_copy_requires_postgresql(self):
+        path = self.write_file(".jsonl", "")
+        with self.assertRaisesMessage(CommandError, "requires PostgreSQL"):
+            self.import_schedule(path, "--copy")
+
+
+class SeedCommandTestCase(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed", "--users", "5", "--shows", "6", "--domes", "2",
+            "--sessions", "20", "--tickets", "300", "--start", "2024-03-01",
+            "--days", "14", "--batch-size", "50", *args, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(AstronomyShow.objects.order_by("id").values_list("title")),
+            list(ShowSession.objects.order_by("id").values_list(
+                "show_time", "tickets_sold"
+            )),
+            list(Ticket.objects.order_by("id").values_list("row", "seat")),
+        )
+
+    def test_seed_generates_consistent_data(self):
+        self.seed()
+
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(ShowSession.objects.count(), 20)
+        tickets = Ticket.objects.count()
+        self.assertGreater(tickets, 0)
+        self.assertLessEqual(tickets, 300)
+        self.assertFalse(Reservation.objects.filter(
+            created_at__gt=F("tickets__show_session__show_time")
+        ).exists())
+        out = StringIO()
+        call_command("sync_tickets_sold", stdout=out)
+        self.assertIn("No drift found", out.getvalue())
+        self.assertTrue(self.client.login(
+            email="seed0.user0@example.com", password="password"
+        ))
+
+    def test_seed_is_deterministic(self):
+        self.seed("--seed", "7")
+        first = self.snapshot()
+        for model in (
+            Ticket, Reservation, ShowSession, AstronomyShow, ShowTheme,
+            PlanetariumDome, get_user_model(),
+        ):
+            model.objects.all().delete()
+
+        self.seed("--seed", "7")
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_seed_can_be_used_once(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class PerformanceMiddlewareTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+
+    def test_server_timing_header(self):
+        ShowTheme.objects.create(name="Stars")
+
+        response = self.client.get("/api/planetarium/show_themes/")
+
+        timings = dict(
+            timing.split(";", 1)[0:2]
+            for timing in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(
+            set(timings), {"total", "db", "serialize", "render"}
+        )
+        self.assertIn('desc="', timings["db"])
+
+    def test_async_views_are_timed(self):
+        seed_planetarium(self.user, size=2)
+        view = get_async_read_urls(router.urls, ["sessions-list"])[0].callback
+        middleware = PerformanceMiddleware(view)
+
+        response = async_to_sync(middleware)(AsyncRequestFactory().get(
+            "/api/planetarium/sessions/",
+            AUTHORIZATION=f"Token {self.token.key}",
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [timing.split(";")[0]
+             for timing in response["Server-Timing"].split(", ")],
+            ["total", "db", "serialize", "render"],
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/planetarium/show_themes/")
+        self.client.force_login(self.user)
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        labels = 'view="planetarium:showtheme-list",method="GET"'
+        self.assertIn(
+            f"planetarium_request_duration_seconds_count{{{labels}}} 1",
+            content,
+        )
+        self.assertIn(
+            f'planetarium_request_db_queries_bucket{{{labels},le="+Inf"}} 1',
+            content,
+        )
+        self.assertIn(
+            f"planetarium_response_size_bytes_sum{{{labels}}}", content
+        )
+
+    def test_metrics_are_staff_only_without_a_token(self):
+        self.client.force_login(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="testpassword"
+            )
+        )
+
+        self.assertEqual(
+            self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.client.credentials()
+
+        self.assertEqual(
+            self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            self.client.get(
+                "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+            ).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_async_requests_are_measured(self):
+        async def get_response(request):
+            return HttpResponse("ok")
+
+        middleware = PerformanceMiddleware(get_response)
+        response = async_to_sync(middleware)(
+            AsyncRequestFactory().get("/unknown/")
+        )
+
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn(
+            'planetarium_request_duration_seconds_count{view="unmatched",'
+            'method="GET"} 1',
+            "\n".join(REQUEST_DURATION.expose()),
+        )
+
+
+class WaitForDbCommandTestCase(TestCase):
+    @mock.patch("services.management.commands.wait_for_db.time.sleep")
+    def test_retries_with_backoff(self, sleep):
+        with mock.patch(
+            "services.management.commands.wait_for_db.Command.probe_database",
+            side_effect=[OperationalError, OperationalError, None],
+        ) as probe_database:
+            call_command("wait_for_db", stdout=StringIO())
+
+        self.assertEqual(probe_database.call_count, 3)
+        self.assertEqual(
+            [call.args[0] for call in sleep.call_args_list], [0.1, 0.2]
+        )
+
+    @mock.patch("services.management.commands.wait_for_db.time.sleep")
+    def test_gives_up_after_timeout(self, sleep):
+        with mock.patch(
+            "services.management.commands.wait_for_db.Command.probe_database",
+            side_effect=OperationalError("connection refused"),
+        ):
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", "--timeout", "0", stdout=StringIO())
+
+    def test_runs_a_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command("wait_for_db", stdout=StringIO())
+
+        self.assertEqual(queries[0]["sql"], "SELECT 1")
+
+    def test_runs_with_system_checks(self):
+        out = StringIO()
+        call_command("wait_for_db", skip_checks=False, stdout=out)
+
+        self.assertIn("Database available!", out.getvalue())
+
+
+class ConnectionTimingTestCase(TestCase):
+    def test_new_connections_are_timed(self):
+        DB_CONNECTION_DURATION.clear()
+        wrapper_class = type(
+            "DatabaseWrapper",
+            (ConnectionTimingMixin, type(connections["default"])),
+            {},
+        )
+        timed_connection = wrapper_class(
+            {**connection.settings_dict, "NAME": ":memory:"}, alias="timed"
+        )
+
+        timed_connection.connect()
+        timed_connection.close()
+
+        self.assertIn(
+            'planetarium_db_connection_seconds_count{database="timed"} 1',
+            DB_CONNECTION_DURATION.expose(),
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.show_session = seed_planetarium(self.user, size=2)[0]
+
+    def get_read_aliases(self, method, url, data=None):
+        """Databases the router picks for the request's reads.
+
+        Queries still run on the default database, which is the only one
+        of the test settings.
+        """
+        aliases = []
+        get_alias = ReplicaReads.get_alias
+
+        def record(state):
+            aliases.append(get_alias(state))
+
+        with mock.patch.object(
+            ReplicaReads, "get_alias", autospec=True, side_effect=record
+        ):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 400, response.content)
+        return set(aliases)
+
+    def test_session_reads_go_to_a_replica(self):
+        self.assertEqual(
+            self.get_read_aliases("get", "/api/planetarium/sessions/"),
+            {"replica"},
+        )
+
+    def test_reservations_and_writes_stay_on_the_primary(self):
+        self.assertEqual(
+            self.get_read_aliases("get", "/api/planetarium/reservations/"),
+            {None},
+        )
+        self.assertEqual(
+            self.get_read_aliases(
+                "post",
+                f"/api/planetarium/sessions/{self.show_session.id}/holds/",
+                {"seats": [{"row": 1, "seat": 30}]},
+            ),
+            {None},
+        )
+
+    def write(self):
+        response = self.client.post(
+            "/api/planetarium/reservations/",
+            {"tickets": [
+                {"row": 20, "seat": 1, "show_session": self.show_session.id}
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        self.write()
+
+        self.assertEqual(
+            self.get_read_aliases("get", "/api/planetarium/sessions/"),
+            {"default"},
+        )
+
+    def token_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        return client
+
+    def test_pin_holds_for_clients_without_cookies(self):
+        self.client = self.token_client()
+        self.write()
+
+        # A new client sends no cookies from the write.
+        self.client = self.token_client()
+        self.assertEqual(
+            self.get_read_aliases("get", "/api/planetarium/sessions/"),
+            {"default"},
+        )
+
+    def test_pin_of_another_user_is_ignored(self):
+        self.write()
+        other = get_user_model().objects.create_user(
+            email="other@test.com", password="testpassword"
+        )
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(
+            self.get_read_aliases("get", "/api/planetarium/sessions/"),
+            {"replica"},
+        )
+
+    def test_router_ignores_other_apps(self):
+        request = RequestFactory().get("/")
+        state = ReplicaReads(request)
+        state.allowed = True
+        token = replica_reads.set(state)
+        try:
+            router = ReplicaRouter()
+            self.assertIsNone(router.db_for_read(get_user_model()))
+            self.assertEqual(router.db_for_read(ShowSession), "replica")
+            self.assertEqual(router.db_for_write(ShowSession), "default")
+        finally:
+            replica_reads.reset(token)
+
+        self.assertIsNone(ReplicaRouter().db_for_read(ShowSession))
+
+
+@skipIf(not settings.DATABASE_REPLICAS, "No replica databases configured")
+class ReplicaDatabaseTestCase(BaseTestCase):
+    databases = "__all__"
+
+    def test_session_list_queries_the_replica(self):
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with mock.patch("random.choice", return_value=replica.alias):
+            with CaptureQueriesContext(replica) as queries:
+                response = self.client.get("/api/planetarium/sessions/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(queries)
+
+
+class ArchiveSessionsCommandTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        astronomy_show = AstronomyShow.objects.create(
+            title="Andromeda", description="Test Description"
+        )
+        self.dome = PlanetariumDome.objects.create(
+            name="Main Dome", rows=5, seats_in_row=10
+        )
+        self.show_sessions = [
+            ShowSession.objects.create(
+                astronomy_show=astronomy_show,
+                planetarium_dome=self.dome,
+                show_time=datetime(2024, 4, day, 18),
+            )
+            for day in (1, 2, 10)
+        ]
+        self.reservation = Reservation.objects.create(user=self.user)
+        for show_session in self.show_sessions:
+            for seat in (1, 2):
+                Ticket.objects.create(
+                    row=1,
+                    seat=seat,
+                    show_session=show_session,
+                    reservation=self.reservation,
+                )
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command(
+            "archive_sessions", "--before", "2024-04-05", *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_archive_moves_past_sessions_in_batches(self):
+        with mock.patch("services.signals.publish_seat_event") as publish:
+            out = self.archive("--batch-size", "1")
+
+        publish.assert_not_called()
+        self.assertIn("Archived 2 session(s) and 4 ticket(s)", out)
+        self.assertEqual(
+            list(ShowSession.objects.values_list("id", flat=True)),
+            [self.show_sessions[2].id],
+        )
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(
+            sorted(ArchivedShowSession.objects.values_list("id", "tickets_sold")),
+            [(self.show_sessions[0].id, 2), (self.show_sessions[1].id, 2)],
+        )
+        self.assertEqual(
+            ArchivedTicket.objects.filter(
+                reservation=self.reservation
+            ).count(),
+            4,
+        )
+
+    def test_dry_run(self):
+        out = self.archive("--dry-run")
+
+        self.assertIn("Would archive 2 session(s) and 4 ticket(s)", out)
+        self.assertFalse(ArchivedShowSession.objects.exists())
+
+    def test_reservation_history_includes_archived_tickets(self):
+        self.archive()
+
+        response = self.client.get("/api/planetarium/reservations/")
+
+        tickets = response.data["results"][0]["tickets"]
+        self.assertEqual(len(tickets), 6)
+        self.assertEqual(
+            {ticket["show_session"]["id"] for ticket in tickets},
+            {show_session.id for show_session in self.show_sessions},
+        )
+        self.assertEqual(
+            tickets[-1]["show_session"]["planetarium_dome_name"], "Main Dome"
+        )
+
+    def test_export_includes_archived_tickets(self):
+        self.archive()
+
+        response = self.client.get(
+            "/api/planetarium/exports/tickets/", {"output": "ndjson"}
+        )
+
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["show_time"], "2024-04-01T18:00:00")
+        self.assertEqual(rows[-1]["show_time"], "2024-04-10T18:00:00")
+
+    def test_analytics_rebuild_keeps_archived_sessions(self):
+        self.archive()
+
+        call_command("refresh_analytics", "--rebuild", stdout=StringIO())
+
+        response = self.client.get(
+            "/api/planetarium/analytics/occupancy/", {"bucket": "month"}
+        )
+        self.assertEqual(response.data[0]["sessions"], 3)
+        self.assertEqual(response.data[0]["tickets_sold"], 6)
+
+
+class SparseFieldsetTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_planetarium(self.user, size=3)
+        self.show_session = ShowSession.objects.order_by("id").first()
+
+    def get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [query["sql"] for query in queries]
+
+    def test_fields_narrow_the_response_and_the_select(self):
+        data, queries = self.get(
+            "/api/planetarium/sessions/",
+            fields="id,show_time,tickets_available",
+        )
+
+        self.assertEqual(
+            set(data[0]), {"id", "show_time", "tickets_available"}
+        )
+        self.assertEqual(data[-1]["tickets_available"], 598)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("astronomyshow", queries[0])
+        self.assertNotIn('"name"', queries[0])
+
+    def test_expand_is_opt_in(self):
+        data, _ = self.get("/api/planetarium/sessions/")
+        self.assertNotIn("astronomy_show", data[0])
+
+        data, queries = self.get(
+            "/api/planetarium/sessions/",
+            fields="id", expand="astronomy_show,planetarium_dome",
+        )
+
+        self.assertEqual(
+            set(data[0]), {"id", "astronomy_show", "planetarium_dome"}
+        )
+        self.assertEqual(len(data[0]["astronomy_show"]["theme"]), 2)
+        self.assertEqual(data[0]["planetarium_dome"]["capacity"], 600)
+        # Sessions with their show and dome, then the show themes.
+        self.assertEqual(len(queries), 2)
+
+    def test_nested_fields(self):
+        data, queries = self.get(
+            f"/api/planetarium/sessions/{self.show_session.id}/",
+            fields="id,astronomy_show.title",
+        )
+
+        self.assertEqual(
+            data, {"id": self.show_session.id, "astronomy_show": {
+                "title": self.show_session.astronomy_show.title
+            }}
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("description", queries[0])
+
+        data, _ = self.get(
+            "/api/planetarium/reservations/",
+            fields="id,tickets.row,tickets.show_session.show_time",
+        )
+        self.assertEqual(
+            set(data["results"][0]["tickets"][0]), {"row", "show_session"}
+        )
+
+    def test_unknown_fields(self):
+        for params in ({"fields": "id,price"}, {"expand": "tickets"}):
+            response = self.client.get("/api/planetarium/sessions/", params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_expanding_a_rendered_field_is_a_no_op(self):
+        data, _ = self.get(
+            "/api/planetarium/sessions/", expand="astronomy_show.theme"
+        )
+        self.assertEqual(len(data[0]["astronomy_show"]["theme"]), 2)
+
+        response = self.client.get(
+            "/api/planetarium/sessions/", {"expand": "astronomy_show.price"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["expand"],
+            "Unknown field(s): astronomy_show.price",
+        )
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post(
+            "/api/planetarium/sessions/?fields=id",
+            {
+                "astronomy_show": self.show_session.astronomy_show_id,
+                "planetarium_dome": self.show_session.planetarium_dome_id,
+                "show_time": "2024-05-01T18:00:00",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("show_time", response.data)
+
+
+class SyncTicketsSoldCommandTestCase(TestCase):
+    def setUp(self):
+        planetarium_dome = PlanetariumDome.objects.create(
+            name="Test Dome", rows=5, seats_in_row=10
+        )
+        astronomy_show = AstronomyShow.objects.create(
+            title="Test Show", description="Test Description"
+        )
+        self.show_session = ShowSession.objects.create(
+            astronomy_show=astronomy_show,
+            planetarium_dome=planetarium_dome,
+            show_time=datetime.now(),
+        )
+        reservation = Reservation.objects.create(
+            user=get_user_model().objects.create_user(
+                email="test@test.com", password="testpassword"
+            )
+        )
+        for seat in range(1, 4):
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                show_session=self.show_session,
+                reservation=reservation,
+            )
+
+    def test_ticket_save_counts_tickets_sold(self):
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 3)
+
+    def test_verify_without_drift(self):
+        out = StringIO()
+        call_command("sync_tickets_sold", stdout=out)
+        self.assertIn("No drift found", out.getvalue())
+
+    def test_verify_and_repair_drift(self):
+        ShowSession.objects.update(tickets_sold=10)
+
+        with self.assertRaises(CommandError):
+            call_command("sync_tickets_sold", stdout=StringIO())
+
+        call_command("sync_tickets_sold", "--repair", stdout=StringIO())
+
+        self.show_session.refresh_from_db()
+        self.assertEqual(self.show_session.tickets_sold, 3)
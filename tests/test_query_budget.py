@@ -0,0 +1,334 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from services.holds import get_seat_hold_store
+from services.models import (
+    ShowTheme, AstronomyShow, PlanetariumDome, ShowSession, Ticket
+)
+from tests.utils import seed_planetarium
+
+
+# Maximum number of SQL queries per (url name, method), including the token
+# lookup of TokenAuthentication. Read endpoints must also not grow with the
+# number of rows they return.
+QUERY_BUDGETS = {
+    ("planetarium:api-root", "get"): 0,
+    ("planetarium:showtheme-list", "get"): 2,
+    ("planetarium:showtheme-list", "post"): 2,
+    ("planetarium:showtheme-detail", "get"): 2,
+    ("planetarium:showtheme-detail", "patch"): 6,
+    ("planetarium:showtheme-detail", "delete"): 7,
+    ("planetarium:astronomyshow-list", "get"): 3,
+    ("planetarium:astronomyshow-list", "post"): 11,
+    ("planetarium:astronomyshow-detail", "get"): 3,
+    ("planetarium:astronomyshow-detail", "patch"): 7,
+    ("planetarium:astronomyshow-detail", "delete"): 9,
+    ("planetarium:planetariumdome-list", "get"): 2,
+    ("planetarium:planetariumdome-list", "post"): 3,
+    ("planetarium:planetariumdome-detail", "get"): 2,
+    ("planetarium:planetariumdome-detail", "patch"): 3,
+    ("planetarium:planetariumdome-detail", "delete"): 5,
+    ("planetarium:showsession-list", "get"): 2,
+    ("planetarium:showsession-list", "post"): 4,
+    ("planetarium:showsession-detail", "get"): 4,
+    ("planetarium:showsession-detail", "patch"): 3,
+    ("planetarium:showsession-detail", "delete"): 5,
+    ("planetarium:showsession-hold", "post"): 3,
+    ("planetarium:showsession-release-hold", "delete"): 1,
+    ("planetarium:showsession-events", "get"): 3,
+    ("planetarium:ticket-export", "get"): 3,
+    ("planetarium:occupancy-analytics", "get"): 2,
+    ("planetarium:reservation-list", "get"): 8,
+    ("planetarium:reservation-list", "post"): 9,
+    ("user:create", "post"): 2,
+    ("user:login", "post"): 5,
+    ("user:token-refresh", "post"): 1,
+    ("user:token-revoke", "post"): 0,
+    ("user:manage", "get"): 1,
+    ("user:manage", "patch"): 2,
+}
+
+# Admin pages, including the session and user lookups of the admin login.
+ADMIN_QUERY_BUDGETS = {
+    "admin:services_ticket_changelist": 5,
+    "admin:services_reservation_changelist": 6,
+    "admin:services_showsession_changelist": 7,
+    "admin:services_ticket_change": 13,
+}
+
+READ_ENDPOINTS = (
+    ("planetarium:showtheme-list", {}),
+    ("planetarium:astronomyshow-list", {}),
+    ("planetarium:planetariumdome-list", {}),
+    ("planetarium:showsession-list", {}),
+    ("planetarium:showsession-detail", {"seat_map": "bitmap"}),
+    ("planetarium:reservation-list", {}),
+)
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="testpassword",
+            is_staff=True,
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def count_queries(self, url_name, method="get", kwargs=None, data=None):
+        url = reverse(url_name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(
+            response.status_code, 400, f"{method.upper()} {url}: {response.content}"
+        )
+        return len(queries)
+
+    def assert_query_budget(self, url_name, method="get", kwargs=None, data=None):
+        budget = QUERY_BUDGETS[(url_name, method)]
+        count = self.count_queries(url_name, method, kwargs, data)
+        self.assertLessEqual(
+            count,
+            budget,
+            f"{method.upper()} {url_name} ran {count} queries, budget {budget}",
+        )
+
+    def endpoint_requests(self):
+        sessions = seed_planetarium(self.user, size=5)
+        show_session = sessions[0]
+        theme = ShowTheme.objects.first()
+        astronomy_show = AstronomyShow.objects.first()
+        planetarium_dome = PlanetariumDome.objects.create(
+            name="Empty Dome", rows=10, seats_in_row=10
+        )
+        return [
+            ("planetarium:api-root", "get", None, None),
+            ("planetarium:showtheme-list", "get", None, None),
+            ("planetarium:showtheme-list", "post", None, {"name": "New Theme"}),
+            ("planetarium:showtheme-detail", "get", {"pk": theme.id}, None),
+            (
+                "planetarium:showtheme-detail", "patch",
+                {"pk": theme.id}, {"name": "Renamed Theme"},
+            ),
+            ("planetarium:astronomyshow-list", "get", None, None),
+            (
+                "planetarium:astronomyshow-detail", "get",
+                {"pk": astronomy_show.id}, None,
+            ),
+            (
+                "planetarium:astronomyshow-list", "post", None,
+                {"title": "New", "description": "New", "theme": [theme.id]},
+            ),
+            (
+                "planetarium:astronomyshow-detail", "patch",
+                {"pk": astronomy_show.id}, {"title": "Renamed Show"},
+            ),
+            ("planetarium:planetariumdome-list", "get", None, None),
+            (
+                "planetarium:planetariumdome-detail", "get",
+                {"pk": planetarium_dome.id}, None,
+            ),
+            (
+                "planetarium:planetariumdome-list", "post", None,
+                {"name": "New Dome", "rows": 5, "seats_in_row": 5},
+            ),
+            (
+                "planetarium:planetariumdome-detail", "patch",
+                {"pk": planetarium_dome.id}, {"rows": 12},
+            ),
+            ("planetarium:showsession-list", "get", None, None),
+            (
+                "planetarium:showsession-list", "post", None,
+                {
+                    "astronomy_show": astronomy_show.id,
+                    "planetarium_dome": planetarium_dome.id,
+                    "show_time": "2024-03-28T12:00:00",
+                },
+            ),
+            (
+                "planetarium:showsession-detail", "get",
+                {"pk": show_session.id}, None,
+            ),
+            (
+                "planetarium:showsession-detail", "patch",
+                {"pk": show_session.id}, {"show_time": "2024-03-29T12:00:00"},
+            ),
+            (
+                "planetarium:showsession-hold", "post",
+                {"pk": show_session.id},
+                {"seats": [{"row": 19, "seat": 1}, {"row": 19, "seat": 2}]},
+            ),
+            ("planetarium:reservation-list", "get", None, None),
+            (
+                "planetarium:reservation-list", "post", None,
+                {"tickets": [
+                    {"row": 20, "seat": seat, "show_session": session.id}
+                    for session in sessions
+                    for seat in range(1, 4)
+                ]},
+            ),
+            (
+                "planetarium:occupancy-analytics", "get", None,
+                {"bucket": "week", "group_by": "theme"},
+            ),
+            ("user:manage", "get", None, None),
+            ("user:manage", "patch", None, {"first_name": "Test"}),
+            (
+                "planetarium:showsession-detail", "delete",
+                {"pk": show_session.id}, None,
+            ),
+            (
+                "planetarium:astronomyshow-detail", "delete",
+                {"pk": astronomy_show.id}, None,
+            ),
+            (
+                "planetarium:planetariumdome-detail", "delete",
+                {"pk": planetarium_dome.id}, None,
+            ),
+            ("planetarium:showtheme-detail", "delete", {"pk": theme.id}, None),
+        ]
+
+    def test_endpoints_stay_within_query_budget(self):
+        for url_name, method, kwargs, data in self.endpoint_requests():
+            with self.subTest(url_name=url_name, method=method):
+                self.assert_query_budget(url_name, method, kwargs, data)
+
+    def test_release_hold_stays_within_query_budget(self):
+        show_session = seed_planetarium(self.user, size=2)[0]
+        hold = get_seat_hold_store().hold(
+            show_session.id, [(1, 10)], self.user.id, ttl=60
+        )
+
+        self.assert_query_budget(
+            "planetarium:showsession-release-hold",
+            "delete",
+            kwargs={"pk": show_session.id, "hold_id": hold["id"]},
+        )
+
+    @override_settings(SEAT_EVENTS_STREAM_TIMEOUT=0)
+    def test_event_stream_stays_within_query_budget(self):
+        show_session = seed_planetarium(self.user, size=2)[0]
+        url = reverse(
+            "planetarium:showsession-events", kwargs={"pk": show_session.id}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            b"".join(response.streaming_content)
+
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[("planetarium:showsession-events", "get")]
+        )
+
+    def test_ticket_export_stays_within_query_budget(self):
+        seed_planetarium(self.user, size=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("planetarium:ticket-export"))
+            b"".join(response.streaming_content)
+
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[("planetarium:ticket-export", "get")]
+        )
+
+    def test_anonymous_endpoints_stay_within_query_budget(self):
+        self.client.credentials()
+        data = {"email": "new@test.com", "password": "testpassword"}
+
+        self.assert_query_budget("user:create", "post", data=data)
+        self.assert_query_budget("user:login", "post", data=data)
+
+    def test_token_endpoints_stay_within_query_budget(self):
+        for url_name in ("user:token-refresh", "user:token-revoke"):
+            refresh = self.client.post(
+                reverse("user:login"),
+                {"email": "test@test.com", "password": "testpassword"},
+            ).data["refresh"]
+
+            self.assert_query_budget(
+                url_name, "post", data={"refresh": refresh}
+            )
+
+    def test_bearer_tokens_skip_the_token_lookup(self):
+        seed_planetarium(self.user, size=2)
+        show_session = ShowSession.objects.first()
+        access = self.client.post(
+            reverse("user:login"),
+            {"email": "test@test.com", "password": "testpassword"},
+        ).data["access"]
+
+        for url_name, data in READ_ENDPOINTS:
+            kwargs = self.detail_kwargs(url_name, show_session)
+            with self.subTest(url_name=url_name):
+                cache.clear()
+                token_queries = self.count_queries(url_name, kwargs=kwargs, data=data)
+                cache.clear()
+                self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+                bearer_queries = self.count_queries(url_name, kwargs=kwargs, data=data)
+                self.client.credentials(
+                    HTTP_AUTHORIZATION="Token " + self.token.key
+                )
+                self.assertEqual(bearer_queries, token_queries - 1)
+
+    def test_read_queries_do_not_grow_with_result_size(self):
+        seed_planetarium(self.user, size=2)
+        show_session = ShowSession.objects.first()
+
+        small = {
+            url_name: self.count_queries(url_name, kwargs=self.detail_kwargs(
+                url_name, show_session), data=data)
+            for url_name, data in READ_ENDPOINTS
+        }
+        seed_planetarium(self.user, size=10, seats_per_reservation=5)
+        large = {
+            url_name: self.count_queries(url_name, kwargs=self.detail_kwargs(
+                url_name, show_session), data=data)
+            for url_name, data in READ_ENDPOINTS
+        }
+
+        self.assertEqual(large, small)
+
+    def test_admin_pages_do_not_grow_with_table_size(self):
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        def count_admin_queries():
+            ticket = Ticket.objects.first()
+            counts = {}
+            for url_name, budget in ADMIN_QUERY_BUDGETS.items():
+                args = [ticket.id] if url_name.endswith("_change") else None
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(url_name, args=args))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(queries), budget, url_name)
+                counts[url_name] = len(queries)
+            return counts
+
+        seed_planetarium(self.user, size=2)
+        small = count_admin_queries()
+        seed_planetarium(self.user, size=10, seats_per_reservation=5)
+
+        for url_name, count in count_admin_queries().items():
+            self.assertLessEqual(count, small[url_name], url_name)
+
+    @staticmethod
+    def detail_kwargs(url_name, instance):
+        return {"pk": instance.id} if url_name.endswith("-detail") else None
+
+    def test_every_route_has_a_query_budget(self):
+        budgeted_url_names = {url_name for url_name, _ in QUERY_BUDGETS}
+        for namespace in ("planetarium", "user"):
+            resolver = get_resolver().namespace_dict[namespace][1]
+            for url_name in resolver.reverse_dict:
+                if isinstance(url_name, str):
+                    self.assertIn(f"{namespace}:{url_name}", budgeted_url_names)
@@ -1,6 +1,11 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient
 
+from user.authentication import decode_token, encode_token, revoke_token
+from user.checks import check_revocation_cache
 from user.serializers import UserSerializer
 
 
@@ -84,3 +89,138 @@ class UserSerializerTestCase(TestCase):
         updated_user = serializer.save()
 
         self.assertTrue(updated_user.check_password(new_password))
+
+
+class JWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com", password="testpassword"
+        )
+
+    def login(self):
+        response = self.client.post(
+            "/api/user/login/",
+            {"email": "test@test.com", "password": "testpassword"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def get_sessions(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.get("/api/planetarium/sessions/")
+
+    def test_login_returns_signed_tokens(self):
+        tokens = self.login()
+
+        self.assertIn("token", tokens)
+        self.assertEqual(
+            self.get_sessions(tokens["access"]).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(
+            self.get_sessions(tokens["refresh"]).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_access_token_permissions_come_from_claims(self):
+        access = self.login()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        response = self.client.post(
+            "/api/planetarium/show_themes/", {"name": "Stars"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.client.get("/api/user/me/").data["email"], "test@test.com"
+        )
+
+    def test_refresh_rotates_tokens(self):
+        refresh = self.login()["refresh"]
+
+        response = self.client.post(
+            "/api/user/token/refresh/", {"refresh": refresh}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.get_sessions(response.data["access"]).status_code,
+            status.HTTP_200_OK,
+        )
+
+        response = self.client.post(
+            "/api/user/token/refresh/", {"refresh": refresh}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoke_tokens(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+        response = self.client.post(
+            "/api/user/token/revoke/", {"refresh": tokens["refresh"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.get_sessions(tokens["access"]).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        response = self.client.post(
+            "/api/user/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_password_change_revokes_issued_tokens(self):
+        access = self.login()["access"]
+
+        serializer = UserSerializer(
+            instance=self.user, data={"password": "newpassword"}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(
+            self.get_sessions(access).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_signing_key_rotation(self):
+        keys = {"old": "old-secret", "new": "new-secret"}
+        with override_settings(JWT_SIGNING_KEYS=keys, JWT_ACTIVE_KEY_ID="old"):
+            access = encode_token(self.user, "access", 60)
+
+        with override_settings(JWT_SIGNING_KEYS=keys, JWT_ACTIVE_KEY_ID="new"):
+            self.assertEqual(
+                self.get_sessions(access).status_code, status.HTTP_200_OK
+            )
+        with override_settings(JWT_SIGNING_KEYS={"new": "new-secret"}):
+            self.assertEqual(
+                self.get_sessions(access).status_code,
+                status.HTTP_401_UNAUTHORIZED,
+            )
+
+    def test_expired_access_token(self):
+        access = encode_token(self.user, "access", -1)
+
+        self.assertEqual(
+            self.get_sessions(access).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_refresh_token_is_revoked_once(self):
+        payload = decode_token(self.login()["refresh"], "refresh")
+
+        self.assertTrue(revoke_token(payload))
+        self.assertFalse(revoke_token(payload))
+
+    @override_settings(DEBUG=False)
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual(
+            [warning.id for warning in check_revocation_cache(None)],
+            ["user.W001"],
+        )
+        with override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        }}):
+            self.assertEqual(check_revocation_cache(None), [])
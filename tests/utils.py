@@ -0,0 +1,177 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from services.cache import bump_resource_version
+from services.models import (
+    ShowTheme,
+    AstronomyShow,
+    PlanetariumDome,
+    Reservation,
+    ShowSession,
+    Ticket,
+)
+from services.search import update_search_vectors
+
+
+def seed_planetarium(user, size, seats_per_reservation=2):
+    """Bulk create `size` themes, shows, sessions and reservations of `user`.
+
+    Every show gets two themes and every reservation buys seats in two
+    different sessions, so nested serializers have related rows to load.
+    """
+    offset = ShowSession.objects.count()
+    themes = ShowTheme.objects.bulk_create(
+        ShowTheme(name=f"Theme {offset + number}") for number in range(size)
+    )
+    domes = PlanetariumDome.objects.bulk_create(
+        PlanetariumDome(
+            name=f"Dome {offset + number}", rows=20, seats_in_row=30
+        )
+        for number in range(2)
+    )
+    shows = AstronomyShow.objects.bulk_create(
+        AstronomyShow(
+            title=f"Show {offset + number}",
+            description=f"Description of show {offset + number}",
+        )
+        for number in range(size)
+    )
+    AstronomyShow.theme.through.objects.bulk_create(
+        AstronomyShow.theme.through(
+            astronomyshow_id=show.id,
+            showtheme_id=themes[(number + shift) % size].id,
+        )
+        for number, show in enumerate(shows)
+        for shift in (0, 1)
+    )
+    show_time = datetime(2024, 1, 1, 12) + timedelta(days=offset)
+    sessions = ShowSession.objects.bulk_create(
+        ShowSession(
+            astronomy_show=show,
+            planetarium_dome=domes[number % 2],
+            show_time=show_time + timedelta(days=number),
+        )
+        for number, show in enumerate(shows)
+    )
+    reservations = Reservation.objects.bulk_create(
+        Reservation(user=user) for _ in range(size)
+    )
+    tickets = Ticket.objects.bulk_create(
+        Ticket(
+            row=number % 20 + 1,
+            seat=seat,
+            show_session=sessions[(number + seat) % size],
+            reservation=reservation,
+        )
+        for number, reservation in enumerate(reservations)
+        for seat in range(1, seats_per_reservation + 1)
+    )
+    ShowSession.change_tickets_sold(
+        Counter(ticket.show_session_id for ticket in tickets)
+    )
+    update_search_vectors(show.id for show in shows)
+    bump_resource_version("show_themes", "shows", "domes")
+    return sessions
+
+
+def batched(objects, batch_size):
+    objects = iter(objects)
+    while batch := list(islice(objects, batch_size)):
+        yield batch
+
+
+def seed_dataset(
+    user, domes, shows, sessions, tickets, users=100, batch_size=10_000
+):
+    """Bulk create a dataset of the given size for benchmarks.
+
+    Sessions are spread over the shows and domes an hour apart; tickets
+    fill the sessions seat by seat in turn, four per reservation, and the
+    reservations are shared by `user` and `users` other users.
+    """
+    themes = ShowTheme.objects.bulk_create(
+        ShowTheme(name=f"Theme {number}") for number in range(max(shows // 4, 1))
+    )
+    planetarium_domes = PlanetariumDome.objects.bulk_create(
+        PlanetariumDome(name=f"Dome {number}", rows=20, seats_in_row=30)
+        for number in range(domes)
+    )
+    capacity = 20 * 30 * sessions
+    if tickets > capacity:
+        raise ValueError(f"{sessions} sessions only have {capacity} seats")
+
+    astronomy_shows = AstronomyShow.objects.bulk_create(
+        AstronomyShow(
+            title=f"Show {number}", description=f"Description of show {number}"
+        )
+        for number in range(shows)
+    )
+    AstronomyShow.theme.through.objects.bulk_create(
+        AstronomyShow.theme.through(
+            astronomyshow_id=show.id,
+            showtheme_id=themes[number % len(themes)].id,
+        )
+        for number, show in enumerate(astronomy_shows)
+    )
+    update_search_vectors(show.id for show in astronomy_shows)
+
+    show_time = datetime(2024, 1, 1, 12)
+    show_session_ids = []
+    for batch in batched(
+        (
+            ShowSession(
+                astronomy_show=astronomy_shows[number % shows],
+                planetarium_dome=planetarium_domes[number % domes],
+                show_time=show_time + timedelta(hours=number),
+            )
+            for number in range(sessions)
+        ),
+        batch_size,
+    ):
+        show_session_ids += [
+            show_session.id
+            for show_session in ShowSession.objects.bulk_create(batch)
+        ]
+
+    password = make_password("benchmarkpassword")
+    user_ids = [user.id] + [
+        other.id
+        for other in get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{number}@example.com", password=password)
+            for number in range(users)
+        )
+    ]
+
+    reservation_count = (tickets + 3) // 4
+    reservations_per_batch = max(batch_size // 4, 1)
+    for first in range(0, reservation_count, reservations_per_batch):
+        numbers = range(
+            first, min(first + reservations_per_batch, reservation_count)
+        )
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user_id=user_ids[number % len(user_ids)])
+            for number in numbers
+        )
+        Ticket.objects.bulk_create(
+            Ticket(
+                row=number // sessions // 30 + 1,
+                seat=number // sessions % 30 + 1,
+                show_session_id=show_session_ids[number % sessions],
+                reservation_id=reservation.id,
+            )
+            for reservation_number, reservation in zip(numbers, reservations)
+            for number in range(
+                reservation_number * 4, min(reservation_number * 4 + 4, tickets)
+            )
+        )
+
+    for batch in batched(enumerate(show_session_ids), batch_size):
+        ShowSession.change_tickets_sold({
+            show_session_id: tickets // sessions + (number < tickets % sessions)
+            for number, show_session_id in batch
+        })
+    bump_resource_version("show_themes", "shows", "domes")
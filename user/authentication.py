@@ -0,0 +1,183 @@
+import time
+import uuid
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    get_authorization_header,
+)
+
+ALGORITHM = "HS256"
+REVOKED_TOKEN_KEY = "planetarium:jwt:revoked:{jti}"
+REVOKED_USER_KEY = "planetarium:jwt:revoked-user:{user_id}"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenUser:
+    """User of a signed access token, built without a database query."""
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload):
+        self.id = self.pk = payload["user_id"]
+        self.is_staff = payload["is_staff"]
+
+    def __str__(self):
+        return f"TokenUser {self.id}"
+
+
+def encode_token(user, token_type, lifetime):
+    issued_at = time.time()
+    return jwt.encode(
+        {
+            "token_type": token_type,
+            "user_id": user.id,
+            "is_staff": user.is_staff,
+            "jti": uuid.uuid4().hex,
+            "iat": issued_at,
+            "exp": issued_at + lifetime,
+        },
+        settings.JWT_SIGNING_KEYS[settings.JWT_ACTIVE_KEY_ID],
+        algorithm=ALGORITHM,
+        headers={"kid": settings.JWT_ACTIVE_KEY_ID},
+    )
+
+
+def create_token_pair(user):
+    """Return a short-lived access token and a refresh token of the user"""
+    return {
+        "access": encode_token(
+            user, "access", settings.JWT_ACCESS_TOKEN_LIFETIME
+        ),
+        "refresh": encode_token(
+            user, "refresh", settings.JWT_REFRESH_TOKEN_LIFETIME
+        ),
+    }
+
+
+def verify_token(token, token_type):
+    """Return the payload of a token with a valid signature and type"""
+    try:
+        key_id = jwt.get_unverified_header(token).get("kid")
+        payload = jwt.decode(
+            token,
+            settings.JWT_SIGNING_KEYS[key_id],
+            algorithms=[ALGORITHM],
+            options={"require": ["exp", "iat", "jti"]},
+        )
+    except (jwt.InvalidTokenError, KeyError):
+        raise InvalidToken(_("Invalid or expired token."))
+
+    if payload.get("token_type") != token_type:
+        raise InvalidToken(_("Invalid token type."))
+    return payload
+
+
+def decode_token(token, token_type):
+    """Return the payload of a valid token; raise InvalidToken otherwise"""
+    payload = verify_token(token, token_type)
+    if is_revoked(payload, cache.get_many(get_revocation_keys(payload))):
+        raise InvalidToken(_("Token has been revoked."))
+    return payload
+
+
+async def adecode_token(token, token_type):
+    payload = verify_token(token, token_type)
+    revoked = await cache.aget_many(get_revocation_keys(payload))
+    if is_revoked(payload, revoked):
+        raise InvalidToken(_("Token has been revoked."))
+    return payload
+
+
+def get_revocation_keys(payload):
+    return [
+        REVOKED_TOKEN_KEY.format(jti=payload["jti"]),
+        REVOKED_USER_KEY.format(user_id=payload["user_id"]),
+    ]
+
+
+def is_revoked(payload, revoked):
+    revoked_token_key, revoked_user_key = get_revocation_keys(payload)
+    return revoked_token_key in revoked or (
+        payload["iat"] < revoked.get(revoked_user_key, 0)
+    )
+
+
+def revoke_token(payload):
+    """Deny the token until it expires.
+
+    Return False if it was already revoked, e.g. by a concurrent request;
+    ``cache.add`` makes that atomic on a shared cache.
+    """
+    return cache.add(
+        REVOKED_TOKEN_KEY.format(jti=payload["jti"]),
+        True,
+        max(1, int(payload["exp"] - time.time()) + 1),
+    )
+
+
+def revoke_user_tokens(user_id):
+    """Deny every token of the user issued until now"""
+    cache.set(
+        REVOKED_USER_KEY.format(user_id=user_id),
+        time.time(),
+        settings.JWT_REFRESH_TOKEN_LIFETIME,
+    )
+
+
+class JWTAuthentication(BaseAuthentication):
+    """Authenticate ``Authorization: Bearer <access token>`` requests.
+
+    The user is built from the token claims, so permission checks based on
+    ``is_authenticated`` and ``is_staff`` don't touch the database.
+    Revoked tokens are looked up in the cache.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _("Invalid bearer header. Token string should be provided.")
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            msg = _("Invalid token header. Token string should not contain "
+                    "invalid characters.")
+            raise exceptions.AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        try:
+            payload = decode_token(token, "access")
+        except InvalidToken as error:
+            raise exceptions.AuthenticationFailed(str(error))
+
+        return TokenUser(payload), payload
+
+    async def aauthenticate_credentials(self, token):
+        try:
+            payload = await adecode_token(token, "access")
+        except InvalidToken as error:
+            raise exceptions.AuthenticationFailed(str(error))
+
+        return TokenUser(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
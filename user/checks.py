@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_revocation_cache(app_configs, **kwargs):
+    """Revoked tokens and used refresh tokens must be seen by every worker"""
+    if settings.DEBUG or (
+        settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+    ):
+        return []
+    return [
+        Warning(
+            "Token revocations are kept in a cache that is local to the "
+            "process.",
+            hint="Set CACHE_BACKEND to a cache shared by all workers, e.g. "
+                 "django.core.cache.backends.redis.RedisCache.",
+            id="user.W001",
+        )
+    ]
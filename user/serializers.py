@@ -2,6 +2,14 @@ from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
 from django.utils.translation import gettext as _
 
+from user.authentication import (
+    InvalidToken,
+    create_token_pair,
+    decode_token,
+    revoke_token,
+    revoke_user_tokens,
+)
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,6 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            revoke_user_tokens(user.id)
 
         return user
 
@@ -53,3 +62,30 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs["user"] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        try:
+            return decode_token(value, "refresh")
+        except InvalidToken as error:
+            raise serializers.ValidationError(str(error), code="authorization")
+
+
+class TokenRefreshSerializer(RefreshTokenSerializer):
+    def validate(self, attrs):
+        payload = attrs["refresh"]
+        user = get_user_model().objects.filter(
+            pk=payload["user_id"], is_active=True
+        ).first()
+        if user is None:
+            msg = _("User account is disabled.")
+            raise serializers.ValidationError(msg, code="authorization")
+
+        # Refresh tokens are rotated: every one can be used only once.
+        if not revoke_token(payload):
+            msg = _("Token has been revoked.")
+            raise serializers.ValidationError(msg, code="authorization")
+        return create_token_pair(user)
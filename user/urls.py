@@ -1,10 +1,18 @@
 from django.urls import path
-from user.views import CreateUserView, CreateTokenView, ManageUserView
+from user.views import (
+    CreateUserView,
+    CreateTokenView,
+    ManageUserView,
+    RefreshTokenView,
+    RevokeTokenView,
+)
 
 app_name = "user"
 
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="create"),
     path("login/", CreateTokenView.as_view(), name="login"),
+    path("token/refresh/", RefreshTokenView.as_view(), name="token-refresh"),
+    path("token/revoke/", RevokeTokenView.as_view(), name="token-revoke"),
     path("me/", ManageUserView.as_view(), name="manage"),
 ]
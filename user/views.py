@@ -1,10 +1,25 @@
-from rest_framework import generics
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from user.authentication import (
+    JWTAuthentication,
+    TokenUser,
+    create_token_pair,
+    revoke_token,
+)
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    RefreshTokenSerializer,
+    TokenRefreshSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -15,11 +30,48 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
     serializer_class = AuthTokenSerializer
 
+    def post(self, request, *args, **kwargs):
+        """Return the API token and a pair of signed tokens of the user"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        token, created = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key, **create_token_pair(user)})
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    serializer_class = TokenRefreshSerializer
+    authentication_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        """Exchange a refresh token for a new access and refresh token"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data)
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = (JWTAuthentication,)
+
+    def post(self, request, *args, **kwargs):
+        """Revoke a refresh token and the access token of the request"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revoke_token(serializer.validated_data["refresh"])
+        if request.auth:
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, JWTAuthentication)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
+        if isinstance(self.request.user, TokenUser):
+            return get_object_or_404(
+                get_user_model(), pk=self.request.user.id
+            )
         return self.request.user